@@ -1,5 +1,6 @@
 
 import argparse
+import asyncio
 import logging
 import sys
 import pathlib
@@ -18,27 +19,68 @@ from metrics import (
     ramp_up,
     # size
 )
+from parallel.batch_runner import run_batch, run_batch_async
+from parallel.group_executor import run_metrics
+from parsing.clone_store import clone_store
 from src.parsing.url_base import *
 from src.parsing.url_parser import UrlParser
 from tests import (
+    test_analysis_cache,
+    test_async_fetch,
+    test_batch_runner,
     test_bus_factor,
+    test_clone_store,
     test_code_quality,
+    test_column_profile,
+    test_combined_analysis,
+    test_commit_index,
     test_dataset_quality,
     test_documentation, 
+    test_group_executor,
+    test_http_client,
     test_license, 
+    test_llm_cache,
+    test_parquet_source,
     test_performance_claims, 
     test_ramp_up,
+    test_readme_store,
+    test_ref_resolver,
+    test_repo_activity,
+    test_repo_analyzer,
+    test_repo_cache,
+    test_sample_cache,
+    test_shard_sampler,
+    test_tarball_source,
     # test_size
     )
 
 all_tests = [
+    test_analysis_cache.run,
+    test_async_fetch.run,
+    test_batch_runner.run,
     test_bus_factor.run,
+    test_clone_store.run,
     test_code_quality.run,
+    test_column_profile.run,
+    test_combined_analysis.run,
+    test_commit_index.run,
     test_dataset_quality.run,
     test_documentation.run,
+    test_group_executor.run,
+    test_http_client.run,
     test_license.run,
+    test_llm_cache.run,
+    test_parquet_source.run,
     test_performance_claims.run,
     test_ramp_up.run,
+    test_readme_store.run,
+    test_ref_resolver.run,
+    test_repo_activity.run,
+    test_repo_analyzer.run,
+    test_repo_cache.run,
+    test_sample_cache.run,
+    test_shard_sampler.run,
+    test_tarball_source.run,
     # test_size.run
 ]
 
@@ -67,7 +109,114 @@ def test() -> None:
             print(f"Test failed: {e}")
     print(f"Tests completed. {successful_tests}/{total_tests} tests passed. {successful_tests/total_tests*100:.2f}% line coverage.")
 
-def run(url_file:str) -> None:
+def _build_metrics(x: ModelAssets) -> dict:
+    '''
+    Creates the metric objects for a single ModelAssets group, None for assets the group lacks
+    '''
+    metrics = dict.fromkeys(["cqc", "bfc", "dqd", "lsm", "szm", "psm", "bfm", "rum"])
+
+    if c := x.codebase:
+        metrics["cqc"] = code_quality.CodeQuality(c)
+        metrics["bfc"] = busfactor.BusFactorMetric(c)
+        
+    if d := x.dataset:
+        metrics["dqd"] = dataset_quality.DatasetQualityMetric(d)
+
+    if m := x.model:
+        metrics["lsm"] = license.License(m)
+        # metrics["szm"] = size.SizeScore(m)
+        metrics["psm"] = performance_claims.PerformanceClaimsScore(m)
+        metrics["bfm"] = busfactor.BusFactorMetric(m)
+        metrics["rum"] = ramp_up.RampUpScore(m)
+
+    return metrics
+
+def score_group(x: ModelAssets) -> dict:
+    '''
+    Computes every metric for a single ModelAssets group and returns its NDJSON result dict
+    '''
+    start = time.perf_counter()
+    metrics = _build_metrics(x)
+    _hold_clones(x)
+
+    # the metrics are independent, so they run concurrently and the group takes as long as the slowest one
+    try:
+        run_metrics(list(metrics.values()))
+    finally:
+        _release_clones(x)
+
+    return _assemble_results(x, metrics, time.perf_counter() - start)
+
+async def score_group_async(x: ModelAssets, fetcher) -> dict:
+    '''
+    score_group for the asyncio engine: every metric awaits its network I/O on the shared fetcher
+    '''
+    start = time.perf_counter()
+    metrics = _build_metrics(x)
+    _hold_clones(x)
+
+    try:
+        await asyncio.gather(*(m.calculate_async(fetcher) for m in metrics.values() if m is not None))
+    finally:
+        # deleting a checkout is disk I/O, kept off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, _release_clones, x)
+
+    return _assemble_results(x, metrics, time.perf_counter() - start)
+
+def _hold_clones(x: ModelAssets) -> None:
+    # the codebase clone is shared by CodeQuality and the bus factor metric, and by other groups
+    # scored at the same time with the same codebase
+    if x.codebase:
+        clone_store.acquire(x.codebase.url)
+
+def _release_clones(x: ModelAssets) -> None:
+    # deleted once the last group holding it is done
+    if x.codebase:
+        clone_store.release(x.codebase.url)
+
+def _assemble_results(x: ModelAssets, metrics: dict, netscore_lat: float) -> dict:
+    cqc, bfc, dqd, lsm, psm, bfm, rum = (metrics[k] for k in ["cqc", "bfc", "dqd", "lsm", "psm", "bfm", "rum"])
+
+    netscore = 0.25 * dqd.score + 0.1 * cqc.score + 0.2 * lsm.score + 0.2 * rum.score + 0.1 * 0 + 0.1 * psm.score + 0.05 * (bfc.score + bfm.score )/2
+
+    code_and_data = 1 if cqc.score and dqd.score else (0.5 if bool(cqc.score) ^ bool(dqd.score) else 0)
+
+    results = {
+        "name": f"{x.model.owner},{x.model.asset_id}", 
+        "category": "MODEL",
+        "net_score": netscore,
+        "net_score_latency": netscore_lat,
+        "ramp_up_time": rum.score,
+        "ramp_up_time_latency": rum.latency,
+        "bus_factor": (bfc.score + bfm.score) /2,
+        "bus_factor_latency": (bfc.latency + bfm.latency)/2,
+        "performance_claims": psm.score,
+        "performance_claims_latency": psm.latency ,
+        "license": lsm.score,
+        "license_latency": lsm.latency,
+        "size_score": (0 , {
+            "raspberry_pi": 0.0,
+            "jetson_nano": 0.0,
+            "desktop_pc": 0.0,
+            "aws_server": 0.0
+        }),
+        "size_score_latency": 0,
+        "dataset_and_code_score": code_and_data ,
+        "dataset_and_code_score_latency": 0,
+        "dataset_quality": dqd.score,
+        "dataset_quality_latency": dqd.latency,
+        "code_quality": cqc.score,
+        "code_quality_latency": cqc.latency
+    }
+
+    return results
+
+def _init_worker(log_path: str, log_level: int) -> None:
+    # worker processes started with "spawn" do not inherit the parent's logging setup
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=log_level, format= '%(levelname)s - %(asctime)s - %(message)s', filename=log_path, filemode='a')
+
+def run(url_file:str, workers: int = 1, use_async: bool = False, concurrency: int = 16) -> None:
     import dotenv
     dotenv.load_dotenv()
     print("========== Running Calculations... ==========")
@@ -100,75 +249,24 @@ def run(url_file:str) -> None:
         log_level = logging.DEBUG # level 2, debug messages
 
     logging.basicConfig(level=log_level, format= '%(levelname)s - %(asctime)s - %(message)s', filename=log_path, filemode='w')
-    for x in p.model_asset_groups:
-        start = time.perf_counter()
-        netscore = 0.0 
-        cqc = None
-        bfc = None
-        dqd = None
-        lsm = None
-        szm = None
-        psm = None 
-        bfm = None
-        rum = None
-
-        if c := x.codebase:
-            cqc = code_quality.CodeQuality(c)
-            bfc = busfactor.BusFactorMetric(c)
-            cqc.calculate()
-            bfc.calculate()
-            
-        if d := x.dataset:
-            dqd = dataset_quality.DatasetQualityMetric(d)
-            dqd.calculate()
-
-        if m := x.model:
-            lsm = license.License(m)
-            # szm = size.SizeScore(m)
-            psm = performance_claims.PerformanceClaimsScore(m)
-            bfm = busfactor.BusFactorMetric(m)
-            rum = ramp_up.RampUpScore(m)
-            lsm.calculate()
-            # szm.calculate()
-            psm.calculate()
-            bfm.calculate()
-            rum.calculate()
-
-        end = time.perf_counter()
-        netscore = 0.25 * dqd.score + 0.1 * cqc.score + 0.2 * lsm.score + 0.2 * rum.score + 0.1 * 0 + 0.1 * psm.score + 0.05 * (bfc.score + bfm.score )/2
-        netscore_lat = end - start
-
-        code_and_data = 1 if cqc.score and dqd.score else (0.5 if bool(cqc.score) ^ bool(dqd.score) else 0)
-
-        results = {
-            "name": f"{x.model.owner},{x.model.asset_id}", 
-            "category": type(ModelAssets),
-            "net_score": netscore,
-            "net_score_latency": netscore_lat,
-            "ramp_up_time": rum.score,
-            "ramp_up_time_latency": rum.latency,
-            "bus_factor": (bfc.score + bfm.score) /2,
-            "bus_factor_latency": (bfc.latency + bfm.latency)/2,
-            "performance_claims": psm.score,
-            "performance_claims_latency": psm.latency ,
-            "license": lsm.score,
-            "license_latency": lsm.latency,
-            "size_score": (0 , {
-                "raspberry_pi": 0.0,
-                "jetson_nano": 0.0,
-                "desktop_pc": 0.0,
-                "aws_server": 0.0
-            }),
-            "size_score_latency": 0,
-            "dataset_and_code_score": code_and_data ,
-            "dataset_and_code_score_latency": 0,
-            "dataset_quality": dqd.score,
-            "dataset_quality_latency": dqd.latency,
-            "code_quality": cqc.score,
-            "code_quality_latency": cqc.latency
-        }
-
-        output_results(list(results))
+    if use_async:
+        failed = asyncio.run(run_batch_async(
+            p.model_asset_groups,
+            score_group_async,
+            on_result=lambda results: output_results([results]),
+            concurrency=concurrency
+        ))
+    else:
+        failed = run_batch(
+            p.model_asset_groups,
+            score_group,
+            on_result=lambda results: output_results([results]),
+            workers=workers,
+            initializer=_init_worker,
+            initargs=(log_path, log_level)
+        )
+    if failed:
+        print(f"WARNING: {len(failed)} of {len(p.model_asset_groups)} groups failed, see the log file for details")
 
     print("========== Finished Running Calculations! ==========")
 
@@ -179,13 +277,31 @@ def main() -> None:
         'action', 
         help="Command to execute: install, run, or test."
     )
+    argparser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help="Number of worker processes used to score URL groups in parallel (default: 1)."
+    )
+    argparser.add_argument(
+        '--async',
+        dest='use_async',
+        action='store_true',
+        help="Drive the whole batch from one asyncio event loop instead of worker processes."
+    )
+    argparser.add_argument(
+        '--concurrency',
+        type=int,
+        default=16,
+        help="Number of URL groups scored at once with --async (default: 16)."
+    )
     args = argparser.parse_args()
     if args.action == 'install':
         install()
     elif args.action == 'test':
         test()
     else:
-        run(args.action)
+        run(args.action, args.workers, args.use_async, args.concurrency)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,110 @@
+# --------------------------------------Info--------------------------------------
+# Input: Git blob SHAs of Python files and their per-file analysis results
+# Output: The stored results for blobs that were analyzed before
+# Description: Persistent, content-addressed cache of per-file source analysis (line,
+# function, long-function and style violation counts). A blob SHA identifies a file's exact
+# content, so an unchanged file is never read, parsed or linted again, whichever repository
+# or run it shows up in. The least recently used entries are evicted once the cache holds
+# too many.
+# How to use: Configure with ANALYSIS_CACHE_DIR and ANALYSIS_CACHE_MAX_ENTRIES (0 disables the
+# cache) in the .env file.
+#  ---------------------------------------------------------------------------------
+
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+from metrics.cache_dir import cache_dir
+from metrics.repo_analyzer import FileStats
+
+_BATCH = 500 # keys per query, below SQLite's bound parameter limit
+
+
+class AnalysisCache:
+    def __init__(self, path: Path, max_entries: int):
+        self.path = Path(path)
+        self.max_entries = max_entries
+
+    @classmethod
+    def from_env(cls) -> "AnalysisCache":
+        path = os.getenv('ANALYSIS_CACHE_DIR') or cache_dir('analysis')
+        max_entries = int(os.getenv('ANALYSIS_CACHE_MAX_ENTRIES', 200000))
+        return cls(Path(path).expanduser() / 'files.sqlite3', max_entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, FileStats]:
+        keys = list(keys)
+        if not self.enabled or not keys:
+            return {}
+        found = {}
+        try:
+            now = time.time()
+            with self._connect() as db:
+                for i in range(0, len(keys), _BATCH):
+                    batch = keys[i:i + _BATCH]
+                    marks = ','.join('?' * len(batch))
+                    rows = db.execute(f"""SELECT key, lines, functions, long_functions, violations, parsed
+                                          FROM files WHERE key IN ({marks})""", batch).fetchall()
+                    for key, *stats in rows:
+                        found[key] = FileStats(*stats[:4], bool(stats[4]))
+                    db.execute(f"UPDATE files SET accessed = ? WHERE key IN ({marks})", [now, *batch])
+        except sqlite3.Error as e:
+            logging.info(f"Analysis cache read failed: {e}")
+            return {}
+        return found
+
+    def put_many(self, results: Dict[str, FileStats]) -> None:
+        if not self.enabled or not results:
+            return
+        try:
+            now = time.time()
+            with self._connect() as db:
+                db.executemany("""INSERT OR REPLACE INTO files
+                                      (key, lines, functions, long_functions, violations, parsed, accessed)
+                                  VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                               [(key, s.lines, s.functions, s.long_functions, s.violations, int(s.parsed), now)
+                                for key, s in results.items()])
+                self._evict(db)
+        except sqlite3.Error as e:
+            logging.info(f"Analysis cache write failed: {e}")
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        # drop the least recently used entries beyond max_entries
+        (count,) = db.execute("SELECT COUNT(*) FROM files").fetchone()
+        if count > self.max_entries:
+            db.execute("""DELETE FROM files WHERE key IN (
+                              SELECT key FROM files ORDER BY accessed DESC LIMIT -1 OFFSET ?)""",
+                       (self.max_entries,))
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # one short-lived connection per call keeps the cache safe across threads and worker processes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            db.execute("""CREATE TABLE IF NOT EXISTS files (
+                              key TEXT PRIMARY KEY, lines INTEGER NOT NULL, functions INTEGER NOT NULL,
+                              long_functions INTEGER NOT NULL, violations INTEGER NOT NULL,
+                              parsed INTEGER NOT NULL, accessed REAL NOT NULL)""")
+            yield db
+            db.commit()
+        finally:
+            db.close()
+
+
+_default_cache: Optional[AnalysisCache] = None
+
+
+def default_analysis_cache() -> AnalysisCache:
+    # created on first use so the .env file has been loaded by then
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = AnalysisCache.from_env()
+    return _default_cache
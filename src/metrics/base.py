@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
 from parsing.url_base import *
+import asyncio
+import logging
+import time
 import urllib.parse
 
 
@@ -74,3 +77,27 @@ class Metric(ABC):
             Each subclass of metric must implement the calculation
         '''
         pass
+
+    async def calculate_async(self, fetcher) -> float:
+        '''
+            Used when a whole batch is driven from one asyncio event loop. Network I/O is done
+            up front with the AsyncFetcher in _prefetch_async, then the blocking calculate()
+            runs in the loop's executor and reads from the warmed caches
+        '''
+        start_time = time.perf_counter()
+        try:
+            await self._prefetch_async(fetcher)
+        except Exception as e:
+            # calculate() fetches whatever is missing itself and reports its own errors
+            logging.debug(f"Prefetch failed for {self.url}: {e}")
+        prefetch_ms = (time.perf_counter() - start_time) * 1000
+
+        score = await asyncio.get_running_loop().run_in_executor(None, self.calculate)
+        self.latency += int(prefetch_ms) # the prefetch is part of this metric's cost
+        return score
+
+    async def _prefetch_async(self, fetcher) -> None:
+        '''
+            Subclasses that fetch READMEs or call the LLM override this to do it asynchronously
+        '''
+        pass
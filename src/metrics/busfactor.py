@@ -1,9 +1,15 @@
 from metrics.base import *
 from parsing.url_base import Model
-from huggingface_hub import hf_hub_url, list_repo_commits
+from huggingface_hub import hf_hub_url
+import git
 import numpy as np
-import requests
+from metrics.commit_index import default_commit_index, github_commit_record, huggingface_commit_record
+from parallel import http_client
+from parallel.deadline import Deadline
+from parsing.clone_store import clone_store, history_clones_enabled
 import urllib.parse
+import asyncio
+from typing import Optional
 import time
 import logging
 
@@ -11,6 +17,10 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class BusFactorMetric(Metric):
+    def __init__(self, asset, clone_timeout_seconds: float = 60):
+        super().__init__(asset)
+        self.clone_timeout_seconds = clone_timeout_seconds # history clone, see _get_clone_commit_map
+
     def calculate(self) -> float:
         '''
         Calculate implementation of the bus factor metric
@@ -26,45 +36,131 @@ class BusFactorMetric(Metric):
         logging.info("Successfully determined bus factor score")
         return r
 
+    async def calculate_async(self, fetcher) -> float:
+        '''
+        Same as calculate, but the commit listing is awaited on the fetcher
+        '''
+        start_time = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        commit_map = None
+        if self.asset_type == Codebase and history_clones_enabled():
+            commit_map = await loop.run_in_executor(None, self._get_clone_commit_map)
+
+        if commit_map is None:
+            index = default_commit_index()
+            entry = await loop.run_in_executor(None, index.get, self.api_endpoint)
+            if self.asset_type == Model:
+                commits, reached_head = await fetcher.get_huggingface_commits(
+                    self.api_endpoint + '/commits/main', stop_at=entry.head_sha if entry else None)
+            elif self.asset_type == Codebase:
+                commits, reached_head = await fetcher.get_github_commits(
+                    self.api_endpoint + '/commits', since=entry.head_date if entry else None,
+                    stop_at=entry.head_sha if entry else None)
+            else:
+                raise ValueError("Unsupported asset type for commit map extraction.")
+            entry = await loop.run_in_executor(None, index.refresh, self.api_endpoint, entry, commits, reached_head)
+            commit_map = dict(entry.counts) if entry and entry.counts else None
+        r = self._distribution_function(commit_map)
+        self.latency = (time.perf_counter() - start_time) * 1000
+        self.score = r
+        logging.info("Successfully determined bus factor score")
+        return r
+
     def _get_commit_map(self) -> dict: 
-        commits = dict()
+        if self.asset_type == Codebase and history_clones_enabled():
+            if (commit_map := self._get_clone_commit_map()) is not None:
+                return commit_map
+            logging.debug("Bus factor: No local clone, falling back to the Github API")
+
+        # only the commits made since the indexed head are listed
+        index = default_commit_index()
+        entry = index.get(self.api_endpoint)
         if self.asset_type == Model:
-            for x in self._get_huggingface_commits(self.api_endpoint + '/commits'):
-                commits[x] = commits.get(x, 0) + 1
+            commits, reached_head = self._get_huggingface_commits(
+                self.api_endpoint + '/commits/main', stop_at=entry.head_sha if entry else None)
         elif self.asset_type == Codebase:
-            for x in self._get_github_commits(self.api_endpoint + '/commits'):
-                commits[x["commit"]["author"]["name"]] = commits.get(x["commit"]["author"]["name"], 0) + 1
+            commits, reached_head = self._get_github_commits(
+                self.api_endpoint + '/commits', since=entry.head_date if entry else None,
+                stop_at=entry.head_sha if entry else None)
         else:
             raise ValueError("Unsupported asset type for commit map extraction.")
-        logging.debug("Bus factor: Commit map successfully obtained")
-        return commits if commits else None
+        entry = index.refresh(self.api_endpoint, entry, commits, reached_head)
+        logging.debug(f"Bus factor: Commit map successfully obtained ({len(commits)} new commits)")
+        return dict(entry.counts) if entry and entry.counts else None
     
-    def _get_github_commits(self, url:str) -> list:
+    def _get_clone_commit_map(self) -> dict:
         '''
-        Get the commits from a github repo using the github api
+        Count commits per author with git shortlog on the blobless history clone shared with
+        CodeQuality, instead of paging through the Github API
         '''
+        try:
+            repo = clone_store.get(self.url, Deadline(self.clone_timeout_seconds), timeout=self.clone_timeout_seconds)
+        except Exception as e:
+            logging.debug(f"Bus factor: Clone failed: {e}")
+            return None
+        if repo is None:
+            return None
+
+        commits = dict()
+        try:
+            if repo.git.rev_parse('--is-shallow-repository') == 'true':
+                return None # a shallow clone only has the latest commit
+            for line in repo.git.shortlog('-s', '-n', 'HEAD').splitlines():
+                count, author = line.strip().split('\t', 1)
+                commits[author] = int(count)
+        except git.exc.GitCommandError as e:
+            # e.g. a clone that ran out of time before it had a HEAD
+            logging.debug(f"Bus factor: Could not read the clone's history: {e}")
+            return None
+        logging.debug("Bus factor: Commit map obtained from local clone")
+        return commits if commits else None
+
+    def _get_github_commits(self, url:str, since: Optional[str] = None, stop_at: Optional[str] = None) -> tuple:
+        '''
+        Get the commits from a github repo using the github api, newest first.
+        since/stop_at limit the listing to the commits after an already indexed one.
+
+        Returns (commits, whether the listing reached stop_at)
+        '''
+        per_page = 100
+        params = {"per_page": per_page}
+        if since:
+            params["since"] = since
         commits = []
-        page = 0
+        page = 1 # the GitHub API numbers pages from 1, page 0 repeats page 1
         while True:
-            r = requests.get(url, params={"per_page":100, "page":page})
+            r = http_client.get(url, params={**params, "page":page})
             r.raise_for_status()
             data = r.json()
-            if not data:
+            for item in data:
+                if item["sha"] == stop_at:
+                    return commits, True
+                commits.append(github_commit_record(item))
+            if len(data) < per_page:
                 break
-            commits.extend(data)
             page+=1
         logging.debug("Bus factor: Github commits obtained")
-        return commits
+        # commits older than since are not listed, so the indexed ones are still covered
+        return commits, since is not None
     
-    def _get_huggingface_commits(self, url:str) -> list:
+    def _get_huggingface_commits(self, url:str, stop_at: Optional[str] = None) -> tuple:
         '''
-        Get the commits from a huggingface repo or dataset using the huggingface api
+        Get the commits from a huggingface repo or dataset using the huggingface api, newest
+        first, following the Link header from page to page until stop_at is reached.
+
+        Returns (commits, whether the listing reached stop_at)
         '''
         commits = []
-        commits_list = list_repo_commits(f"{self.owner}/{self.asset_id}")
-        for commit in commits_list:
-            commits.append(commit.authors[0])
-        return commits
+        next_page = url
+        while next_page:
+            r = http_client.get(next_page)
+            r.raise_for_status()
+            for item in r.json():
+                if item["id"] == stop_at:
+                    return commits, True
+                commits.append(huggingface_commit_record(item))
+            next_page = r.links.get("next", {}).get("url")
+        return commits, False
 
 
     def _distribution_function(self,commit_map: dict) -> float:
@@ -0,0 +1,11 @@
+import os
+from pathlib import Path
+
+
+def cache_dir(name: str) -> Path:
+    '''
+    Returns the directory used for the named on-disk cache. All caches live under
+    CACHE_DIR (default ~/.cache/huggingface-model-scorer). The directory is not created here.
+    '''
+    root = os.getenv('CACHE_DIR') or os.path.join(Path.home(), '.cache', 'huggingface-model-scorer')
+    return Path(root).expanduser() / name
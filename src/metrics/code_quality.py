@@ -1,37 +1,58 @@
 # --------------------------------------Info--------------------------------------
 # Input: Repository URL
 # Output: Code quality score (0.0 to 1.0) and latency in milliseconds
-# Description: Calculates code quality score for a repository based on function length, code style compliance using flake8, and repository recency (time from last commit).
-# How to use: Instantiate CodeQuality with an asset. Make sure to install GitPython dependency (pip3 install GitPython)
+# Description: Calculates code quality score for a repository based on function length, code style compliance (pycodestyle and pyflakes), and repository recency (time from last commit).
+# The source files are read from the checked out clone, or with CODE_QUALITY_SOURCE=objects straight from its git object database.
+# CODE_QUALITY_SOURCE=tarball streams the GitHub archive of the default branch instead of cloning (other hosts are still cloned).
+# Recency comes from repository metadata (see repo_activity.py), looked up while the clone runs, and only falls back to the analyzed commit without it.
+# With CODE_QUALITY_SAMPLING=adaptive files are analyzed until the function length and style scores are known to within
+# CODE_QUALITY_TOLERANCE; files_sampled and the score intervals are reported either way.
+# How to use: Instantiate CodeQuality with an asset. Make sure to install the GitPython, pycodestyle and pyflakes dependencies
 #  ---------------------------------------------------------------------------------
 
-import ast
 import logging
-import subprocess
+import os
 import tempfile
 from typing import Optional
 from datetime import datetime
 import time
-from pathlib import Path
-import git
 from git import Commit, Repo
 from metrics.base import Metric
+from metrics.analysis_cache import default_analysis_cache
+from metrics.repo_analyzer import RepoStats, RepositoryAnalyzer
+from metrics.tarball_source import fetch_tarball_stats
+from parallel.deadline import Deadline
+from parsing.clone_store import clone_store
+from parsing.repo_activity import repo_activity
 
 
 class CodeQuality(Metric):
     # analyzes code quality for machine learning model repositories
 
-    def __init__(self, asset, max_function_lines: int = 50, max_days_old: int = 365):
+    def __init__(self, asset, max_function_lines: int = 50, max_days_old: int = 365, timeout_seconds: float = 15,
+                 analysis_workers: Optional[int] = None, source: Optional[str] = None,
+                 sampling: Optional[str] = None, tolerance: Optional[float] = None):
         super().__init__(asset)
         self.max_function_lines = max_function_lines
         self.max_days_old = max_days_old
+        self.timeout_seconds = timeout_seconds
+        # every metadata request for recency together, running alongside the clone
+        self.recency_timeout_seconds = min(5, timeout_seconds)
+        # more than one worker process analyzes every Python file instead of a sample of 50
+        if analysis_workers is None:
+            analysis_workers = int(os.getenv('CODE_QUALITY_WORKERS', 1))
+        self.analysis_workers = analysis_workers
+        # 'worktree' reads checked out files, 'objects' reads blobs without a checkout,
+        # 'tarball' streams the GitHub archive without cloning
+        self.source = source or os.getenv('CODE_QUALITY_SOURCE', 'worktree')
+        # 'fixed' analyzes a sample of 50 files (or all with workers), 'adaptive' as many as the tolerance needs
+        self.sampling = sampling or os.getenv('CODE_QUALITY_SAMPLING', 'fixed')
+        # half-width of the 95% intervals of the function length and style scores adaptive sampling aims for
+        self.tolerance = tolerance if tolerance is not None else float(os.getenv('CODE_QUALITY_TOLERANCE', 0.05))
 
     def calculate(self) -> float:
-        import signal
-        import os
-
         start_time = time.time()
-        timeout_seconds = 15
+        deadline = Deadline(self.timeout_seconds)
 
         # Track which analyses completed successfully
         function_score = None
@@ -39,220 +60,184 @@ class CodeQuality(Metric):
         recency_score = None
         violations = 0
         days_old = 999
+        total_functions = 0
         repo = None
+        stats = None
 
-        def timeout_handler(_signum, _frame):
-            raise TimeoutError("Code quality calculation timed out after 15 seconds")
+        # from metadata, looked up while the repository is cloned and analyzed so recency neither
+        # waits for nor delays the clone
+        last_updated = repo_activity.last_updated_async(self.url, timeout=min(self.recency_timeout_seconds,
+                                                                               deadline.remaining()))
 
         try:
-            if os.name != 'nt':  # Not Windows
-                signal.signal(signal.SIGALRM, timeout_handler)
-                signal.alarm(timeout_seconds)
-
             with tempfile.TemporaryDirectory() as temp_dir:
+                snapshot = None
+                if self.source == 'tarball':
+                    try:
+                        snapshot = fetch_tarball_stats(self.url, self._analyzer(), deadline)
+                    except Exception:
+                        pass
+                    if snapshot is not None:
+                        stats = snapshot.stats
+
+                if snapshot is None:
+                    try:
+                        # shared with the bus factor metric, released once the whole group is scored
+                        repo = clone_store.get(self.url, deadline)
+                    except Exception:
+                        pass  # Continue with analysis even if clone fails
+                repo_path = repo.working_dir if repo is not None else temp_dir
+
+                # Try each analysis step, only store real results. A step that runs out of
+                # time keeps whatever it finished, a step that never started is left out
                 try:
-                    repo = self._clone_repository(self.url, temp_dir)
-                except:
-                    pass  # Continue with analysis even if clone fails
+                    # one pass over one sample of files feeds every source statistic
+                    if stats is None:
+                        stats = self._analyze_repository(repo_path, deadline)
+                    total_functions = stats.functions
+                    function_score = self._score_function_lengths(stats, deadline)
+                except Exception:
+                    pass
 
-                # Try each analysis step, only store real results
                 try:
-                    function_score = self._analyze_function_lengths(temp_dir)
-                except:
+                    style_score, violations = self._analyze_code_style(stats)
+                except Exception:
                     pass
 
                 try:
-                    style_score, violations = self._analyze_code_style(temp_dir)
-                except:
+                    updated = last_updated.result(timeout=min(self.recency_timeout_seconds, deadline.remaining()))
+                    if updated is not None:
+                        recency_score, days_old = self._score_recency(updated)
+                except Exception:
                     pass
 
                 try:
-                    if repo is not None:
-                        recency_score, days_old = self._analyze_repository_recency(repo)
-                except:
+                    # without metadata, the date of the analyzed commit
+                    if recency_score is None and snapshot is not None and snapshot.committed_date is not None:
+                        recency_score, days_old = self._score_recency(datetime.fromtimestamp(snapshot.committed_date))
+                    elif recency_score is None and repo is not None:
+                        recency_score, days_old = self._analyze_repository_recency(repo, deadline)
+                except Exception:
                     pass
 
-                # Calculates final score using only completed analyses
-                final_score = self._calculate_partial_weighted_score(
-                    function_score, style_score, recency_score
-                )
-
-                self.function_length_score = function_score if function_score is not None else 0.5
-                self.style_score = style_score if style_score is not None else 0.5
-                self.recency_score = recency_score if recency_score is not None else 0.5
-                self.total_functions = self._count_total_functions(temp_dir) if temp_dir else 0
-                self.style_violations = violations
-                self.days_since_last_commit = days_old
-
-                if os.name != 'nt':
-                    signal.alarm(0)  # Cancel the alarm
-
-                self.latency = int((time.time() - start_time) * 1000)
-                self.score = max(0.0, min(1.0, final_score))
-                return self.score
-
-        except TimeoutError:
-            # Timeout occurred - return with whatever scores were actually calculated
-            if os.name != 'nt':
-                signal.alarm(0)
-
-            final_score = self._calculate_partial_weighted_score(
-                function_score, style_score, recency_score
-            )
-
-            self.function_length_score = function_score if function_score is not None else 0.5
-            self.style_score = style_score if style_score is not None else 0.5
-            self.recency_score = recency_score if recency_score is not None else 0.5
-            self.total_functions = 0
-            self.style_violations = violations
-            self.days_since_last_commit = days_old
-
-            self.latency = int((time.time() - start_time) * 1000)
-            self.score = max(0.0, min(1.0, final_score))
-            logging.debug("Code quality score determined")
-            return self.score
-
         except Exception:
-            if os.name != 'nt':
-                signal.alarm(0)
             self.latency = int((time.time() - start_time) * 1000)
             self.score = 0.1
             logging.info("Exception raised when finding code quality")
             return self.score
 
-    def _clone_repository(self, repo_url: str, temp_dir: str, timeout: int = 5) -> Optional[Repo]:
-        # clone repo using GitPython library with timeout
-        import signal
-        import os
-
-        def timeout_handler(_signum, _frame):
-            raise TimeoutError("Repository cloning timed out")
-
-        try:
-            if os.name != 'nt': # not Windows based
-                signal.signal(signal.SIGALRM, timeout_handler)
-                signal.alarm(timeout)
-
-            try:
-                repo = Repo.clone_from(repo_url, temp_dir, depth=1, single_branch=True, branch='main')
-            except git.exc.GitCommandError:
-                try:
-                    repo = Repo.clone_from(repo_url, temp_dir, depth=1, single_branch=True, branch='master')
-                except git.exc.GitCommandError:
-                    repo = Repo.clone_from(repo_url, temp_dir, depth=1, single_branch=True)
-
-            if os.name != 'nt':
-                signal.alarm(0)  # Cancel the alarm
-
-            return repo
-
-        except TimeoutError:
-            if os.name != 'nt':
-                signal.alarm(0)
-            # Check if partial clone exists
-            if os.path.exists(temp_dir) and os.listdir(temp_dir):
-                try:
-                    return Repo(temp_dir)
-                except:
-                    return None
-            return None
-        except Exception:
-            logging.info("Failed to clone repository")
-            raise ValueError(f"Failed to clone repository: {repo_url}")
-
-    def _analyze_function_lengths(self, repo_path: str) -> float:
+        if deadline.expired():
+            logging.debug(f"Code quality ran out of its {self.timeout_seconds}s budget, using partial results")
+
+        # Calculates final score using only completed analyses
+        final_score = self._calculate_partial_weighted_score(
+            function_score, style_score, recency_score
+        )
+
+        self.function_length_score = function_score if function_score is not None else 0.5
+        self.style_score = style_score if style_score is not None else 0.5
+        self.recency_score = recency_score if recency_score is not None else 0.5
+        self.total_functions = total_functions
+        self.style_violations = violations
+        self.days_since_last_commit = days_old
+        self.files_sampled = stats.files_analyzed if stats is not None else 0
+        self.function_length_interval, self.style_interval = self._score_intervals(stats)
+
+        self.latency = int((time.time() - start_time) * 1000)
+        self.score = max(0.0, min(1.0, final_score))
+        logging.debug("Code quality score determined")
+        return self.score
+
+    def _analyzer(self) -> RepositoryAnalyzer:
+        # reads and parses a seeded sample of the Python files once, or all of them in parallel
+        # unchanged files (same git blob) are taken from the analysis cache
+        source = 'objects' if self.source == 'objects' else 'worktree'
+        if self.sampling == 'adaptive':
+            # the style score moves 10 times as fast as the violation rate, see _analyze_code_style
+            return RepositoryAnalyzer(max_function_lines=self.max_function_lines, sample_size='adaptive',
+                                      tolerance=self.tolerance, violation_tolerance=self.tolerance / 10,
+                                      cache=default_analysis_cache(), source=source)
+        if self.analysis_workers > 1:
+            return RepositoryAnalyzer(max_function_lines=self.max_function_lines, sample_size=None,
+                                      workers=self.analysis_workers, cache=default_analysis_cache(), source=source)
+        return RepositoryAnalyzer(max_function_lines=self.max_function_lines, cache=default_analysis_cache(),
+                                  source=source)
+
+    def _analyze_repository(self, repo_path: str, deadline: Optional[Deadline] = None) -> RepoStats:
+        stats = self._analyzer().analyze(repo_path, deadline)
+        logging.debug(f"Analyzed {stats.files_analyzed} of {len(stats.files)} sampled Python files")
+        return stats
+
+    def _score_function_lengths(self, stats: RepoStats, deadline: Optional[Deadline] = None) -> float:
         # scores function lengths in code files
-        python_files = list(Path(repo_path).rglob("*.py"))
-        if not python_files:
+        if not stats.files:
             return 0.5
+        if not stats.complete and stats.functions == 0 and deadline:
+            # out of time before any function was seen
+            deadline.check("Function length analysis")
 
-        # Sample files if too many to speed up analysis
-        if len(python_files) > 50:
-            import random
-            python_files = random.sample(python_files, 50)
-
-        total_functions = 0
-        long_functions = 0
-
-        for file_path in python_files:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-
-                tree = ast.parse(content)
-                for node in ast.walk(tree):
-                    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                        total_functions += 1
-                        if hasattr(node, 'end_lineno') and node.end_lineno:
-                            func_length = node.end_lineno - node.lineno
-                            if func_length > self.max_function_lines:
-                                long_functions += 1
-
-            except (SyntaxError, UnicodeDecodeError, FileNotFoundError):
-                continue
-
-        if total_functions == 0:
+        if stats.functions == 0:
             return 0.5
 
-        good_functions = total_functions - long_functions
+        good_functions = stats.functions - stats.long_functions
         logging.debug("Determined function length ratio")
-        return good_functions / total_functions
+        return good_functions / stats.functions
 
-    def _analyze_code_style(self, repo_path: str) -> tuple:
+    def _analyze_code_style(self, stats: Optional[RepoStats]) -> tuple:
         # Returns tuple of (style_score, violation_count)
-
-        try:
-            result = subprocess.run(
-                ['flake8', repo_path, '--count', '--statistics', '--max-line-length=100', '--ignore=E501,W503,E203'],
-                capture_output = True,
-                text = True,
-                timeout = 10
-            )
-
-            violations = 0
-            if result.stdout:
-                lines = result.stdout.strip().split('\n')
-                for line in lines:
-                    if line and line[0].isdigit():
-                        violations += int(line.split()[0])
-
-            total_lines = self._count_python_lines(repo_path)
-
-            # neutral score if no lines detected
-            if total_lines == 0:
-                return 0.5, violations
-
-            violation_rate = violations / total_lines
-            style_score = max(0.0, 1.0 - (violation_rate * 10))
-
-            logging.debug("Flake8 runs on file successful")
-            return style_score, violations
-
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            logging.debug("Flake8 runs on file failed")
+        # violations come from the analyzer pass, so they are counted on the same files as the lines
+        if stats is None or stats.files_analyzed == 0:
             return 0.5, 0
 
-    def _analyze_repository_recency(self, repo: Repo) -> tuple:
+        # neutral score if no lines detected
+        if stats.lines == 0:
+            return 0.5, stats.violations
+
+        violation_rate = stats.violations / stats.lines
+        style_score = max(0.0, 1.0 - (violation_rate * 10))
+
+        logging.debug(f"Style checked {stats.files_analyzed} files, {stats.violations} violations")
+        return style_score, stats.violations
+
+    @staticmethod
+    def _score_intervals(stats: Optional[RepoStats]) -> tuple:
+        # 95% intervals (low, high) of the function length and style scores, None when unknown
+        function_interval = style_interval = None
+        if stats is not None and stats.long_function_margin is not None and stats.functions:
+            ratio = stats.long_functions / stats.functions
+            function_interval = (max(0.0, 1.0 - ratio - stats.long_function_margin),
+                                 min(1.0, 1.0 - ratio + stats.long_function_margin))
+        if stats is not None and stats.violation_margin is not None and stats.lines:
+            rate = stats.violations / stats.lines
+            style_interval = (max(0.0, 1.0 - (rate + stats.violation_margin) * 10),
+                              min(1.0, max(0.0, 1.0 - (rate - stats.violation_margin) * 10)))
+        return function_interval, style_interval
+
+    def _analyze_repository_recency(self, repo: Repo, deadline: Optional[Deadline] = None) -> tuple:
         # scores based on how recently the repository was updated.
-       
+        if deadline:
+            deadline.check("Repository recency analysis")
+
         try:
             latest_commit: Commit = next(repo.iter_commits(max_count=1))
             commit_date: datetime = datetime.fromtimestamp(latest_commit.committed_date)
+            return self._score_recency(commit_date)
 
-            days_old: int = (datetime.now() - commit_date).days
+        except Exception:
+            return 0.1, 999 # low score, very old
 
-            if days_old <= 0:
-                recency_score = 1.0
-            elif days_old >= self.max_days_old:
-                recency_score = 0.0
-            else:
-                recency_score = 1.0 - (days_old / self.max_days_old)
+    def _score_recency(self, commit_date: datetime) -> tuple:
+        days_old: int = (datetime.now() - commit_date).days
 
-            logging.debug("Recency score for code quality obtained")
-            return recency_score, days_old
+        if days_old <= 0:
+            recency_score = 1.0
+        elif days_old >= self.max_days_old:
+            recency_score = 0.0
+        else:
+            recency_score = 1.0 - (days_old / self.max_days_old)
 
-        except Exception:
-            return 0.1, 999 # low score, very old
+        logging.debug("Recency score for code quality obtained")
+        return recency_score, days_old
 
     def _calculate_weighted_score(self, function_score: float, style_score: float,
                                  recency_score: float) -> float:
@@ -286,50 +271,3 @@ class CodeQuality(Metric):
             return 0.5
 
         return weighted_sum / total_weight
-
-    def _count_total_functions(self, repo_path: str) -> int:
-        # counts total number of functions in the repo
-        python_files = list(Path(repo_path).rglob("*.py"))
-
-        # Sample files if too many to speed up analysis
-        if len(python_files) > 50:
-            import random
-            python_files = random.sample(python_files, 50)
-
-        total_functions = 0
-
-        for file_path in python_files:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-
-                tree = ast.parse(content)
-                for node in ast.walk(tree):
-                    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                        total_functions += 1
-
-            except (SyntaxError, UnicodeDecodeError, FileNotFoundError):
-                continue
-
-        return total_functions
-
-    def _count_python_lines(self, repo_path: str) -> int:
-        # counts total lines of Python code
-        python_files = list(Path(repo_path).rglob("*.py"))
-
-        if len(python_files) > 50:
-            import random
-            python_files = random.sample(python_files, 50)
-
-        total_lines = 0
-
-        for file_path in python_files:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    total_lines += len(f.readlines())
-            except (UnicodeDecodeError, FileNotFoundError):
-                continue
-
-        return total_lines
-
-
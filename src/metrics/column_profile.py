@@ -0,0 +1,101 @@
+# --------------------------------------Info--------------------------------------
+# Input: pyarrow Table (e.g. the dataset sample of DatasetQualityMetric)
+# Output: TableProfile with per-column value type histograms, null fractions and naming classes
+# Description: Column profiling engine for the dataset quality checks. Every statistic is
+# computed by Arrow compute kernels over whole columns (null and NaN counts, union type
+# codes) or over the array of column names (naming convention regexes), never by looping over
+# values in Python, and the table is walked once for all of them.
+# How to use: profile = profile_table(table); profile.missing_fraction, profile.naming_classes
+#  ---------------------------------------------------------------------------------
+
+from typing import Dict, List, NamedTuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# checked in order, a name gets the first convention it matches (RE2 syntax for Arrow)
+NAMING_CONVENTIONS = {
+    'snake_case': r'^[a-z]+(_[a-z]+)*$',
+    'camelCase': r'^[a-z]+([A-Z][a-z]+)*$',
+    'PascalCase': r'^[A-Z][a-z]+([A-Z][a-z]+)*$',
+    'kebab-case': r'^[a-z]+(-[a-z]+)*$',
+    'UPPER_CASE': r'^[A-Z]+(_[A-Z]+)*$',
+}
+
+
+class ColumnProfile(NamedTuple):
+    name: str
+    type_counts: Dict[str, int] # value type -> number of values, nulls (and NaN) under 'null'
+    null_count: int # null values plus NaN, like pandas' isnull
+    naming: str # a NAMING_CONVENTIONS key or 'other'
+
+
+class TableProfile(NamedTuple):
+    rows: int
+    columns: List[ColumnProfile]
+
+    @property
+    def missing_cells(self) -> int:
+        return sum(c.null_count for c in self.columns)
+
+    @property
+    def missing_fraction(self) -> float:
+        # average null fraction of the columns; an empty table counts as entirely missing
+        if not self.rows or not self.columns:
+            return 1.0
+        return self.missing_cells / (self.rows * len(self.columns))
+
+    @property
+    def naming_classes(self) -> Dict[str, int]:
+        classes: Dict[str, int] = {}
+        for column in self.columns:
+            classes[column.naming] = classes.get(column.naming, 0) + 1
+        return classes
+
+
+def naming_classes(names: List[str]) -> List[str]:
+    # one regex pass per convention over the array of names
+    labels = ['other'] * len(names)
+    if not names:
+        return labels
+    array = pa.array(names, type=pa.string())
+    unmatched = pa.array([True] * len(names))
+    for convention, pattern in NAMING_CONVENTIONS.items():
+        matched = pc.and_(unmatched, pc.match_substring_regex(array, pattern))
+        for i in pc.indices_nonzero(matched).to_pylist():
+            labels[i] = convention
+        unmatched = pc.and_not(unmatched, matched)
+    return labels
+
+
+def type_histogram(column: pa.ChunkedArray) -> Dict[str, int]:
+    # value type -> count; union columns are split by their children's types
+    nulls = column.null_count
+    histogram: Dict[str, int] = {}
+    if pa.types.is_union(column.type):
+        codes = pa.chunked_array([chunk.type_codes for chunk in column.chunks], type=pa.int8())
+        children = {code: str(column.type.field(i).type) for i, code in enumerate(column.type.type_codes)}
+        for entry in pc.value_counts(codes).to_pylist():
+            child = children[entry['values']]
+            histogram[child] = histogram.get(child, 0) + entry['counts']
+    elif len(column) > nulls:
+        histogram[str(column.type)] = len(column) - nulls
+    if pa.types.is_floating(column.type):
+        nans = pc.sum(pc.is_nan(column)).as_py() or 0
+        if nans:
+            histogram[str(column.type)] -= nans
+            if not histogram[str(column.type)]:
+                del histogram[str(column.type)]
+            nulls += nans
+    if nulls:
+        histogram['null'] = nulls
+    return histogram
+
+
+def profile_table(table: pa.Table) -> TableProfile:
+    namings = naming_classes(table.column_names)
+    columns = []
+    for name, column, naming in zip(table.column_names, table.columns, namings):
+        histogram = type_histogram(column)
+        columns.append(ColumnProfile(name, histogram, histogram.get('null', 0), naming))
+    return TableProfile(table.num_rows, columns)
@@ -0,0 +1,160 @@
+# --------------------------------------Info--------------------------------------
+# Input: README content and PurdueGenAI Studio API key
+# Output: One dict with a "license", "documentation" and "performance_claims" section
+# Description: Combined LLM analysis mode. Instead of License, Documentation and
+# PerformanceClaimsScore each sending the full README with their own prompt, one request
+# asks for all three analyses at once and every metric reads its own section. That is one
+# round trip and one copy of the README tokens per model instead of three.
+# How to use: Set LLM_COMBINED_ANALYSIS=1 in the .env file. The metrics pick it up automatically.
+#  ---------------------------------------------------------------------------------
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict
+
+from metrics.llm_client import LLMRequest, cached_chat_completion
+
+SECTIONS = ("license", "documentation", "performance_claims")
+
+# bump whenever _create_prompt changes so cached LLM replies are not reused
+PROMPT_VERSION = "combined-v1"
+
+
+def combined_analysis_enabled() -> bool:
+    return os.getenv('LLM_COMBINED_ANALYSIS', '0').strip().lower() in ('1', 'true', 'yes')
+
+
+class CombinedAnalysis:
+    '''
+    Process-wide memo of combined analyses keyed by a hash of the README.
+
+    The metrics of a group run concurrently, so the first one to ask sends the request and
+    the others wait for it instead of sending their own.
+    '''
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._in_flight: Dict[str, threading.Event] = {}
+
+    def section(self, name: str, api_key: str, readme: str) -> Dict[str, Any]:
+        # returns the named section, or an empty dict if the LLM left it out
+        return self.analyze(api_key, readme).get(name) or {}
+
+    def analyze(self, api_key: str, readme: str) -> Dict[str, Any]:
+        key = hashlib.sha256(readme.encode('utf-8')).hexdigest()
+        with self._lock:
+            if key in self._results:
+                return self._results[key]
+            event = self._in_flight.get(key)
+            leader = event is None
+            if leader:
+                event = self._in_flight[key] = threading.Event()
+
+        if not leader:
+            event.wait()
+            with self._lock:
+                if key in self._results:
+                    return self._results[key]
+            raise RuntimeError("Combined LLM analysis failed")
+
+        try:
+            analysis_text = cached_chat_completion(api_key, combined_llm_request(readme), readme)
+            result = _parse_llm_response(analysis_text)
+            with self._lock:
+                self._results[key] = result
+            logging.debug("Combined LLM analysis completed")
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            event.set()
+
+
+def combined_llm_request(readme: str) -> LLMRequest:
+    return LLMRequest(
+        "You are an AI assistant that analyzes model README files for license compatibility, documentation quality and benchmark credibility.",
+        _create_prompt(readme),
+        PROMPT_VERSION,
+        max_tokens=1500
+    )
+
+
+def _create_prompt(readme: str) -> str:
+    return f"""
+Analyze the provided README content and perform three independent evaluations.
+
+# 1. LICENSE: license compatibility with LGPLv2.1 (0.0 to 1.0)
+- 1.0: Fully compatible permissive licenses (MIT, Apache 2.0, BSD, ISC, LGPLv2.1 itself)
+- 0.8-0.9: Clearly compatible with minor restrictions
+- 0.5-0.7: Likely compatible but requires verification
+- 0.2-0.4: Potentially problematic licenses (GPLv2, custom restrictions)
+- 0.0-0.1: Incompatible (proprietary, no license, non-commercial)
+Look for an explicit "License" section, SPDX identifiers in headers or metadata, then common license names.
+If no license information is found use license_score 0.0 and license_name "Unknown". Be conservative when
+the license is ambiguous and use the most restrictive one if several are listed.
+
+# 2. DOCUMENTATION: documentation quality (0.0 to 1.0)
+- 0.9-1.0: Excellent - comprehensive, self-contained, detailed examples, benchmarking code/results and limitations.
+- 0.8-0.89: Good - covers all critical aspects thoroughly with minor areas for improvement.
+- 0.7-0.79: Satisfactory - covers all major requirements but lacks detail.
+- 0.5-0.69: Fair - misses at least one major requirement or has significant gaps.
+- 0.3-0.49: Poor - severely lacking, only fragmented or minimal information.
+- 0.1-0.19: Very Poor - no meaningful documentation or incorrect/misleading information.
+
+# 3. PERFORMANCE CLAIMS: benchmark evidence (each 0.0 to 1.0)
+- benchmark_presence: Does the README mention recognized benchmarks? Score on quantity and recognition.
+- benchmark_quality: Are the benchmark scores relevant to the model's tasks and do they give context?
+- score_credibility: Are the reported scores credible? Is the evaluation methodology mentioned?
+- reproducibility: Is there enough information to reproduce the benchmarks (hyperparameters, training details, code)?
+
+# README CONTEXT:
+{readme}
+
+# OUTPUT FORMAT REQUIREMENTS:
+You MUST respond ONLY in this exact JSON format with no additional text and no markdown.
+Keep every rationale and reasoning under 50 characters:
+
+{{
+  "license": {{
+    "license_score": <float between 0.0 and 1.0>,
+    "license_name": "<detected license name or 'Unknown'>",
+    "confidence": <float between 0.0 and 1.0>,
+    "rationale": "<brief explanation of score>"
+  }},
+  "documentation": {{
+    "documentation_score": <float between 0.0 and 1.0>,
+    "confidence": <float between 0.0 and 1.0>,
+    "rationale": "<brief explanation of score>"
+  }},
+  "performance_claims": {{
+    "benchmark_presence": <float between 0.0 and 1.0>,
+    "benchmark_quality": <float between 0.0 and 1.0>,
+    "score_credibility": <float between 0.0 and 1.0>,
+    "reproducibility": <float between 0.0 and 1.0>,
+    "reasoning": "<brief explanation of scores>"
+  }}
+}}
+
+Now analyze the README and provide your response in the required JSON format.
+"""
+
+
+def _parse_llm_response(response_text: str) -> Dict[str, Any]:
+    # Try to extract the outermost JSON object from the response
+    try:
+        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if not json_match:
+            return {}
+        analysis = json.loads(json_match.group())
+    except Exception:
+        logging.info("Failed to parse combined LLM response")
+        return {}
+    return {name: analysis[name] for name in SECTIONS if isinstance(analysis.get(name), dict)}
+
+
+# process-wide store shared by the License, Documentation and PerformanceClaimsScore metrics
+combined_analysis = CombinedAnalysis()
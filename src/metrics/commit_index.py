@@ -0,0 +1,124 @@
+# --------------------------------------Info--------------------------------------
+# Input: Commits listed from the Github or Hugging Face API, newest first
+# Output: The per-author commit counts of a repository
+# Description: Persistent on-disk index of commit authors for the bus factor metric. Each
+# repository's entry stores the author counts and the newest commit seen (SHA and date), so
+# a later run only lists the commits made since then and adds them to the counts instead of
+# fetching the whole history again.
+# How to use: Configure with COMMIT_INDEX_DIR and COMMIT_INDEX_ENABLED (0 disables it) in the
+# .env file.
+#  ---------------------------------------------------------------------------------
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from metrics.cache_dir import cache_dir
+
+
+class CommitRecord(NamedTuple):
+    sha: str
+    author: str
+    date: str # ISO 8601 commit date, used as the next listing's lower bound
+
+
+class IndexEntry(NamedTuple):
+    counts: Dict[str, int]
+    head_sha: str
+    head_date: str
+
+
+def github_commit_record(item: dict) -> CommitRecord:
+    # an item of GET /repos/{owner}/{repo}/commits
+    commit = item["commit"]
+    return CommitRecord(item["sha"], commit["author"]["name"], commit["committer"]["date"])
+
+
+def huggingface_commit_record(item: dict) -> CommitRecord:
+    # an item of GET /api/models/{repo_id}/commits/{revision}
+    authors = item.get("authors") or [{"user": "unknown"}]
+    return CommitRecord(item["id"], authors[0]["user"], item["date"])
+
+
+class CommitIndex:
+    def __init__(self, path: Path, enabled: bool = True):
+        self.path = Path(path)
+        self.enabled = enabled
+
+    @classmethod
+    def from_env(cls) -> "CommitIndex":
+        path = os.getenv('COMMIT_INDEX_DIR') or cache_dir('commits')
+        enabled = os.getenv('COMMIT_INDEX_ENABLED', '1') == '1'
+        return cls(Path(path).expanduser() / 'authors.sqlite3', enabled)
+
+    def get(self, repo: str) -> Optional[IndexEntry]:
+        if not self.enabled:
+            return None
+        try:
+            with self._connect() as db:
+                row = db.execute("SELECT counts, head_sha, head_date FROM repos WHERE repo = ?", (repo,)).fetchone()
+        except sqlite3.Error as e:
+            logging.info(f"Commit index read failed: {e}")
+            return None
+        if row is None:
+            return None
+        return IndexEntry(json.loads(row[0]), row[1], row[2])
+
+    def refresh(self, repo: str, entry: Optional[IndexEntry], commits: List[CommitRecord],
+                reached_head: bool) -> Optional[IndexEntry]:
+        '''
+        Adds the newly listed commits (newest first) to the repository's entry and stores it.
+
+        reached_head tells whether the listing ran up to the entry's newest commit. If it did
+        not (e.g. the history was rewritten) the listing covers the whole history and the
+        counts are rebuilt from it.
+        '''
+        counts = dict(entry.counts) if entry is not None and reached_head else {}
+        for commit in commits:
+            counts[commit.author] = counts.get(commit.author, 0) + 1
+
+        if commits:
+            updated = IndexEntry(counts, commits[0].sha, commits[0].date)
+        elif entry is not None and reached_head:
+            return entry # nothing new since the last run
+        else:
+            return None
+
+        if self.enabled:
+            try:
+                with self._connect() as db:
+                    db.execute("INSERT OR REPLACE INTO repos (repo, counts, head_sha, head_date, updated) VALUES (?, ?, ?, ?, ?)",
+                               (repo, json.dumps(counts), updated.head_sha, updated.head_date, time.time()))
+            except sqlite3.Error as e:
+                logging.info(f"Commit index write failed: {e}")
+        return updated
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # one short-lived connection per call keeps the index safe across threads and worker processes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            db.execute("""CREATE TABLE IF NOT EXISTS repos (
+                              repo TEXT PRIMARY KEY, counts TEXT NOT NULL, head_sha TEXT NOT NULL,
+                              head_date TEXT NOT NULL, updated REAL NOT NULL)""")
+            yield db
+            db.commit()
+        finally:
+            db.close()
+
+
+_default_index: Optional[CommitIndex] = None
+
+
+def default_commit_index() -> CommitIndex:
+    # created on first use so the .env file has been loaded by then
+    global _default_index
+    if _default_index is None:
+        _default_index = CommitIndex.from_env()
+    return _default_index
@@ -2,14 +2,35 @@ from parsing.url_base import *
 from metrics.base import *
 from contextlib import contextmanager
 from datasets import load_dataset, get_dataset_config_names
-from itertools import islice
-import pandas as pd
-import requests
-import regex as re
+from typing import Optional
+import pyarrow as pa
+from metrics.column_profile import TableProfile, profile_table
+from metrics.parquet_source import HttpRangeFile, list_parquet_files, read_footers, read_sample
+from metrics.sample_cache import default_sample_cache
+from metrics.shard_sampler import ShardSampler
+import os
 import time
 import logging
+from parallel import http_client
+
+SAMPLE_ROWS = 10000      # rows sampled for the checks, also the size that scores 1.0
+BATCH_ROWS = 1000        # rows per streamed Arrow batch
+LABEL_SAMPLE_ROWS = 1000 # rows read for the label type check on the Parquet fast path
 
 class DatasetQualityMetric(Metric):
+    def __init__(self, asset, hub_api: str = 'https://huggingface.co/api', parquet_footers: Optional[bool] = None):
+        super().__init__(asset)
+        self.hub_api = hub_api
+        # size, missing values and variety from Parquet footers instead of streamed rows
+        if parquet_footers is None:
+            parquet_footers = os.getenv('DATASET_PARQUET_FOOTERS', '1') == '1'
+        self.parquet_footers = parquet_footers
+        # the sample is drawn from this many shards, reading sample_open_shards of them at once
+        # (each open shard adds about one decoded batch to peak memory), within a memory budget
+        self.sample_shards = int(os.getenv('DATASET_SAMPLE_SHARDS', 8))
+        self.sample_open_shards = int(os.getenv('DATASET_SAMPLE_OPEN_SHARDS', 4))
+        self.sample_max_bytes = int(os.getenv('DATASET_SAMPLE_MAX_MB', 256)) * 1024 * 1024
+
     def calculate(self) -> float:
         '''
         Calculate implementation of the dataset quality metric
@@ -21,13 +42,17 @@ class DatasetQualityMetric(Metric):
         - Variety of features
         - Label consistency
 
-        Fetches dataset from Hugging Face API, uses pandas to query and analyze the dataset
+        Reads the footers of the dataset's Parquet shards when it has them, otherwise samples rows of the
+        dataset (from its Parquet copy, or streamed from Hugging Face) into an Arrow table, and analyzes its columns
 
         Returns a float between 0 and 1, where 0 is low quality and 1 is high quality
         '''
         start_time = time.perf_counter()
         self._validate_input()
-        r = self._analyze_dataset(self._fetch_dataset())
+        profile = self._footer_profile() if self.parquet_footers else None
+        if profile is None:
+            profile = profile_table(self._fetch_dataset())
+        r = self._analyze_profile(profile)
         self.latency = (time.perf_counter() - start_time) * 1000
         self.score = r
         logging.debug("Obtained dataset quality score")
@@ -41,46 +66,136 @@ class DatasetQualityMetric(Metric):
         logging.debug("Input validated for dataset")
         return True
 
-    def _fetch_dataset(self) -> pd.DataFrame:
+    def _footer_profile(self) -> Optional[TableProfile]:
+        '''
+        Profile of the whole dataset from its Parquet footers (rows, columns, null counts), with the
+        value types of a LABEL_SAMPLE_ROWS row sample. None when the dataset has no Parquet copy or
+        it cannot be read, so the streaming path takes over.
+        '''
+        dataset_id = f"{self.owner}/{self.asset_id}"
+        headers = {}
+        token = os.getenv('HUGGINGFACE_TOKEN')
+        if token:
+            headers['Authorization'] = f"Bearer {token}"
+        try:
+            _, urls = list_parquet_files(dataset_id, self.hub_api, headers=headers)
+            if not urls:
+                return None
+            footers = read_footers(urls, headers)
+            sample = profile_table(read_sample(urls[0], LABEL_SAMPLE_ROWS, headers))
+        except Exception as e:
+            logging.info(f"Parquet footers of {dataset_id} unavailable, streaming rows instead: {e}")
+            return None
+
+        columns = []
+        for column in sample.columns:
+            nulls = footers.null_counts.get(column.name)
+            if nulls is None:           # no footer statistics, estimated from the sample
+                nulls = round(column.null_count / sample.rows * footers.rows) if sample.rows else 0
+            columns.append(column._replace(null_count=nulls))
+        logging.debug(f"Dataset profile of {dataset_id} read from {footers.shards_read} of {len(urls)} Parquet footers")
+        return TableProfile(footers.rows, columns)
+
+    def _fetch_dataset(self) -> pa.Table:
+        dataset_id = f"{self.owner}/{self.asset_id}"
+        cache = default_sample_cache()
+        revision = self._revision(dataset_id) if cache.enabled else None
         try:
                 # Check available configs
-            configs = get_dataset_config_names(f"{self.owner}/{self.asset_id}")
-            if configs:
-                # Prefer the requested config if available
-                config_to_use = 'en' if 'en' in configs else configs[0]
+            configs = cache.get_configs(dataset_id, revision) if revision else None
+            if configs is None:
+                configs = get_dataset_config_names(dataset_id, revision=revision)
+                if revision:
+                    cache.put_configs(dataset_id, revision, configs)
+            # Prefer the requested config if available
+            config_to_use = ('en' if 'en' in configs else configs[0]) if configs else None
+            if revision:
+                cached = cache.get_sample(dataset_id, config_to_use, 'train', revision)
+                if cached is not None:
+                    return cached       # memory-mapped, nothing streamed
+            table = self._parquet_sample(dataset_id, config_to_use)
+            if table is not None:
+                if revision:
+                    cache.put_sample(dataset_id, config_to_use, 'train', revision, table)
+                return table
+            if config_to_use:
                 print(f"Using config: {config_to_use}")
-                ds = load_dataset(f"{self.owner}/{self.asset_id}", config_to_use, split = "train", streaming=True)
+                ds = load_dataset(dataset_id, config_to_use, split = "train", streaming=True, revision=revision)
             else:
                 # No configs available
                 print("No configs available, loading default dataset")
-                ds = load_dataset(f"{self.owner}/{self.asset_id}", split = "train",streaming=True)
+                ds = load_dataset(dataset_id, split = "train",streaming=True, revision=revision)
             logging.debug("Successfully loaded dataset")
         except Exception as e:
             logging.info("Failed to load dataset")
-            raise RuntimeError(f"Failed to load dataset '{f"{self.owner}/{self.asset_id}"}': {e}")
+            raise RuntimeError(f"Failed to load dataset '{dataset_id}': {e}")
 
-        data_list = list(islice(ds, 10000))
-        if not data_list:
-            return pd.DataFrame
-        df = pd.DataFrame.from_records(data_list)
-        return df
-    
-    def _analyze_dataset(self, df: pd.DataFrame) -> float:
+        table = self._sample_table(ds)
+        if revision:
+            cache.put_sample(dataset_id, config_to_use, 'train', revision, table)
+        return table
+
+    def _revision(self, dataset_id: str) -> Optional[str]:
+        # commit SHA of the dataset's main branch, None when the hub cannot tell (then nothing is cached)
+        headers = {}
+        token = os.getenv('HUGGINGFACE_TOKEN')
+        if token:
+            headers['Authorization'] = f"Bearer {token}"
+        try:
+            response = http_client.get(f"{self.hub_api}/datasets/{dataset_id}", headers=headers)
+            if response.status_code != 200:
+                return None
+            return response.json().get('sha')
+        except Exception as e:
+            logging.debug(f"Could not find the revision of {dataset_id}: {e}")
+            return None
+
+    def _sample_table(self, ds, rows: int = SAMPLE_ROWS) -> pa.Table:
+        # a random sample across shards rather than the head of the first one, never as per-row dicts
+        return self._sampler(rows).sample(ds)
+
+    def _parquet_sample(self, dataset_id: str, config: Optional[str], rows: int = SAMPLE_ROWS) -> Optional[pa.Table]:
+        '''
+        The sample drawn from the dataset's Parquet copy by range requests, from random row groups
+        and decoded a batch at a time. None when there is no Parquet copy or it cannot be read,
+        so the dataset is streamed instead.
+        '''
+        headers = {}
+        token = os.getenv('HUGGINGFACE_TOKEN')
+        if token:
+            headers['Authorization'] = f"Bearer {token}"
+        try:
+            _, urls = list_parquet_files(dataset_id, self.hub_api, config=config, headers=headers)
+            if not urls:
+                return None
+            return self._sampler(rows).sample_parquet(urls, lambda url: HttpRangeFile(url, headers))
+        except Exception as e:
+            logging.info(f"Parquet sample of {dataset_id} unavailable, streaming rows instead: {e}")
+            return None
+
+    def _sampler(self, rows: int) -> ShardSampler:
+        return ShardSampler(rows=rows, max_shards=self.sample_shards, open_shards=self.sample_open_shards,
+                            max_bytes=self.sample_max_bytes, batch_rows=BATCH_ROWS)
+
+    def _analyze_dataset(self, table: pa.Table) -> float:
+        return self._analyze_profile(profile_table(table))              # one vectorized pass over the columns
+
+    def _analyze_profile(self, profile: TableProfile) -> float:
         '''
         Dataset size will have the highest weight of 0.35
         Missing values will have a weight of 0.25
         Variety of features will have a weight of 0.20
         Label consistency will have a weight of 0.20
         '''
-        size_score = min(len(df) / 10000, 1.0) * 0.35           # Assuming 10,000 rows is excellent
-        missing_score = (1 - df.isnull().mean().mean()) * 0.25  # Average missing value percentage
-        variety_score = min(len(df.columns) / 50, 1.0) * 0.20   # Assuming 50 features is excellent
-        label_score = self._label_consistency(df) * 0.20        # Custom function to evaluate label consistency
+        size_score = min(profile.rows / SAMPLE_ROWS, 1.0) * 0.35        # Assuming 10,000 rows is excellent
+        missing_score = (1 - profile.missing_fraction) * 0.25           # Average missing value percentage
+        variety_score = min(len(profile.columns) / 50, 1.0) * 0.20      # Assuming 50 features is excellent
+        label_score = self._label_consistency(profile) * 0.20           # Custom function to evaluate label consistency
         total_score = size_score + missing_score + variety_score + label_score
         self.socore = total_score
         return total_score
-    
-    def _label_consistency(self, df: pd.DataFrame) -> float:
+
+    def _label_consistency(self, profile: TableProfile) -> float:
         '''
         read all column names, determine if their fields are consistently typed, determine if names follow a similar writing conveniton
 
@@ -89,44 +204,21 @@ class DatasetQualityMetric(Metric):
         '''
         
         lc_score = 1.0
-        print(df)
-        label_columns = [col for col in df.columns]
-        if not label_columns:
+        if not profile.columns:
             return 0                    # no labels found
         
-        for l in label_columns:
-            if df[l].dtype == 'object': # objects are mixed columns
-                types = dict()
-                for x in df[l]:
-                    types[type(x)] = types.get(type(x), 0) + 1
-                if len(types) > 3:      # more than 3 types is bad
-                    lc_score -= 0.3333 * (len(types) - 3) / len(types)
-        
-        naming_conventions = {
-            'snake_case': re.compile(r'^[a-z]+(_[a-z]+)*$'),
-            'camelCase': re.compile(r'^[a-z]+([A-Z][a-z]+)*$'),
-            'PascalCase': re.compile(r'^[A-Z][a-z]+([A-Z][a-z]+)*$'),
-            'kebab-case': re.compile(r'^[a-z]+(-[a-z]+)*$'),
-            'UPPER_CASE': re.compile(r'^[A-Z]+(_[A-Z]+)*$')
-        }
-
-        conventions = dict()
-
-        for l in label_columns:
-            matched = False
-            for name, pattern in naming_conventions.items():
-                if pattern.match(l):
-                    conventions[name] = conventions.get(name, 0) + 1
-                    matched = True
-                    break
-            if not matched:
-                conventions['other'] = conventions.get('other', 0) + 1
-        
+        for column in profile.columns:
+            types = len(column.type_counts)
+            if types > 3:               # more than 3 types is bad
+                lc_score -= 0.3333 * (types - 3) / types
+
+        conventions = profile.naming_classes
         if len(conventions) > 2:
             lc_score -= 0.3333 * (len(conventions) - 2) / len(conventions)
 
-        if pct_msg := df.isnull().sum().sum() / (df.shape[0] * df.shape[1]) > 0.35:
-            lc_score -= 0.3333 * (pct_msg - 0.35) / 0.65                    # penalize if more than 35% missing values
+        pct_missing = profile.missing_fraction
+        if profile.rows and pct_missing > 0.35:
+            lc_score -= 0.3333 * (pct_missing - 0.35) / 0.65                 # penalize if more than 35% missing values
 
         return max(lc_score, 0.0)
     
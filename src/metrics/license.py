@@ -13,14 +13,18 @@
 import logging
 import re
 import os
-import requests
 from parsing.readme_parser import ReadmeParser
 from typing import Dict, Any
 from metrics.base import *
 from parsing.url_base import Site
 from huggingface_hub import HfApi
+from metrics.combined_analysis import combined_analysis, combined_analysis_enabled, combined_llm_request
+from metrics.llm_client import LLMRequest, cached_chat_completion
 
 class License(Metric):
+    # bump whenever _create_prompt changes so cached LLM replies are not reused
+    PROMPT_VERSION = "license-v1"
+
     def __init__(self, asset):
         super().__init__(asset)
         self.api_key = None
@@ -91,37 +95,36 @@ class License(Metric):
             a Dict containing relevant metrics.
         """
         try:  
-            prompt = self._create_prompt(readme)
-            
+            if combined_analysis_enabled():
+                # one shared request answers license, documentation and performance claims
+                result = combined_analysis.section("license", self.api_key, readme)
+                if 'license_score' not in result:
+                    return {"license_score": 0.0, "license_name": "Parse Error", "confidence": 0.0, "rationale": "Failed to parse LLM response"}
+                return result
+
             # calls PurdueGenAI Studio API
-            url = "https://genai.rcac.purdue.edu/api/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json" 
-            }
-            body = {
-                "model": "llama3.1:latest",
-                "messages": [
-                    {"role": "system", "content": "You are an AI assistant that analyzes software licenses for compatibility with LGPLv2.1."},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.1, # controls randomness in model's output
-                "max_tokens": 1000, # sets max number of tokens model can generate in response
-                "stream": False # gets full response at once. do not print intermediate results
-            }
-            
-            response = requests.post(url, headers=headers, json=body)
-            
-            if response.status_code != 200:
-                raise Exception(f"PurdueGenAI API Error: {response.status_code}, {response.text}")
-            
-            response_data = response.json()
-            analysis_text = response_data['choices'][0]['message']['content']
+            analysis_text = cached_chat_completion(self.api_key, self._llm_request(readme), readme)
             return self._parse_llm_response(analysis_text)
             
         except Exception as e:
             raise RuntimeError(f"LLM analysis failed: {str(e)}")
 
+    def _llm_request(self, readme: str) -> LLMRequest:
+        # the request _analyze_with_llm sends, also used to prefetch the reply asynchronously
+        if combined_analysis_enabled():
+            return combined_llm_request(readme)
+        return LLMRequest(
+            "You are an AI assistant that analyzes software licenses for compatibility with LGPLv2.1.",
+            self._create_prompt(readme),
+            self.PROMPT_VERSION
+        )
+
+    async def _prefetch_async(self, fetcher) -> None:
+        # downloads the README and the LLM reply without blocking, so calculate() only reads caches
+        readme = await fetcher.fetch_readme(self.url)
+        if readme and self._setup_purdue_genai():
+            await fetcher.cached_chat_completion(self.api_key, self._llm_request(readme), readme)
+
     def _create_prompt(self, readme: str) -> str:    
         return f"""
 Analyze the provided README content and determine a license compatibility score between 0.0 and 1.0.
@@ -0,0 +1,106 @@
+# --------------------------------------Info--------------------------------------
+# Input: README content, prompt template version and the LLM's reply text
+# Output: The cached reply for an unchanged README, or None on a miss
+# Description: Persistent on-disk cache in front of the PurdueGenAI Studio calls. Entries
+# are keyed by a hash of the README, the prompt template version, the model name and the
+# temperature, so re-scoring an unchanged model makes no LLM calls. Entries expire after a
+# TTL and the least recently used ones are evicted once the cache holds too many.
+# How to use: Configure with LLM_CACHE_DIR, LLM_CACHE_TTL_SECONDS (0 disables the cache) and
+# LLM_CACHE_MAX_ENTRIES in the .env file.
+#  ---------------------------------------------------------------------------------
+
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+from metrics.cache_dir import cache_dir
+
+
+class LLMCache:
+    def __init__(self, path: Path, ttl_seconds: float, max_entries: int):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    @classmethod
+    def from_env(cls) -> "LLMCache":
+        path = os.getenv('LLM_CACHE_DIR') or cache_dir('llm')
+        ttl = float(os.getenv('LLM_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+        max_entries = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 10000))
+        return cls(Path(path).expanduser() / 'responses.sqlite3', ttl, max_entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    @staticmethod
+    def make_key(readme: str, prompt_version: str, model: str, temperature: float) -> str:
+        readme_hash = hashlib.sha256(readme.encode('utf-8')).hexdigest()
+        return hashlib.sha256(f"{readme_hash}|{prompt_version}|{model}|{temperature}".encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        try:
+            now = time.time()
+            with self._connect() as db:
+                row = db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                if now - row[1] > self.ttl_seconds:
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                return row[0]
+        except sqlite3.Error as e:
+            logging.info(f"LLM cache read failed: {e}")
+            return None
+
+    def put(self, key: str, response: str) -> None:
+        if not self.enabled:
+            return
+        try:
+            now = time.time()
+            with self._connect() as db:
+                db.execute("INSERT OR REPLACE INTO responses (key, response, created, accessed) VALUES (?, ?, ?, ?)",
+                           (key, response, now, now))
+                self._evict(db, now)
+        except sqlite3.Error as e:
+            logging.info(f"LLM cache write failed: {e}")
+
+    def _evict(self, db: sqlite3.Connection, now: float) -> None:
+        # drop expired entries, then the least recently used ones beyond max_entries
+        db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        db.execute("""DELETE FROM responses WHERE key IN (
+                          SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)""",
+                   (self.max_entries,))
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # one short-lived connection per call keeps the cache safe across threads and worker processes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            db.execute("""CREATE TABLE IF NOT EXISTS responses (
+                              key TEXT PRIMARY KEY, response TEXT NOT NULL,
+                              created REAL NOT NULL, accessed REAL NOT NULL)""")
+            yield db
+            db.commit()
+        finally:
+            db.close()
+
+
+_default_cache: Optional[LLMCache] = None
+
+
+def default_llm_cache() -> LLMCache:
+    # created on first use so the .env file has been loaded by then
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = LLMCache.from_env()
+    return _default_cache
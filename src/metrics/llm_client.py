@@ -0,0 +1,95 @@
+# --------------------------------------Info--------------------------------------
+# Input: PurdueGenAI Studio API key and an LLMRequest (system prompt, user prompt, ...)
+# Output: The text content of the model's reply
+# Description: Shared client for the PurdueGenAI Studio chat completions endpoint used by
+# the README based metrics (license, documentation, performance claims). Replies to README
+# prompts are cached on disk (see llm_cache.py) so unchanged READMEs are not re-queried.
+#  ---------------------------------------------------------------------------------
+
+import logging
+import threading
+from typing import Any, Dict, NamedTuple
+from parallel import http_client
+from metrics.llm_cache import LLMCache, default_llm_cache
+
+GENAI_URL = "https://genai.rcac.purdue.edu/api/chat/completions"
+LLM_MODEL = "llama3.1:latest"
+LLM_TEMPERATURE = 0.1
+LLM_TIMEOUT = 120 # generation is much slower than the other endpoints we call
+
+
+class LLMRequest(NamedTuple):
+    system_prompt: str
+    prompt: str
+    prompt_version: str # identifies the prompt template, part of the cache key
+    max_tokens: int = 1000
+
+
+def request_headers(api_key: str) -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+
+
+def request_body(request: LLMRequest) -> Dict[str, Any]:
+    return {
+        "model": LLM_MODEL,
+        "messages": [
+            {"role": "system", "content": request.system_prompt},
+            {"role": "user", "content": request.prompt}
+        ],
+        "temperature": LLM_TEMPERATURE, # controls randomness in model's output
+        "max_tokens": request.max_tokens, # sets max number of tokens model can generate in response
+        "stream": False # gets full response at once. do not print intermediate results
+    }
+
+
+def cache_key(request: LLMRequest, readme: str) -> str:
+    return LLMCache.make_key(readme, request.prompt_version, LLM_MODEL, LLM_TEMPERATURE)
+
+
+def chat_completion(api_key: str, request: LLMRequest) -> str:
+    '''
+    Sends one chat completion request and returns the reply text.
+    Raises an Exception if the API does not answer with 200.
+    '''
+    response = http_client.post(GENAI_URL, headers=request_headers(api_key), json=request_body(request), timeout=LLM_TIMEOUT)
+
+    if response.status_code != 200:
+        raise Exception(f"PurdueGenAI API Error: {response.status_code}, {response.text}")
+
+    response_data = response.json()
+    return response_data['choices'][0]['message']['content']
+
+
+# replies already received in this process, including ones fetched ahead of time by the asyncio engine
+_responses: Dict[str, str] = {}
+_responses_lock = threading.Lock()
+
+
+def remember_response(key: str, analysis_text: str) -> None:
+    with _responses_lock:
+        _responses[key] = analysis_text
+
+
+def cached_chat_completion(api_key: str, request: LLMRequest, readme: str) -> str:
+    '''
+    chat_completion with the persistent LLM cache in front of it. request.prompt_version must be
+    bumped whenever the prompt template changes.
+    '''
+    key = cache_key(request, readme)
+    with _responses_lock:
+        if key in _responses:
+            return _responses[key]
+
+    cache = default_llm_cache()
+    if (cached := cache.get(key)) is not None:
+        logging.debug(f"LLM cache hit for {request.prompt_version}")
+        remember_response(key, cached)
+        return cached
+
+    analysis_text = chat_completion(api_key, request)
+    cache.put(key, analysis_text)
+    remember_response(key, analysis_text)
+    return analysis_text
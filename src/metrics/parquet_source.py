@@ -0,0 +1,172 @@
+# --------------------------------------Info--------------------------------------
+# Input: Hugging Face dataset id (and optionally a config)
+# Output: The dataset's Parquet shard URLs, their footer statistics and a small row sample
+# Description: Fast path of DatasetQualityMetric for datasets published as Parquet (every
+# dataset on the hub has an auto-converted Parquet copy). Row counts, the schema and per-
+# column null counts are in each shard's footer, so only the footer bytes are fetched with
+# ranged GETs instead of streaming rows; datasets with more than MAX_FOOTERS shards are
+# extrapolated from the footers of a random sample of them. Rows are still read (the first row group of one
+# shard, again by range) where values are needed, for the label type check.
+# How to use: urls = list_parquet_files("owner/name"); stats = read_footers(urls)
+#  ---------------------------------------------------------------------------------
+
+import io
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from parallel import http_client
+
+TAIL_BYTES = 64 * 1024 # fetched with the first request, enough for most footers
+FOOTER_WORKERS = 16 # footers read at once (http_client still caps the connections per host)
+MAX_FOOTERS = 64 # footers read per dataset, larger datasets are extrapolated from a sample of shards
+
+
+class HttpRangeFile(io.RawIOBase):
+    '''
+    Read-only, seekable file over HTTP range requests. The first request fetches the last
+    TAIL_BYTES (which also reveals the file size), so reading a Parquet footer usually takes
+    one request; other reads fetch exactly the bytes asked for.
+    '''
+    def __init__(self, url: str, headers: Optional[dict] = None, timeout: Optional[float] = None):
+        super().__init__()
+        self.url = url
+        self.headers = headers or {}
+        self.timeout = timeout
+        self.requests = 0
+        self._position = 0
+        tail = self._get(f"bytes=-{TAIL_BYTES}")
+        self.size = int(tail.headers['Content-Range'].rsplit('/', 1)[1])
+        self._tail = tail.content
+        self._tail_start = self.size - len(self._tail)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self.size}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        end = min(self._position + len(buffer), self.size)
+        if end <= self._position:
+            return 0
+        if self._position >= self._tail_start:
+            data = self._tail[self._position - self._tail_start:end - self._tail_start]
+        else:
+            data = self._get(f"bytes={self._position}-{end - 1}").content
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def _get(self, byte_range: str):
+        self.requests += 1
+        # an explicit timeout=None would switch off http_client's default timeout
+        kwargs = {'timeout': self.timeout} if self.timeout is not None else {}
+        response = http_client.get(self.url, headers={**self.headers, 'Range': byte_range}, **kwargs)
+        if response.status_code != 206:
+            raise OSError(f"Range request returned HTTP {response.status_code} for {self.url}")
+        return response
+
+
+class FooterStats(NamedTuple):
+    rows: int
+    schema: pa.Schema
+    null_counts: Dict[str, Optional[int]] # top-level column -> nulls, None without statistics
+    shards_read: int = 0 # fewer than the shards when rows and nulls are extrapolated
+
+
+def list_parquet_files(dataset_id: str, api_url: str = 'https://huggingface.co/api',
+                       config: Optional[str] = None, split: str = 'train',
+                       headers: Optional[dict] = None) -> Tuple[Optional[str], List[str]]:
+    '''
+    Returns (config, shard URLs) of the dataset's Parquet copy, preferring the 'en' config and
+    the requested split like the streaming path does. Empty when the hub has no Parquet copy.
+    '''
+    response = http_client.get(f"{api_url}/datasets/{dataset_id}/parquet", headers=headers)
+    if response.status_code != 200:
+        logging.debug(f"No Parquet listing for {dataset_id}: HTTP {response.status_code}")
+        return None, []
+    listing = response.json() # {config: {split: [url, ...]}}
+    if not isinstance(listing, dict) or not listing:
+        return None, []
+    if config is None:
+        config = 'en' if 'en' in listing else next(iter(listing))
+    splits = listing.get(config) or {}
+    return config, list(splits.get(split) or [])
+
+
+def read_footers(urls: List[str], headers: Optional[dict] = None, timeout: Optional[float] = None,
+                 max_footers: int = MAX_FOOTERS, seed: int = 0) -> FooterStats:
+    '''
+    Sums rows and null counts over the shards, reading nothing but their footers, several at
+    once. With more than max_footers shards only a seeded random sample of them is read and the
+    sums are scaled up to all shards (shards of one split are written alike, so the counts of a
+    few dozen estimate the rest well).
+    '''
+    def footer(url: str) -> pq.FileMetaData:
+        return pq.ParquetFile(HttpRangeFile(url, headers, timeout)).metadata
+
+    read = urls if len(urls) <= max_footers else random.Random(seed).sample(urls, max_footers)
+    rows = 0
+    schema = None
+    null_counts: Dict[str, Optional[int]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(FOOTER_WORKERS, len(read)))) as pool:
+        footers = list(pool.map(footer, read))
+    for metadata in footers:
+        rows += metadata.num_rows
+        if schema is None:
+            schema = metadata.schema.to_arrow_schema()
+            null_counts = {name: 0 for name in schema.names}
+        for name, nulls in _null_counts(metadata).items():
+            if name in null_counts:
+                null_counts[name] = None if nulls is None or null_counts[name] is None else null_counts[name] + nulls
+    if len(read) < len(urls):
+        scale = len(urls) / len(read)
+        rows = round(rows * scale)
+        null_counts = {name: None if nulls is None else round(nulls * scale) for name, nulls in null_counts.items()}
+        logging.debug(f"Rows and null counts extrapolated from {len(read)} of {len(urls)} Parquet footers")
+    return FooterStats(rows, schema if schema is not None else pa.schema([]), null_counts, len(read))
+
+
+def _null_counts(metadata: pq.FileMetaData) -> Dict[str, Optional[int]]:
+    # leaf statistics only count top-level nulls for flat columns, nested ones are left unknown
+    counts: Dict[str, Optional[int]] = {}
+    for group in range(metadata.num_row_groups):
+        row_group = metadata.row_group(group)
+        for i in range(row_group.num_columns):
+            chunk = row_group.column(i)
+            name, _, nested = chunk.path_in_schema.partition('.')
+            statistics = chunk.statistics
+            known = not nested and statistics is not None and statistics.has_null_count
+            if name not in counts:
+                counts[name] = 0
+            if not known or counts[name] is None:
+                counts[name] = None
+            else:
+                counts[name] += statistics.null_count
+    return counts
+
+
+def read_sample(url: str, rows: int, headers: Optional[dict] = None, timeout: Optional[float] = None) -> pa.Table:
+    # the first rows of one shard, fetching only the row groups they are in
+    parquet = pq.ParquetFile(HttpRangeFile(url, headers, timeout))
+    batches = []
+    collected = 0
+    for batch in parquet.iter_batches(batch_size=min(rows, 10000)):
+        batches.append(batch.slice(0, rows - collected))
+        collected += batches[-1].num_rows
+        if collected >= rows:
+            break
+    return pa.Table.from_batches(batches, schema=parquet.schema_arrow)
@@ -18,13 +18,17 @@ import json
 import re
 from typing import Optional, Dict, Any
 from metrics.base import *
-
-import requests
+from metrics.combined_analysis import combined_analysis, combined_analysis_enabled, combined_llm_request
+from metrics.llm_client import LLMRequest, cached_chat_completion
+from parsing.readme_parser import ReadmeParser
 
 from dotenv import load_dotenv
 load_dotenv()
 
 class PerformanceClaimsScore(Metric):
+    # bump whenever _create_prompt changes so cached LLM replies are not reused
+    PROMPT_VERSION = "performance-claims-v1"
+
     def __init__(self, asset):
         super().__init__(asset)
         self.llm_analysis: Optional[Dict[str, Any]] = None
@@ -74,10 +78,7 @@ class PerformanceClaimsScore(Metric):
                 
             # For HuggingFace models, try to get README from model card
             if 'huggingface.co' in self.url:
-                readme_url = f"{self.url}/raw/main/README.md"
-                response = requests.get(readme_url)
-                if response.status_code == 200:
-                    return response.text
+                return ReadmeParser.fetch_readme(self.url)
             
             return None
         except Exception:
@@ -85,38 +86,37 @@ class PerformanceClaimsScore(Metric):
 
     def _analyze_with_llm(self, readme: str) -> float:
         try:  
-            
-            prompt = self._create_prompt(readme)
+            if combined_analysis_enabled():
+                # one shared request answers license, documentation and performance claims
+                analysis = combined_analysis.section("performance_claims", self.api_key, readme)
+                if not analysis:
+                    self.llm_analysis = None
+                    return 0.0
+                return self._score_analysis(analysis)
             
             # calls PurdueGenAI Studio API
-            url = "https://genai.rcac.purdue.edu/api/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json" 
-            }
-            body = {
-                "model": "llama3.1:latest",
-                "messages": [
-                    {"role": "system", "content": "You are a ML researcher analyzing model documentation for benchmark evidence and credibility."},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.1, # controls randomness in model's output
-                "max_tokens": 1000, # sets max number of tokens model can generate in response
-                "stream": False # gets full response at once. do not print intermediate results
-            }
-            
-            response = requests.post(url, headers=headers, json=body)
-            
-            if response.status_code != 200:
-                raise Exception(f"PurdueGenAI API Error: {response.status_code}, {response.text}")
-            
-            response_data = response.json()
-            analysis_text = response_data['choices'][0]['message']['content']
+            analysis_text = cached_chat_completion(self.api_key, self._llm_request(readme), readme)
             return self._parse_llm_response(analysis_text)
             
         except Exception as e:
             raise RuntimeError(f"LLM analysis failed: {str(e)}")
     
+    def _llm_request(self, readme: str) -> LLMRequest:
+        # the request _analyze_with_llm sends, also used to prefetch the reply asynchronously
+        if combined_analysis_enabled():
+            return combined_llm_request(readme)
+        return LLMRequest(
+            "You are a ML researcher analyzing model documentation for benchmark evidence and credibility.",
+            self._create_prompt(readme),
+            self.PROMPT_VERSION
+        )
+
+    async def _prefetch_async(self, fetcher) -> None:
+        # downloads the README and the LLM reply without blocking, so calculate() only reads caches
+        readme = await fetcher.fetch_readme(self.url)
+        if readme and self._setup_purdue_genai():
+            await fetcher.cached_chat_completion(self.api_key, self._llm_request(readme), readme)
+
     def _create_prompt(self, readme: str) -> str:
         return f"""You are analyzing a machine learning model's README documentation. Analyze the following README for benchmark evidence and performance claims credibility.
 
@@ -152,6 +152,15 @@ Respond in this exact JSON format. Do not deviate from this format. Do not retur
                 return 0.0
             
             analysis = json.loads(json_match.group())
+            return self._score_analysis(analysis)
+            
+        except Exception:
+            self.llm_analysis = None
+            return 0.0
+
+    def _score_analysis(self, analysis: Dict[str, Any]) -> float:
+        # weighted score from the four benchmark criteria
+        try:
             self.llm_analysis = analysis
             
             score = (
@@ -159,7 +168,7 @@ Respond in this exact JSON format. Do not deviate from this format. Do not retur
             )
  
             return score
-            
+
         except Exception:
             self.llm_analysis = None
             return 0.0
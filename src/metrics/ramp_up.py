@@ -11,6 +11,7 @@ import logging
 import time
 from typing import Optional
 from metrics.base import *
+from parsing.readme_parser import ReadmeParser
 
 class RampUpScore(Metric):
     def calculate(self) -> float:
@@ -46,11 +47,7 @@ class RampUpScore(Metric):
         try:
             # For HuggingFace models, try to get README from model card
             if 'huggingface.co' in self.url:
-                readme_url = f"{self.url}/raw/main/README.md"
-                import requests
-                response = requests.get(readme_url)
-                if response.status_code == 200:
-                    return response.text
+                return ReadmeParser.fetch_readme(self.url)
             
             return None
         except Exception:
@@ -58,6 +55,11 @@ class RampUpScore(Metric):
             return None
         
         
+    async def _prefetch_async(self, fetcher) -> None:
+        # downloads the README without blocking, so calculate() only reads the README store
+        if 'huggingface.co' in self.url:
+            await fetcher.fetch_readme(self.url)
+
     def _analyze_instruction_quality(self, readme: str) -> float:
             # Calculates documentation quality based on installation keywords
             if not readme:
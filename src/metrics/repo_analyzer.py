@@ -0,0 +1,597 @@
+# --------------------------------------Info--------------------------------------
+# Input: Path to a checked out repository
+# Output: RepoStats with line, function, long-function and style violation counts of the
+# sampled Python files
+# Description: Single-pass source analysis for CodeQuality. The repository is walked once,
+# one seeded sample of its Python files is drawn, and each sampled file is read and parsed
+# once to produce every statistic, so all of them describe the same files. Style is checked
+# in-process with pycodestyle and pyflakes (the checks flake8 runs), pyflakes reusing the
+# parsed tree. Results of files whose git blob was analyzed before come from the analysis
+# cache instead. With source='objects' the files are listed with git ls-tree and read from
+# the git object database through one persistent git cat-file --batch process, so the clone
+# needs no checkout. With sample_size='adaptive' randomly ordered files are analyzed until the
+# confidence intervals of the long-function ratio and the violation rate are narrower than
+# the tolerances (or the deadline passes); every result reports its sample size and
+# intervals. analyze_archive reads a tar stream instead (see tarball_source.py),
+# sampling and analyzing members as they arrive; adaptive sampling waits for the whole stream
+# since an archive is in path order. With workers > 1 the files (or archive members) are split
+# into chunks analyzed by a shared process pool, which is fast enough to cover a whole
+# repository (sample_size=None) within CodeQuality's time budget.
+# How to use: RepositoryAnalyzer(max_function_lines=50).analyze(repo_path, deadline)
+#             RepositoryAnalyzer(sample_size=None, workers=4).analyze(repo_path, deadline)
+#             RepositoryAnalyzer(source='objects').analyze(repo_path, deadline)
+#             RepositoryAnalyzer(sample_size='adaptive', tolerance=0.05).analyze(repo_path, deadline)
+#  ---------------------------------------------------------------------------------
+
+import ast
+import hashlib
+import io
+import logging
+import math
+import multiprocessing
+import os
+import random
+import tarfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import IO, TYPE_CHECKING, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import git
+import pycodestyle
+import pyflakes.checker
+
+from parallel.deadline import Deadline
+
+if TYPE_CHECKING:
+    from metrics.analysis_cache import AnalysisCache
+
+# the flake8 settings CodeQuality used to run with
+STYLE_IGNORE = ['E501', 'W503', 'E203']
+STYLE_MAX_LINE_LENGTH = 100
+
+
+class FileStats(NamedTuple):
+    lines: int
+    functions: int
+    long_functions: int
+    violations: int # pycodestyle and pyflakes findings
+    parsed: bool # False for files with syntax errors, which only count towards lines and violations
+
+
+class RepoStats(NamedTuple):
+    files: List[str] # the sampled files, relative to the repository root
+    files_analyzed: int
+    lines: int
+    functions: int
+    long_functions: int
+    violations: int
+    file_violations: Dict[str, int] # per analyzed file
+    complete: bool # False when the deadline cut the analysis short
+    # confidence interval half-widths of long_functions / functions and violations / lines,
+    # None until two files with functions (lines) are analyzed
+    long_function_margin: Optional[float] = None
+    violation_margin: Optional[float] = None
+
+
+class RatioEstimate:
+    '''
+    Running ratio estimate sum(x) / sum(y) over files sampled at random, with the normal
+    approximation confidence interval of a ratio estimator (files are the sampled units, so
+    functions or lines of one file are not treated as independent).
+    '''
+    def __init__(self):
+        self.n = 0
+        self.x = self.y = self.xx = self.yy = self.xy = 0.0
+
+    def add(self, x: float, y: float) -> None:
+        if y == 0:
+            return # files without functions (lines) say nothing about the ratio
+        self.n += 1
+        self.x += x
+        self.y += y
+        self.xx += x * x
+        self.yy += y * y
+        self.xy += x * y
+
+    def margin(self, z: float) -> Optional[float]:
+        if self.n < 2:
+            return None
+        ratio = self.x / self.y
+        residuals = max(self.xx - 2 * ratio * self.xy + ratio * ratio * self.yy, 0.0) / (self.n - 1)
+        return z * math.sqrt(residuals / self.n) / (self.y / self.n)
+
+
+_style_options = None
+
+
+def style_violations(content: str, tree: Optional[ast.AST]) -> int:
+    # pycodestyle on the lines, pyflakes on the already parsed tree (a syntax error counts once, like flake8's E999)
+    global _style_options
+    if _style_options is None:
+        _style_options = pycodestyle.StyleGuide(quiet=True, ignore=STYLE_IGNORE,
+                                                max_line_length=STYLE_MAX_LINE_LENGTH).options
+    checker = pycodestyle.Checker(lines=io.StringIO(content).readlines(), options=_style_options,
+                                  report=pycodestyle.BaseReport(_style_options))
+    violations = checker.check_all()
+    if tree is None:
+        return violations + 1
+    return violations + len(pyflakes.checker.Checker(tree).messages)
+
+
+def analyze_source(content: str, max_function_lines: int) -> FileStats:
+    lines = len(content.splitlines())
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return FileStats(lines, 0, 0, style_violations(content, None), False)
+
+    functions = 0
+    long_functions = 0
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions += 1
+            if node.end_lineno and node.end_lineno - node.lineno > max_function_lines:
+                long_functions += 1
+    return FileStats(lines, functions, long_functions, style_violations(content, tree), True)
+
+
+def decode_source(data: bytes) -> Optional[str]:
+    # universal newlines, like reading a checked out file in text mode
+    try:
+        return data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+    except UnicodeDecodeError:
+        return None
+
+
+def git_blob_sha(data: bytes) -> str:
+    # the SHA git gives a blob with this content, so archive members share analysis cache keys with clones
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+def read_sources(repo_path: str, relative_paths: Sequence[str],
+                 blobs: Optional[Dict[str, str]] = None) -> Iterator[Tuple[str, Optional[str]]]:
+    '''
+    Yields (relative path, content) of each file, content None when it cannot be read as UTF-8.
+
+    Files are read from the working tree, or when blobs (relative path -> blob SHA) is given
+    from the object database through the single persistent git cat-file --batch process of
+    one git.Git instance, which is stopped once the generator is done.
+    '''
+    if blobs is None:
+        for relative_path in relative_paths:
+            try:
+                with open(os.path.join(repo_path, relative_path), 'r', encoding='utf-8') as f:
+                    yield relative_path, f.read()
+            except (UnicodeDecodeError, OSError):
+                yield relative_path, None
+        return
+
+    objects = git.Git(repo_path)
+    try:
+        for relative_path in relative_paths:
+            try:
+                _, _, _, data = objects.get_object_data(blobs[relative_path])
+            except (ValueError, git.exc.GitCommandError, OSError):
+                yield relative_path, None
+                continue
+            yield relative_path, decode_source(data)
+    finally:
+        objects.clear_cache()
+
+
+def analyze_files(repo_path: str, relative_paths: Sequence[str], max_function_lines: int,
+                  blobs: Optional[Dict[str, str]] = None, deadline: Optional[Deadline] = None) -> tuple:
+    '''
+    Returns the stats of the readable files and whether all of them were analyzed: once the
+    deadline passes it stops between files. Also the work unit of the process pool, so it must
+    stay a module level function (the deadline is pickled along, see deadline.py).
+    '''
+    results = []
+    sources = read_sources(repo_path, relative_paths, blobs)
+    try:
+        for relative_path, content in sources:
+            if deadline and deadline.expired():
+                return results, False
+            if content is not None:
+                results.append((relative_path, analyze_source(content, max_function_lines)))
+    finally:
+        sources.close()
+    return results, True
+
+
+def analyze_contents(contents: Sequence[Tuple[str, bytes]], max_function_lines: int,
+                     deadline: Optional[Deadline] = None) -> tuple:
+    # analyze_files for file contents already in memory (archive members)
+    results = []
+    for path, data in contents:
+        if deadline and deadline.expired():
+            return results, False
+        content = decode_source(data)
+        if content is not None:
+            results.append((path, analyze_source(content, max_function_lines)))
+    return results, True
+
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pool_lock = threading.Lock()
+
+
+def analysis_pool(workers: int) -> ProcessPoolExecutor:
+    '''
+    Process pool shared by every analyzer in this process, so workers are started once rather
+    than per repository. There is one pool per worker count, so an analyzer asking for another
+    count never shuts down a pool other threads have work in. Workers are spawned, not forked:
+    the metrics run on threads and forking a multi-threaded process can deadlock the child.
+    '''
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+        return pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    # drops a broken pool, the next analysis_pool call starts a new one
+    with _pool_lock:
+        for workers, shared in list(_pools.items()):
+            if shared is pool:
+                del _pools[workers]
+    pool.shutdown(wait=False)
+
+
+def blob_shas(repo_path: str) -> Dict[str, str]:
+    # relative path -> git blob SHA of every file committed at HEAD, empty outside a git checkout
+    if not os.path.exists(os.path.join(repo_path, '.git')):
+        return {}
+    try:
+        output = git.Git(repo_path).ls_tree('-r', '-z', 'HEAD')
+    except (git.exc.GitCommandError, OSError):
+        return {}
+    shas = {}
+    for entry in output.split('\0'):
+        if entry:
+            info, path = entry.split('\t', 1)
+            mode, kind, sha = info.split()
+            if kind == 'blob' and mode != '120000': # symlinks are read through, not as their own blob
+                shas[os.path.normpath(path)] = sha
+    return shas
+
+
+class RepositoryAnalyzer:
+    def __init__(self, max_function_lines: int = 50, sample_size: Union[int, str, None] = 50, seed: int = 0,
+                 workers: int = 1, chunk_size: int = 32, cache: Optional["AnalysisCache"] = None,
+                 source: str = 'worktree', tolerance: float = 0.05, violation_tolerance: Optional[float] = None,
+                 z: float = 1.96, min_files: int = 10):
+        if source not in ('worktree', 'objects'):
+            raise ValueError(f"Unknown analysis source: {source}")
+        if isinstance(sample_size, str) and sample_size != 'adaptive':
+            raise ValueError(f"Unknown sample size: {sample_size}")
+        self.max_function_lines = max_function_lines
+        self.source = source # 'worktree' reads checked out files, 'objects' the blobs committed at HEAD
+        self.cache = cache # per-file results keyed by blob SHA, see analysis_cache.py
+        self.sample_size = sample_size # None analyzes every file
+        self.seed = seed # the same repository always yields the same sample
+        self.workers = workers
+        self.chunk_size = chunk_size # files per process pool work unit
+        # adaptive sampling stops once both interval half-widths are below their tolerance
+        self.tolerance = tolerance # of the long-function ratio
+        self.violation_tolerance = tolerance if violation_tolerance is None else violation_tolerance
+        self.z = z # 1.96 for 95% intervals
+        self.min_files = min_files # analyzed before the intervals are trusted, a few alike files give a zero-width one
+
+    def python_files(self, repo_path: str, blobs: Optional[Dict[str, str]] = None) -> List[str]:
+        # one walk of the tree (or of the ls-tree listing), sorted so the seeded sample does not
+        # depend on directory order
+        if blobs is not None:
+            return sorted(path for path in blobs if path.endswith('.py'))
+        files = []
+        for root, dirs, names in os.walk(repo_path):
+            dirs[:] = [d for d in dirs if d != '.git']
+            for name in names:
+                if name.endswith('.py'):
+                    files.append(os.path.relpath(os.path.join(root, name), repo_path))
+        return sorted(files)
+
+    def sample(self, files: List[str]) -> List[str]:
+        if self.sample_size == 'adaptive':
+            # every file in a seeded random order, analyzed until the estimates are precise enough
+            return random.Random(self.seed).sample(files, len(files))
+        if self.sample_size is None or len(files) <= self.sample_size:
+            return files
+        return random.Random(self.seed).sample(files, self.sample_size)
+
+    def analyze(self, repo_path: str, deadline: Optional[Deadline] = None) -> RepoStats:
+        '''
+        Reads and parses each sampled file once, skipping files whose blob is already in the
+        cache. Stops early once the deadline passes and reports what it finished.
+        '''
+        if self.sample_size == 'adaptive':
+            return self._analyze_adaptive(repo_path, deadline)
+        caching = self.cache is not None and self.cache.enabled
+        shas = blob_shas(repo_path) if caching or self.source == 'objects' else {}
+        blobs = shas if self.source == 'objects' else None
+        files = self.sample(self.python_files(repo_path, blobs))
+        keys = self._cache_keys(shas, files) if caching else {}
+        cached = self.cache.get_many(keys.values()) if keys else {}
+        results = [(path, cached[keys[path]]) for path in files if keys.get(path) in cached]
+        pending = [path for path in files if keys.get(path) not in cached]
+
+        new_results, complete = None, True
+        if self.workers > 1 and len(pending) > self.chunk_size:
+            pool = analysis_pool(self.workers)
+            try:
+                new_results, complete = self._analyze_parallel(pool, repo_path, pending, blobs, deadline)
+            except BrokenProcessPool:
+                logging.info("Analysis process pool broke, analyzing in this process instead")
+                _discard_pool(pool)
+        if new_results is None:
+            new_results, complete = analyze_files(repo_path, pending, self.max_function_lines, blobs, deadline)
+
+        if self.cache and keys:
+            self.cache.put_many({keys[path]: stats for path, stats in new_results if path in keys})
+        return self._merge(files, results + new_results, complete)
+
+    def analyze_archive(self, fileobj: IO[bytes], deadline: Optional[Deadline] = None) -> Tuple[RepoStats, Optional[int]]:
+        '''
+        Analyzes the Python files of a tar(.gz) stream read front to back, so nothing touches the
+        disk. A seeded reservoir sample of sample_size members is kept while the stream arrives
+        and analyzed at its end; with sample_size=None members are analyzed in chunks as they
+        arrive, by the process pool while the rest downloads when workers > 1. With
+        sample_size='adaptive' the members are held in memory and analyzed in a seeded random
+        order once the stream ends, stopping as in analyze. Member paths drop the archive's top
+        directory. Also returns the newest member mtime, which is the commit time in GitHub archives.
+        '''
+        rng = random.Random(self.seed)
+        reservoir: List[Tuple[str, bytes]] = []
+        members: List[Tuple[str, bytes]] = []
+        chunks = _ArchiveChunks(self, self.workers > 1 and self.sample_size != 'adaptive', deadline)
+        files: List[str] = []
+        pending: List[Tuple[str, bytes]] = []
+        seen = 0
+        newest = None
+        complete = True
+
+        with tarfile.open(fileobj=fileobj, mode='r|*') as archive:
+            for member in archive:
+                if deadline and deadline.expired():
+                    complete = False
+                    break
+                newest = max(newest or 0, int(member.mtime))
+                path = os.path.normpath(member.name.partition('/')[2])
+                if not member.isfile() or not path.endswith('.py'):
+                    continue
+                data = archive.extractfile(member).read()
+
+                if self.sample_size == 'adaptive':
+                    # an archive arrives in path order, not at random, so it is read whole
+                    members.append((path, data))
+                elif self.sample_size is None:
+                    files.append(path)
+                    pending.append((path, data))
+                    if len(pending) >= self.chunk_size:
+                        chunks.add(pending)
+                        pending = []
+                elif seen < self.sample_size:
+                    reservoir.append((path, data))
+                else:
+                    slot = rng.randint(0, seen)
+                    if slot < self.sample_size:
+                        reservoir[slot] = (path, data)
+                seen += 1
+
+        if self.sample_size == 'adaptive':
+            stats = self._analyze_adaptive_contents(members, deadline)
+            return stats._replace(complete=stats.complete and complete), newest
+        if self.sample_size is not None:
+            reservoir.sort()
+            files = [path for path, _ in reservoir]
+            pending = []
+            for i in range(0, len(reservoir), self.chunk_size):
+                chunks.add(reservoir[i:i + self.chunk_size])
+        chunks.add(pending)
+        results, finished = chunks.results()
+        return self._merge(sorted(files), results, complete and finished), newest
+
+    def _analyze_adaptive(self, repo_path: str, deadline: Optional[Deadline]) -> RepoStats:
+        # sequential on purpose: each file's result decides whether the next one is needed
+        caching = self.cache is not None and self.cache.enabled
+        shas = blob_shas(repo_path) if caching or self.source == 'objects' else {}
+        blobs = shas if self.source == 'objects' else None
+        order = self.sample(self.python_files(repo_path, blobs))
+        keys = self._cache_keys(shas, order) if caching else {}
+        cached = self.cache.get_many(keys.values()) if keys else {}
+        sources = read_sources(repo_path, [path for path in order if keys.get(path) not in cached], blobs)
+
+        long_functions, violations = RatioEstimate(), RatioEstimate()
+        visited: List[str] = []
+        results: List[Tuple[str, FileStats]] = []
+        new_results: Dict[str, FileStats] = {}
+        complete = True
+        try:
+            for path in order:
+                if deadline and deadline.expired():
+                    complete = False
+                    break
+                if self._precise_enough(len(visited), long_functions, violations):
+                    break
+                visited.append(path)
+                if keys.get(path) in cached:
+                    stats = cached[keys[path]]
+                else:
+                    _, content = next(sources) # the sources follow the same order
+                    if content is None:
+                        continue
+                    stats = new_results[path] = analyze_source(content, self.max_function_lines)
+                results.append((path, stats))
+                long_functions.add(stats.long_functions, stats.functions)
+                violations.add(stats.violations, stats.lines)
+        finally:
+            sources.close()
+
+        if keys:
+            self.cache.put_many({keys[path]: stats for path, stats in new_results.items() if path in keys})
+        logging.debug(f"Adaptive sampling analyzed {len(visited)} of {len(order)} Python files")
+        return self._merge(visited, results, complete)
+
+    def _analyze_adaptive_contents(self, contents: List[Tuple[str, bytes]], deadline: Optional[Deadline]) -> RepoStats:
+        # _analyze_adaptive for file contents already in memory, visited in the same seeded order
+        data = dict(contents)
+        order = self.sample(sorted(data))
+        keys = self._cache_keys({path: git_blob_sha(data[path]) for path in order}, order) \
+            if self.cache is not None and self.cache.enabled else {}
+        cached = self.cache.get_many(keys.values()) if keys else {}
+
+        long_functions, violations = RatioEstimate(), RatioEstimate()
+        visited: List[str] = []
+        results: List[Tuple[str, FileStats]] = []
+        new_results: Dict[str, FileStats] = {}
+        complete = True
+        for path in order:
+            if deadline and deadline.expired():
+                complete = False
+                break
+            if self._precise_enough(len(visited), long_functions, violations):
+                break
+            visited.append(path)
+            if keys.get(path) in cached:
+                stats = cached[keys[path]]
+            else:
+                content = decode_source(data[path])
+                if content is None:
+                    continue
+                stats = new_results[path] = analyze_source(content, self.max_function_lines)
+            results.append((path, stats))
+            long_functions.add(stats.long_functions, stats.functions)
+            violations.add(stats.violations, stats.lines)
+
+        if keys:
+            self.cache.put_many({keys[path]: stats for path, stats in new_results.items() if path in keys})
+        logging.debug(f"Adaptive sampling analyzed {len(visited)} of {len(order)} archived Python files")
+        return self._merge(visited, results, complete)
+
+    def _precise_enough(self, visited: int, long_functions: RatioEstimate, violations: RatioEstimate) -> bool:
+        return (visited >= self.min_files and self._within(long_functions, self.tolerance)
+                and self._within(violations, self.violation_tolerance))
+
+    def _within(self, estimate: RatioEstimate, tolerance: float) -> bool:
+        # a ratio without any data (e.g. a repository without functions) does not hold the sampling up
+        margin = estimate.margin(self.z)
+        return estimate.n == 0 or margin is not None and margin <= tolerance
+
+    def _lookup_contents(self, contents: List[Tuple[str, bytes]]) -> tuple:
+        # splits file contents already in memory into cached results and the ones left to analyze
+        shas = {path: git_blob_sha(data) for path, data in contents}
+        keys = self._cache_keys(shas, list(shas)) if self.cache is not None and self.cache.enabled else {}
+        cached = self.cache.get_many(keys.values()) if keys else {}
+        results = [(path, cached[keys[path]]) for path, _ in contents if keys.get(path) in cached]
+        pending = [(path, data) for path, data in contents if keys.get(path) not in cached]
+        return results, pending, keys
+
+    def _store_contents(self, keys: Dict[str, str], results: List[Tuple[str, FileStats]]) -> None:
+        if keys:
+            self.cache.put_many({keys[path]: stats for path, stats in results if path in keys})
+
+    def _analyze_parallel(self, pool: ProcessPoolExecutor, repo_path: str, files: List[str],
+                          blobs: Optional[Dict[str, str]], deadline: Optional[Deadline]) -> tuple:
+        chunks = [files[i:i + self.chunk_size] for i in range(0, len(files), self.chunk_size)]
+        # shuffled so that a run cut short by the deadline still covers a random part of the repository
+        random.Random(self.seed).shuffle(chunks)
+
+        # chunks still queued at the deadline are cancelled, running ones stop at their next file
+        futures = [pool.submit(analyze_files, repo_path, chunk, self.max_function_lines,
+                               {path: blobs[path] for path in chunk} if blobs is not None else None, deadline)
+                   for chunk in chunks]
+        done, not_done = wait(futures, timeout=deadline.remaining() if deadline else None)
+        for future in not_done:
+            future.cancel()
+
+        results, complete = [], not not_done
+        for future in done:
+            chunk_results, finished = future.result()
+            results.extend(chunk_results)
+            complete = complete and finished
+        return results, complete
+
+    def _cache_keys(self, shas: Dict[str, str], files: List[str]) -> Dict[str, str]:
+        # relative path -> cache key, for the files git knows the blob of
+        # results depend on the analysis settings and checker versions as well as the content
+        settings = f"{self.max_function_lines}:{pycodestyle.__version__}:{pyflakes.__version__}"
+        return {path: f"{shas[path]}:{settings}" for path in files if path in shas}
+
+    def _merge(self, files: List[str], results: List[Tuple[str, FileStats]], complete: bool) -> RepoStats:
+        long_functions, violations = RatioEstimate(), RatioEstimate()
+        for _, r in results:
+            long_functions.add(r.long_functions, r.functions)
+            violations.add(r.violations, r.lines)
+        return RepoStats(
+            files=files,
+            files_analyzed=len(results),
+            lines=sum(r.lines for _, r in results),
+            functions=sum(r.functions for _, r in results),
+            long_functions=sum(r.long_functions for _, r in results),
+            violations=sum(r.violations for _, r in results),
+            file_violations={path: r.violations for path, r in results},
+            complete=complete,
+            long_function_margin=long_functions.margin(self.z),
+            violation_margin=violations.margin(self.z)
+        )
+
+
+class _ArchiveChunks:
+    # chunks of archive members, analyzed in this process or submitted to the process pool as they arrive
+
+    def __init__(self, analyzer: RepositoryAnalyzer, parallel: bool, deadline: Optional[Deadline]):
+        self.analyzer = analyzer
+        self.pool = analysis_pool(analyzer.workers) if parallel else None
+        self.deadline = deadline
+        self.done: List[Tuple[str, FileStats]] = []
+        self.complete = True
+        self.submitted: list = [] # (future, contents, cache keys)
+
+    def add(self, contents: List[Tuple[str, bytes]]) -> None:
+        if not contents:
+            return
+        results, pending, keys = self.analyzer._lookup_contents(contents)
+        self.done.extend(results)
+        if not pending:
+            return
+        if self.pool is not None:
+            try:
+                future = self.pool.submit(analyze_contents, pending, self.analyzer.max_function_lines, self.deadline)
+                self.submitted.append((future, pending, keys))
+                return
+            except BrokenProcessPool:
+                self._broken()
+        self._finish(keys, analyze_contents(pending, self.analyzer.max_function_lines, self.deadline))
+
+    def results(self) -> tuple:
+        # waits for the submitted chunks until the deadline, returns the results and whether all finished
+        if self.submitted:
+            done, not_done = wait([future for future, _, _ in self.submitted],
+                                  timeout=self.deadline.remaining() if self.deadline else None)
+            for future in not_done:
+                future.cancel()
+            self.complete = self.complete and not not_done
+            for future, pending, keys in self.submitted:
+                if future not in done:
+                    continue
+                try:
+                    self._finish(keys, future.result())
+                except BrokenProcessPool:
+                    self._broken()
+                    self._finish(keys, analyze_contents(pending, self.analyzer.max_function_lines, self.deadline))
+        return self.done, self.complete
+
+    def _finish(self, keys: Dict[str, str], analyzed: tuple) -> None:
+        results, finished = analyzed
+        self.analyzer._store_contents(keys, results)
+        self.done.extend(results)
+        self.complete = self.complete and finished
+
+    def _broken(self) -> None:
+        if self.pool is not None:
+            logging.info("Analysis process pool broke, analyzing in this process instead")
+            _discard_pool(self.pool)
+            self.pool = None
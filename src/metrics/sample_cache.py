@@ -0,0 +1,168 @@
+# --------------------------------------Info--------------------------------------
+# Input: Dataset id, config, split and revision, with the streamed row sample or config list
+# Output: The cached sample (memory-mapped, zero-copy) or config list, or None on a miss
+# Description: Persistent on-disk cache in front of the streaming path of DatasetQualityMetric.
+# Each sample is one Arrow IPC file keyed by dataset id, config, split and the dataset's
+# revision (commit SHA), so models sharing a dataset like allenai/c4 stream it once; later
+# runs memory-map the file instead of downloading again. The config names of a revision are
+# kept next to the samples. Entries expire after a TTL and the least recently used samples are
+# evicted once the cache grows past its size budget. Files are written to a temporary name
+# and renamed, so parallel worker processes never read a partial sample.
+# How to use: Configure with DATASET_CACHE_DIR, DATASET_CACHE_TTL_SECONDS (0 disables the
+# cache) and DATASET_CACHE_MAX_MB in the .env file.
+#  ---------------------------------------------------------------------------------
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import pyarrow as pa
+
+from metrics.cache_dir import cache_dir
+
+
+class SampleCache:
+    def __init__(self, root: Path, ttl_seconds: float, max_bytes: int):
+        self.root = Path(root)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_env(cls) -> "SampleCache":
+        path = os.getenv('DATASET_CACHE_DIR') or cache_dir('datasets')
+        ttl = float(os.getenv('DATASET_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+        max_mb = int(os.getenv('DATASET_CACHE_MAX_MB', 1024))
+        return cls(Path(path).expanduser(), ttl, max_mb * 1024 * 1024)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_bytes > 0
+
+    @staticmethod
+    def make_key(*parts: Optional[str]) -> str:
+        return hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+    def get_sample(self, dataset_id: str, config: Optional[str], split: str, revision: str) -> Optional[pa.Table]:
+        # the returned table's buffers point into the mapped file, nothing is copied or decoded
+        path = self._fresh(self._sample_path(dataset_id, config, split, revision))
+        if path is None:
+            return None
+        try:
+            with pa.memory_map(str(path), 'r') as source:
+                table = pa.ipc.open_file(source).read_all()
+        except (OSError, pa.ArrowInvalid) as e:
+            logging.info(f"Dataset sample cache read failed: {e}")
+            return None
+        logging.debug(f"Dataset sample of {dataset_id} memory-mapped from {path}")
+        return table
+
+    def put_sample(self, dataset_id: str, config: Optional[str], split: str, revision: str, table: pa.Table) -> None:
+        if not self.enabled:
+            return
+        path = self._sample_path(dataset_id, config, split, revision)
+        try:
+            self._write(path, lambda f: self._write_ipc(f, table))
+            self._evict()
+        except (OSError, pa.ArrowException) as e:
+            logging.info(f"Dataset sample cache write failed: {e}")
+
+    def get_configs(self, dataset_id: str, revision: str) -> Optional[List[str]]:
+        path = self._fresh(self._configs_path(dataset_id, revision))
+        if path is None:
+            return None
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            logging.info(f"Dataset config cache read failed: {e}")
+            return None
+
+    def put_configs(self, dataset_id: str, revision: str, configs: List[str]) -> None:
+        if not self.enabled:
+            return
+        try:
+            self._write(self._configs_path(dataset_id, revision), lambda f: f.write(json.dumps(configs).encode('utf-8')))
+        except OSError as e:
+            logging.info(f"Dataset config cache write failed: {e}")
+
+    def _sample_path(self, dataset_id: str, config: Optional[str], split: str, revision: str) -> Path:
+        return self.root / 'samples' / f"{self.make_key(dataset_id, config, split, revision)}.arrow"
+
+    def _configs_path(self, dataset_id: str, revision: str) -> Path:
+        return self.root / 'configs' / f"{self.make_key(dataset_id, revision)}.json"
+
+    def _fresh(self, path: Path) -> Optional[Path]:
+        # the file's mtime is when it was written, its atime when it was last used
+        if not self.enabled:
+            return None
+        try:
+            written = path.stat().st_mtime
+            now = time.time()
+            if now - written > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                return None
+            os.utime(path, (now, written))
+        except OSError:
+            return None
+        return path
+
+    @staticmethod
+    def _write(path: Path, write) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(temp, path)
+        except BaseException:
+            Path(temp).unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def _write_ipc(f, table: pa.Table) -> None:
+        with pa.ipc.new_file(f, table.schema) as writer:
+            writer.write_table(table)
+
+    def _evict(self) -> None:
+        # drop expired samples, then the least recently used ones beyond max_bytes
+        now = time.time()
+        entries = []
+        for path in (self.root / 'samples').glob('*.arrow'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((stat.st_atime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue # still mapped by a reader on platforms that lock open files
+            total -= size
+        for path in (self.root / 'configs').glob('*.json'):
+            try:
+                if now - path.stat().st_mtime > self.ttl_seconds:
+                    path.unlink(missing_ok=True)
+            except OSError:
+                continue
+
+
+_default_cache: Optional[SampleCache] = None
+
+
+def default_sample_cache() -> SampleCache:
+    # created on first use so the .env file has been loaded by then
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SampleCache.from_env()
+    return _default_cache
@@ -0,0 +1,204 @@
+# --------------------------------------Info--------------------------------------
+# Input: The Parquet files of a dataset, or a streamed (iterable) Hugging Face dataset
+# Output: pyarrow Table with a random sample of its rows
+# Description: Shard sampler for DatasetQualityMetric. Instead of the first rows of the first
+# shard (slow when that shard is huge, biased when the data is sorted), the sample is drawn
+# from several randomly chosen shards, each read only until it has contributed its share of
+# rows; open_shards of them are read at once on threads. In a Parquet file the share is spread
+# over randomly chosen row groups, each read from a random offset, so it comes from all over
+# the shard; Parquet is decoded batch_rows rows at a time in a buffered stream, which bounds
+# the decode memory of every open shard. A streamed dataset cannot seek, so each of its shards
+# is read from the start. Every row read gets a random key and the rows with the smallest keys
+# are kept (bottom-k sampling), which is a uniform sample of everything read. Kept rows are
+# copied out of the decoded batches so those are freed right away, compacted as the sample
+# grows, and shrunk to stay under a memory cap. Decoding and copies use a jemalloc pool (see
+# sample_memory_pool), which hands memory freed on one shard's thread back instead of keeping it.
+# How to use: ShardSampler(rows=10000, max_shards=8, open_shards=4).sample_parquet(paths_or_urls, open_file)
+#             ShardSampler(rows=10000, max_shards=8, open_shards=4).sample(ds)
+#  ---------------------------------------------------------------------------------
+
+import logging
+import math
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as pds
+import pyarrow.fs as pafs
+
+_KEY = '__sample_key' # column holding each candidate row's random key while sampling
+PARQUET_BUFFER_BYTES = 1024 * 1024 # column data is read in pieces of this size, not whole column chunks
+
+
+def sample_memory_pool() -> pa.MemoryPool:
+    '''
+    Arrow memory pool for the sampler's decoding and copies. mimalloc, Arrow's default on most
+    builds, keeps a heap per thread, so shards read on several threads each hold on to memory
+    the others freed, which can double peak RSS. jemalloc returns it instead; the system
+    allocator is used where pyarrow is built without it.
+    '''
+    try:
+        return pa.jemalloc_memory_pool()
+    except NotImplementedError:
+        return pa.system_memory_pool()
+
+
+class ShardSampler:
+    def __init__(self, rows: int = 10000, max_shards: int = 8, open_shards: int = 4, oversample: float = 1.5,
+                 max_bytes: int = 256 * 1024 * 1024, batch_rows: int = 1000, seed: int = 0):
+        self.rows = rows
+        self.max_shards = max_shards # shards the sample is drawn from
+        self.open_shards = open_shards # of those, shards read (and decoded) at once, each holding about one batch
+        self.oversample = oversample # rows read per row sampled, spread over the chosen shards
+        self.max_bytes = max_bytes # the sample holds fewer rows rather than grow past this
+        self.batch_rows = batch_rows
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._candidates: List[pa.Table] = []
+        self._candidate_rows = 0
+        self._threshold = math.inf # rows are candidates while their key is below this
+        self._limit = rows # lowered by the memory cap
+        self._pool = sample_memory_pool()
+
+    def sample(self, ds) -> pa.Table:
+        # a streamed dataset, each chosen shard read from its start
+        n_shards = getattr(ds, 'n_shards', 1) or 1
+        shard = lambda index: ds.shard(num_shards=n_shards, index=index) if n_shards > 1 else ds
+        return self._draw(n_shards, lambda index, quota: self._batches(shard(index)))
+
+    def sample_parquet(self, files: Sequence[Any], open_file: Optional[Callable[[Any], Any]] = None) -> pa.Table:
+        # one shard per Parquet file; open_file turns a file (e.g. a URL) into a file object, closed once read
+        def read(index: int, quota: int) -> Iterator[pa.Table]:
+            if open_file is None:
+                yield from self._parquet_batches(files[index], index, quota)
+                return
+            with open_file(files[index]) as source:
+                yield from self._parquet_batches(source, index, quota)
+        return self._draw(len(files), read)
+
+    def _draw(self, n_shards: int, read: Callable[[int, int], Iterator[pa.Table]]) -> pa.Table:
+        n_shards = max(1, n_shards)
+        chosen = sorted(random.Random(self.seed).sample(range(n_shards), min(self.max_shards, n_shards)))
+        quota = math.ceil(self.rows * self.oversample / len(chosen))
+        self._candidates, self._candidate_rows = [], 0
+        self._threshold, self._limit = math.inf, self.rows
+
+        def read_shard(index: int) -> None:
+            self._read_shard(read(index, quota), index, quota)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.open_shards, len(chosen)))) as pool:
+            # list() re-raises the first failure of any shard
+            list(pool.map(read_shard, chosen))
+
+        with self._lock:
+            self._compact()
+            # a column that is all null in one batch is typed null there, promote it to the other batches' type
+            sample = pa.concat_tables(self._candidates, promote_options='default', memory_pool=self._pool) \
+                if self._candidates else pa.table({})
+            self._candidates, self._candidate_rows = [], 0
+        logging.debug(f"Sampled {sample.num_rows} rows from {len(chosen)} of {n_shards} shards")
+        return sample.drop_columns([_KEY]) if _KEY in sample.column_names else sample
+
+    def _read_shard(self, batches: Iterator[pa.Table], index: int, quota: int) -> None:
+        rng = np.random.default_rng([self.seed, index]) # per shard, so thread timing does not change the sample
+        read = 0
+        for batch in batches:
+            batch = batch.slice(0, quota - read)
+            read += batch.num_rows
+            keys = rng.random(batch.num_rows)
+            with self._lock:
+                threshold = self._threshold
+            keep = np.flatnonzero(keys < threshold)
+            if len(keep):
+                # copied out of the batch, so the decoded data behind it is freed as the read moves on
+                rows = pc.take(batch, pa.array(keep), memory_pool=self._pool)
+                self._add(rows.append_column(_KEY, pa.array(keys[keep], memory_pool=self._pool)))
+            del batch
+            self._pool.release_unused() # the decoded batch is garbage now, hand it back to the OS
+            if read >= quota:
+                batches.close() # this shard's share is read, stop reading it
+                return
+
+    def _parquet_batches(self, source, index: int, quota: int) -> Iterator[pa.Table]:
+        # quota rows spread over random row groups, a window at a random offset of each
+        local = isinstance(source, (str, os.PathLike))
+        fragment = pds.ParquetFileFormat().make_fragment(source, filesystem=pafs.LocalFileSystem() if local else None)
+        fragment.ensure_complete_metadata()
+        rng = np.random.default_rng([self.seed, index, 1])
+        groups = [fragment.row_groups[int(i)] for i in rng.permutation(len(fragment.row_groups))]
+        groups = [group for group in groups if group.num_rows]
+        # every group read contributes at least a batch, unless the shard has fewer rows than that
+        share = math.ceil(quota / max(1, min(len(groups), math.ceil(quota / self.batch_rows))))
+        options = pds.ParquetFragmentScanOptions(use_buffered_stream=True, buffer_size=PARQUET_BUFFER_BYTES,
+                                                 pre_buffer=False)
+        read = 0
+        for group in groups:
+            window = min(group.num_rows, share, quota - read)
+            if window <= 0:
+                return
+            start = int(rng.integers(0, group.num_rows - window + 1))
+            position = 0
+            # decoded one batch at a time on this thread, nothing read ahead
+            batches = fragment.subset(row_group_ids=[group.id]).to_batches(
+                batch_size=self.batch_rows, batch_readahead=0, fragment_readahead=0, use_threads=False,
+                fragment_scan_options=options, memory_pool=self._pool)
+            for batch in batches:
+                # the rows before the window are decoded batch by batch and dropped
+                if position + batch.num_rows > start:
+                    offset = max(0, start - position)
+                    yield pa.Table.from_batches([batch.slice(offset, start + window - position - offset)])
+                position += batch.num_rows
+                if position >= start + window:
+                    break
+            read += window
+
+    def _batches(self, shard) -> Iterator[pa.Table]:
+        consumed = 0
+        try:
+            for table in shard.with_format('arrow').iter(batch_size=self.batch_rows):
+                consumed += table.num_rows
+                yield table
+        except pa.ArrowInvalid:
+            # examples generated in Python get a schema inferred per chunk, which can disagree between chunks
+            logging.debug("Streamed Arrow batches disagree on their schema, converting column batches instead")
+            for batch in shard.skip(consumed).iter(batch_size=self.batch_rows):
+                yield pa.Table.from_pydict(batch)
+
+    def _add(self, candidates: pa.Table) -> None:
+        with self._lock:
+            self._candidates.append(candidates)
+            self._candidate_rows += candidates.num_rows
+            if self._candidate_rows >= self._limit + self.batch_rows:
+                self._compact()
+                self._pool.release_unused() # hand the dropped candidates back to the OS
+
+    def _compact(self) -> None:
+        # keeps the candidates with the smallest keys, holding the lock
+        rows = self._candidate_rows
+        if not rows:
+            return
+        keys = np.concatenate([table.column(_KEY).to_numpy() for table in self._candidates])
+        nbytes = sum(table.nbytes for table in self._candidates)
+        limit = min(self._limit, rows)
+        if nbytes * limit / rows > self.max_bytes:
+            self._limit = limit = max(1, int(self.max_bytes * rows / nbytes))
+            logging.debug(f"Dataset sample capped at {self._limit} rows by its memory budget")
+        if limit < rows:
+            self._threshold = np.partition(keys, limit)[limit] # smallest key not kept
+
+        # each candidate table is filtered on its own and let go right after, so the candidates are
+        # never held twice (as when concatenating them); tables that lose no rows are not copied
+        candidates, self._candidates = self._candidates[::-1], []
+        while candidates:
+            table = candidates.pop()
+            keep = table.column(_KEY).to_numpy() < self._threshold
+            if keep.all():
+                self._candidates.append(table)
+            elif keep.any():
+                self._candidates.append(pc.filter(table, pa.array(keep), memory_pool=self._pool))
+        self._candidate_rows = sum(table.num_rows for table in self._candidates)
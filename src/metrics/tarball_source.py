@@ -0,0 +1,68 @@
+# --------------------------------------Info--------------------------------------
+# Input: GitHub repository URL and a RepositoryAnalyzer
+# Output: RepoStats of the repository's Python files and the time of the analyzed commit
+# Description: Alternative to cloning for CodeQuality, which only needs one snapshot of the
+# default branch. The archive tarball of the resolved branch is streamed from GitHub and
+# handed to RepositoryAnalyzer.analyze_archive, which filters and samples the .py members as
+# they arrive; nothing is written to disk.
+# How to use: Set CODE_QUALITY_SOURCE=tarball in the .env file, or call
+# fetch_tarball_stats(url, analyzer, deadline). GITHUB_ARCHIVE_URL points it at another host.
+#  ---------------------------------------------------------------------------------
+
+import logging
+import os
+import tarfile
+import urllib.parse
+from typing import NamedTuple, Optional
+
+import requests
+import urllib3
+
+from metrics.repo_analyzer import RepoStats, RepositoryAnalyzer
+from parallel import http_client
+from parallel.deadline import Deadline
+from parsing.ref_resolver import ref_resolver
+
+
+class TarballSnapshot(NamedTuple):
+    stats: RepoStats
+    committed_date: Optional[int] # unix time of the archived commit, None for an empty archive
+
+
+def github_tarball_url(repo_url: str, ref: str, archive_url: Optional[str] = None) -> Optional[str]:
+    # https://github.com/owner/repo(.git) -> <archive_url>/owner/repo/tar.gz/<ref>, None for other hosts
+    parsed = urllib.parse.urlparse(repo_url)
+    parts = parsed.path.strip('/').removesuffix('.git').split('/')
+    if parsed.netloc not in ('github.com', 'www.github.com') or len(parts) < 2:
+        return None
+    base = archive_url or os.getenv('GITHUB_ARCHIVE_URL', 'https://codeload.github.com')
+    return f"{base.rstrip('/')}/{parts[0]}/{parts[1]}/tar.gz/{urllib.parse.quote(ref, safe='')}"
+
+
+def fetch_tarball_stats(repo_url: str, analyzer: RepositoryAnalyzer, deadline: Deadline,
+                        archive_url: Optional[str] = None, ref: Optional[str] = None) -> Optional[TarballSnapshot]:
+    '''
+    Streams the archive of ref, by default repo_url's default branch (HEAD when it cannot be
+    resolved), through the analyzer. Returns None for non-GitHub URLs and failed or broken
+    downloads. Once the deadline passes the stream is dropped and the statistics of what
+    arrived are returned.
+    '''
+    if github_tarball_url(repo_url, 'HEAD', archive_url) is None:
+        return None
+    ref = ref or ref_resolver.default_branch(repo_url, timeout=deadline.remaining()) or 'HEAD'
+    url = github_tarball_url(repo_url, ref, archive_url)
+
+    try:
+        deadline.check("Tarball download")
+        # the timeout applies to every read of the stream, the deadline to the whole download
+        with http_client.get(url, stream=True, timeout=deadline.remaining()) as response:
+            if response.status_code != 200:
+                logging.info(f"Tarball download failed with HTTP {response.status_code}: {url}")
+                return None
+            response.raw.decode_content = True # undo a Content-Encoding, tarfile handles the gzip itself
+            stats, committed_date = analyzer.analyze_archive(response.raw, deadline)
+    except (requests.RequestException, urllib3.exceptions.HTTPError, tarfile.TarError, OSError) as e:
+        logging.info(f"Tarball download failed: {e}")
+        return None
+    logging.debug(f"Analyzed {stats.files_analyzed} Python files streamed from {url}")
+    return TarballSnapshot(stats, committed_date)
@@ -0,0 +1,2 @@
+from parallel.batch_runner import *
+from parallel.group_executor import *
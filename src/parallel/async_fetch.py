@@ -0,0 +1,229 @@
+# --------------------------------------Info--------------------------------------
+# Input: README URLs, commit endpoints and LLM requests
+# Output: The same data the blocking fetchers return, awaited from one asyncio event loop
+# Description: asyncio-native I/O layer built on aiohttp. One global semaphore per host bounds
+# how many requests are in flight against it, and failed requests are retried with the same
+# backoff rules as http_client. Results are written into the README store and the LLM cache,
+# so the blocking metric code that runs afterwards in an executor finds them there.
+# How to use: async with AsyncFetcher.from_env() as fetcher: await fetcher.fetch_readme(url)
+#  ---------------------------------------------------------------------------------
+
+import asyncio
+import json
+import logging
+import os
+import urllib.parse
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+import aiohttp
+from requests.utils import parse_header_links
+
+from metrics.commit_index import CommitRecord, github_commit_record, huggingface_commit_record
+from metrics.llm_cache import default_llm_cache
+from metrics.llm_client import (GENAI_URL, LLM_TIMEOUT, LLMRequest, cache_key, remember_response,
+                                request_body, request_headers)
+from parallel.http_client import RETRY_STATUSES, backoff_delay, parse_host_limits, retry_after_seconds
+from parsing.readme_parser import ReadmeParser, readme_store
+
+
+class FetchResponse(NamedTuple):
+    status: int
+    text: str
+    headers: Mapping[str, str] # case-insensitive
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+
+class AsyncFetcher:
+    def __init__(self, timeout: float = 10, max_retries: int = 3, host_limit: int = 8,
+                 host_limits: Optional[Dict[str, int]] = None, backoff_base: float = 0.5,
+                 backoff_max: float = 30, page_window: int = 4):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.host_limit = host_limit
+        self.host_limits = host_limits or {}
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.page_window = page_window # commit pages requested at once per repository
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._tasks: Dict[tuple, asyncio.Task] = {}
+
+    @classmethod
+    def from_env(cls) -> "AsyncFetcher":
+        # shares its configuration with the blocking http_client
+        return cls(
+            timeout=float(os.getenv('HTTP_TIMEOUT', 10)),
+            max_retries=int(os.getenv('HTTP_MAX_RETRIES', 3)),
+            host_limit=int(os.getenv('HTTP_HOST_LIMIT', 8)),
+            host_limits=parse_host_limits(os.getenv('HTTP_HOST_LIMITS', ''))
+        )
+
+    async def __aenter__(self) -> "AsyncFetcher":
+        self._session = aiohttp.ClientSession()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._session.close()
+
+    async def request(self, method: str, url: str, timeout: Optional[float] = None, **kwargs) -> FetchResponse:
+        '''
+        Sends one request under the host's semaphore, retrying 429/5xx responses and connection
+        errors. The last response is returned (or the last error raised) once retries run out.
+        '''
+        host = urllib.parse.urlparse(url).netloc
+        semaphore = self._semaphore(host)
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+
+        attempt = 0
+        while True:
+            try:
+                async with semaphore:
+                    async with self._session.request(method, url, timeout=client_timeout, **kwargs) as response:
+                        result = FetchResponse(response.status, await response.text(), response.headers.copy())
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+                logging.debug(f"{method} {url} failed ({e!r}), retrying in {delay:.2f}s")
+            else:
+                if result.status not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return result
+                delay = (retry_after_seconds(result.headers.get('Retry-After'), self.backoff_max)
+                         or backoff_delay(attempt, self.backoff_base, self.backoff_max))
+                logging.debug(f"{method} {url} returned {result.status}, retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def fetch_readme(self, url: str, revision: Optional[str] = None) -> Optional[str]:
+        '''
+        Async variant of ReadmeParser.fetch_readme. The result (or a miss) is recorded in the
+        shared README store, so later ReadmeParser.fetch_readme calls do not hit the network.
+        '''
+        model_id = ReadmeParser._extract_model_id(url)
+        if not model_id:
+            return None
+        if "github.com" in url:
+            host = "github.com"
+        elif "huggingface.co" in url:
+            host = "huggingface.co"
+        else:
+            return None
+
+        found, content = readme_store.peek(host, model_id, revision)
+        if found:
+            return content
+        return await self._shared(("readme", host, model_id, revision), lambda: self._download_readme(host, model_id, revision))
+
+    async def _download_readme(self, host: str, model_id: str, revision: Optional[str]) -> Optional[str]:
+        headers = ReadmeParser._auth_headers(host)
+        try:
+            branch = revision or await asyncio.to_thread(ReadmeParser._default_branch, host, model_id)
+            for readme_url in ReadmeParser._readme_urls(host, model_id, branch):
+                response = await self.request('GET', readme_url, headers=headers)
+                if response.status == 200:
+                    readme_store.put(host, model_id, revision, response.text)
+                    return response.text
+                if response.status not in (401, 404):
+                    raise RuntimeError(f"HTTP {response.status} for {readme_url}")
+        except Exception as e:
+            # network errors are not remembered, the blocking path may still retry later
+            logging.debug(f"README download failed for {model_id}: {e!r}")
+            return None
+        readme_store.put(host, model_id, revision, None)
+        return None
+
+    async def get_github_commits(self, url: str, since: Optional[str] = None,
+                                 stop_at: Optional[str] = None) -> Tuple[List[CommitRecord], bool]:
+        '''
+        Async variant of BusFactorMetric._get_github_commits. Requests page_window pages at a
+        time and stops at the first short page or at stop_at.
+        '''
+        per_page = 100
+        params = {"per_page": per_page, **({"since": since} if since else {})}
+        commits = []
+        page = 1
+        while True:
+            pages = await asyncio.gather(*(
+                self._get_json(url, params={**params, "page": p})
+                for p in range(page, page + self.page_window)
+            ))
+            for data in pages:
+                for item in data:
+                    if item["sha"] == stop_at:
+                        return commits, True
+                    commits.append(github_commit_record(item))
+                if len(data) < per_page:
+                    logging.debug("Bus factor: Github commits obtained")
+                    return commits, since is not None
+            page += self.page_window
+
+    async def get_huggingface_commits(self, url: str, stop_at: Optional[str] = None) -> Tuple[List[CommitRecord], bool]:
+        '''
+        Async variant of BusFactorMetric._get_huggingface_commits. Pages are linked from one
+        to the next, so they are requested one at a time.
+        '''
+        commits = []
+        next_page = url
+        while next_page:
+            response = await self.request('GET', next_page)
+            if response.status >= 400:
+                raise RuntimeError(f"HTTP {response.status} for {next_page}")
+            for item in response.json():
+                if item["id"] == stop_at:
+                    return commits, True
+                commits.append(huggingface_commit_record(item))
+            next_page = self._next_page(response)
+        return commits, False
+
+    async def cached_chat_completion(self, api_key: str, request: LLMRequest, readme: str) -> str:
+        '''
+        Async variant of llm_client.cached_chat_completion. Concurrent callers sending the same
+        request (e.g. the three metrics in combined mode) share a single POST.
+        '''
+        key = cache_key(request, readme)
+        return await self._shared(("llm", key), lambda: self._chat_completion(api_key, request, key))
+
+    async def _chat_completion(self, api_key: str, request: LLMRequest, key: str) -> str:
+        cache = default_llm_cache()
+        if (cached := await asyncio.to_thread(cache.get, key)) is not None:
+            remember_response(key, cached)
+            return cached
+
+        response = await self.request('POST', GENAI_URL, timeout=LLM_TIMEOUT,
+                                      headers=request_headers(api_key), json=request_body(request))
+        if response.status != 200:
+            raise Exception(f"PurdueGenAI API Error: {response.status}, {response.text}")
+
+        analysis_text = response.json()['choices'][0]['message']['content']
+        await asyncio.to_thread(cache.put, key, analysis_text)
+        remember_response(key, analysis_text)
+        return analysis_text
+
+    async def _get_json(self, url: str, **kwargs) -> Any:
+        response = await self.request('GET', url, **kwargs)
+        if response.status >= 400:
+            raise RuntimeError(f"HTTP {response.status} for {url}")
+        return response.json()
+
+    async def _shared(self, key: tuple, start: Callable[[], Awaitable[Any]]) -> Any:
+        # callers asking for the same resource await one task instead of each starting their own
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(start())
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _next_page(response: FetchResponse) -> Optional[str]:
+        # the same Link header pagination as Github's
+        for link in parse_header_links(response.headers.get('Link', '')):
+            if link.get('rel') == 'next':
+                return link['url']
+        return None
+
+    def _semaphore(self, host: str) -> asyncio.Semaphore:
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.host_limits.get(host, self.host_limit))
+        return self._semaphores[host]
@@ -0,0 +1,149 @@
+# --------------------------------------Info--------------------------------------
+# Input: List of ModelAssets groups and a function that scores a single group
+# Output: Each group's result dict is handed to a callback as soon as it finishes
+# Description: Spreads ModelAssets groups across a process pool so a batch of URLs is
+# scored in parallel. A group that raises (or whose worker process dies) is logged and
+# skipped so the rest of the batch keeps going.
+# run_batch_async instead drives the whole batch from one asyncio event loop, with network
+# I/O done by an AsyncFetcher and the blocking metric code running in the loop's executor.
+# How to use: run_batch(groups, score_group, on_result=..., workers=N)
+#             asyncio.run(run_batch_async(groups, score_group_async, on_result=..., concurrency=N))
+#  ---------------------------------------------------------------------------------
+
+import asyncio
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+def run_batch(groups: Sequence[Any],
+              score_fn: Callable[[Any], Dict[str, Any]],
+              on_result: Callable[[Dict[str, Any]], None],
+              workers: int = 1,
+              initializer: Optional[Callable[..., None]] = None,
+              initargs: tuple = ()) -> List[int]:
+    '''
+    Scores every group with score_fn and passes each result to on_result in completion order.
+
+    workers <= 1 scores the groups one at a time in this process. Otherwise the groups are
+    spread across a ProcessPoolExecutor; score_fn (and initializer) must be picklable, i.e.
+    defined at module level.
+
+    Returns the indices of the groups that failed.
+    '''
+    if workers <= 1:
+        return _run_sequential(groups, score_fn, on_result)
+
+    failed: List[int] = []
+    remaining = list(range(len(groups)))
+    while remaining:
+        suspects, remaining = _run_pool(groups, remaining, score_fn, on_result, failed, workers, initializer, initargs)
+
+        # a worker that dies outright (segfault, OOM kill) breaks the whole pool and every group
+        # running on it. Only those are retried alone in a fresh single-worker pool, so only the
+        # group that kills its own worker is marked failed; the groups not started yet go on in
+        # a new pool of the full size
+        for index in suspects:
+            with ProcessPoolExecutor(max_workers=1, initializer=initializer, initargs=initargs) as pool:
+                future = pool.submit(score_fn, groups[index])
+                if not _collect(future, index, on_result, failed):
+                    logging.error(f"Group #{index + 1} failed: worker process terminated abruptly")
+                    failed.append(index)
+
+    return sorted(failed)
+
+
+def _run_pool(groups: Sequence[Any], indices: List[int], score_fn: Callable[[Any], Dict[str, Any]],
+              on_result: Callable[[Dict[str, Any]], None], failed: List[int], workers: int,
+              initializer: Optional[Callable[..., None]], initargs: tuple) -> Tuple[List[int], List[int]]:
+    # at most one group per worker is submitted at a time, so when the pool breaks the groups it
+    # took down are known. Returns those and the groups never submitted
+    queue = deque(indices)
+    running: Dict[Any, int] = {}
+    broken: List[int] = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+        while True:
+            while queue and len(running) < workers and not broken:
+                index = queue.popleft()
+                try:
+                    running[pool.submit(score_fn, groups[index])] = index
+                except BrokenProcessPool:
+                    queue.appendleft(index)
+                    break
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                if not _collect(future, index, on_result, failed):
+                    broken.append(index)
+    return sorted(broken), list(queue)
+
+
+def _collect(future, index: int, on_result: Callable[[Dict[str, Any]], None], failed: List[int]) -> bool:
+    # False when the pool broke before the group finished, so it has not been attempted cleanly
+    try:
+        result = future.result()
+    except BrokenProcessPool:
+        return False
+    except Exception as e:
+        logging.error(f"Group #{index + 1} failed: {e}")
+        failed.append(index)
+        return True
+    on_result(result)
+    return True
+
+
+def _run_sequential(groups: Sequence[Any],
+                    score_fn: Callable[[Any], Dict[str, Any]],
+                    on_result: Callable[[Dict[str, Any]], None]) -> List[int]:
+    failed: List[int] = []
+    for index, group in enumerate(groups):
+        try:
+            result = score_fn(group)
+        except Exception as e:
+            logging.error(f"Group #{index + 1} failed: {e}")
+            failed.append(index)
+            continue
+        on_result(result)
+    return failed
+
+
+async def run_batch_async(groups: Sequence[Any],
+                          score_fn: Callable[[Any, Any], Awaitable[Dict[str, Any]]],
+                          on_result: Callable[[Dict[str, Any]], None],
+                          concurrency: int = 16,
+                          executor_workers: int = 32) -> List[int]:
+    '''
+    Scores every group with the coroutine score_fn(group, fetcher) on the running event loop,
+    with at most concurrency groups in flight. Blocking work the metrics hand to the loop's
+    executor runs on a pool of executor_workers threads.
+
+    Returns the indices of the groups that failed.
+    '''
+    # imported here: the fetch engine depends on the metrics package, which imports this package
+    from parallel.async_fetch import AsyncFetcher
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=executor_workers)
+    loop.set_default_executor(executor)
+
+    failed: List[int] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def score(index: int, group: Any, fetcher: AsyncFetcher) -> None:
+        async with semaphore:
+            try:
+                result = await score_fn(group, fetcher)
+            except Exception as e:
+                logging.error(f"Group #{index + 1} failed: {e}")
+                failed.append(index)
+                return
+        on_result(result)
+
+    async with AsyncFetcher.from_env() as fetcher:
+        await asyncio.gather(*(score(i, group, fetcher) for i, group in enumerate(groups)))
+
+    return sorted(failed)
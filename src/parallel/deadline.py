@@ -0,0 +1,43 @@
+# --------------------------------------Info--------------------------------------
+# Input: A time budget in seconds
+# Output: A Deadline object that long-running steps poll to see how much time is left
+# Description: Cooperative replacement for signal.alarm based timeouts. Unlike SIGALRM it
+# works from any thread and every step can share one budget. The expiry is stored on the
+# system-wide monotonic clock, so a Deadline can also be pickled into a worker process on
+# the same machine.
+# How to use: deadline = Deadline(15); deadline.check(); subprocess.run(..., timeout=deadline.remaining())
+#  ---------------------------------------------------------------------------------
+
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.seconds: float = seconds
+        self.expires_at: float = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        # seconds left before the deadline, never negative
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self, step: str = "operation") -> None:
+        # raises DeadlineExceeded once the budget is used up
+        if self.expired():
+            raise DeadlineExceeded(f"{step} ran past its {self.seconds}s deadline")
+
+    def child(self, seconds: Optional[float]) -> "Deadline":
+        '''
+        Returns a deadline for a sub-step that expires after the given number of seconds or
+        when this deadline does, whichever comes first
+        '''
+        sub = Deadline(seconds if seconds is not None else self.remaining())
+        sub.expires_at = min(sub.expires_at, self.expires_at)
+        return sub
@@ -0,0 +1,33 @@
+# --------------------------------------Info--------------------------------------
+# Input: The metric objects computed for a single ModelAssets group
+# Output: Every metric's score and latency fields are filled in
+# Description: Runs the independent metrics of a group at the same time so the group's
+# wall time is its slowest metric instead of the sum of all of them. Each metric still
+# times its own calculate() call, so per-metric latency stays accurate.
+# How to use: run_metrics([cqc, bfc, dqd, ...])
+#  ---------------------------------------------------------------------------------
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    from metrics.base import Metric
+
+
+def run_metrics(metrics: Sequence["Metric"], max_workers: Optional[int] = None) -> None:
+    '''
+    Calls calculate() on every metric concurrently and waits for all of them.
+
+    If any metric raises, the first exception is re-raised once every metric has finished.
+    '''
+    metrics = [m for m in metrics if m is not None]
+
+    errors: List[BaseException] = []
+    with ThreadPoolExecutor(max_workers=max_workers or max(len(metrics), 1)) as pool:
+        futures = [pool.submit(m.calculate) for m in metrics]
+        for future in futures:
+            if e := future.exception():
+                errors.append(e)
+
+    if errors:
+        raise errors[0]
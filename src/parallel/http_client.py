@@ -0,0 +1,170 @@
+# --------------------------------------Info--------------------------------------
+# Input: HTTP method, URL and the usual requests keyword arguments
+# Output: requests.Response
+# Description: Shared HTTP layer for every metric and parser. Keeps one pooled
+# requests.Session per host so connections (and TLS handshakes) are reused, caps the
+# number of concurrent requests per host, applies a default timeout, and retries 429/5xx
+# responses and connection errors with jittered exponential backoff that honours Retry-After.
+# How to use: http_client.get(url, params=...) / http_client.post(url, json=...)
+# Configure with HTTP_TIMEOUT, HTTP_MAX_RETRIES, HTTP_HOST_LIMIT and
+# HTTP_HOST_LIMITS (e.g. "api.github.com=4,huggingface.co=16") in the .env file.
+#  ---------------------------------------------------------------------------------
+
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+import urllib.parse
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_host_limits(value: str) -> Dict[str, int]:
+    # "api.github.com=4,huggingface.co=16" -> {"api.github.com": 4, "huggingface.co": 16}
+    host_limits = {}
+    for entry in value.split(','):
+        if '=' in entry:
+            host, limit = entry.split('=', 1)
+            host_limits[host.strip()] = int(limit)
+    return host_limits
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    # "full jitter": a random delay up to the exponential cap spreads out retry storms
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def retry_after_seconds(value: Optional[str], cap: float) -> Optional[float]:
+    # Retry-After is either a number of seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = email.utils.parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), cap)
+
+
+class HttpClient:
+    def __init__(self, timeout: float = 10, max_retries: int = 3, host_limit: int = 8,
+                 host_limits: Optional[Dict[str, int]] = None, backoff_base: float = 0.5,
+                 backoff_max: float = 30):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.host_limit = host_limit
+        self.host_limits = host_limits or {}
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+
+    @classmethod
+    def from_env(cls) -> "HttpClient":
+        return cls(
+            timeout=float(os.getenv('HTTP_TIMEOUT', 10)),
+            max_retries=int(os.getenv('HTTP_MAX_RETRIES', 3)),
+            host_limit=int(os.getenv('HTTP_HOST_LIMIT', 8)),
+            host_limits=parse_host_limits(os.getenv('HTTP_HOST_LIMITS', ''))
+        )
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        '''
+        Sends the request through the host's pooled session. Retryable failures are retried
+        up to max_retries times; the last response is returned (or the last error raised)
+        once retries run out, so callers keep checking status codes as before.
+        '''
+        host = urllib.parse.urlparse(url).netloc
+        kwargs.setdefault('timeout', self.timeout)
+        session = self._session(host)
+        semaphore = self._semaphore(host)
+
+        attempt = 0
+        while True:
+            try:
+                with semaphore:
+                    response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logging.debug(f"{method} {url} failed ({e}), retrying in {delay:.2f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = self._retry_after(response) or self._backoff(attempt)
+                logging.debug(f"{method} {url} returned {response.status_code}, retrying in {delay:.2f}s")
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def _backoff(self, attempt: int) -> float:
+        return backoff_delay(attempt, self.backoff_base, self.backoff_max)
+
+    def _retry_after(self, response: requests.Response) -> Optional[float]:
+        return retry_after_seconds(response.headers.get('Retry-After'), self.backoff_max)
+
+    def _limit(self, host: str) -> int:
+        return self.host_limits.get(host, self.host_limit)
+
+    def _session(self, host: str) -> requests.Session:
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._limit(host))
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._sessions[host] = session
+            return self._sessions[host]
+
+    def _semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self._limit(host))
+            return self._semaphores[host]
+
+
+_default_client: Optional[HttpClient] = None
+_default_lock = threading.Lock()
+
+
+def default_client() -> HttpClient:
+    # created on first use so the .env file has been loaded by then
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient.from_env()
+        return _default_client
+
+
+def _reset_after_fork() -> None:
+    # pooled sockets must not be shared with a forked worker process
+    global _default_client, _default_lock
+    _default_client = None
+    _default_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return default_client().get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return default_client().post(url, **kwargs)
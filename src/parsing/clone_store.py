@@ -0,0 +1,170 @@
+# --------------------------------------Info--------------------------------------
+# Input: Git repository URL
+# Output: A local git.Repo clone of the repository
+# Description: In-process store of local clones shared by the metrics of a group, so
+# CodeQuality and the bus factor metric work on one clone instead of each making their own.
+# When BUS_FACTOR_FROM_CLONE is enabled the clone is blobless but keeps the full history
+# (the bus factor reads it with git shortlog), otherwise it is a shallow clone. Clones are
+# worktrees of the persistent repository cache (see repo_cache.py) unless it is disabled.
+# With CODE_QUALITY_SOURCE=objects the files are read from the object database, so clones
+# skip the checkout (blobless history clones still check out, fetching HEAD's blobs at once).
+# Every group scoring a codebase holds its clone (acquire) until it is done (release), and the
+# checkout is deleted when the last holder releases it, so groups running at once that share a
+# codebase never lose the working tree under each other.
+# How to use: clone_store.acquire(url); repo = clone_store.get(url, deadline) ... clone_store.release(url)
+#  ---------------------------------------------------------------------------------
+
+import atexit
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from typing import Callable, Dict, Optional
+
+import git
+from git import Repo
+
+from parallel.deadline import Deadline, DeadlineExceeded
+from parsing.repo_cache import clone_branch, default_repo_cache
+
+
+def history_clones_enabled() -> bool:
+    return os.getenv('BUS_FACTOR_FROM_CLONE', '0') == '1'
+
+
+def checkouts_needed() -> bool:
+    # a blobless clone would fetch every blob read from the object database one at a time
+    return os.getenv('CODE_QUALITY_SOURCE', 'worktree') != 'objects' or history_clones_enabled()
+
+
+def clone_repository(repo_url: str, path: str, deadline: Optional[Deadline] = None,
+                     timeout: float = 5, history: bool = False, checkout: bool = True) -> Optional[Repo]:
+    '''
+    Clones repo_url into path, killing the clone once the timeout or the overall deadline passes.
+
+    history=True makes a blobless clone with every commit (file contents of other revisions are
+    never downloaded), otherwise only the latest commit is cloned. Returns None when the clone
+    ran out of time without leaving anything usable, raises ValueError when it failed outright.
+    checkout=False leaves the working tree empty.
+    '''
+    clone_deadline = deadline.child(timeout) if deadline else Deadline(timeout)
+    depth = {'filter': 'blob:none'} if history else {'depth': 1}
+    if not checkout:
+        depth['no_checkout'] = True
+
+    try:
+        clone_branch(repo_url, path, clone_deadline, **depth)
+        return Repo(path)
+    except (DeadlineExceeded, git.exc.GitCommandError) as e:
+        if not clone_deadline.expired():
+            logging.info("Failed to clone repository")
+            raise ValueError(f"Failed to clone repository: {repo_url}") from e
+        # Check if partial clone exists
+        if os.path.exists(path) and os.listdir(path):
+            try:
+                return Repo(path)
+            except Exception:
+                return None
+        return None
+    except Exception:
+        logging.info("Failed to clone repository")
+        raise ValueError(f"Failed to clone repository: {repo_url}")
+
+
+def cached_clone_repository(repo_url: str, path: str, deadline: Optional[Deadline] = None,
+                            timeout: float = 5, history: bool = False, checkout: bool = True) -> Optional[Repo]:
+    # worktree of the persistent repository cache, or a fresh clone when the cache is disabled
+    cache = default_repo_cache()
+    if not cache.enabled:
+        return clone_repository(repo_url, path, deadline, timeout, history, checkout)
+    return cache.checkout(repo_url, path, deadline, timeout, history, checkout)
+
+
+class CloneStore:
+    '''
+    Each repository is cloned at most once while it is held. Concurrent callers asking for the
+    same URL wait on the single in-flight clone instead of starting their own. Failed clones are
+    not remembered, so a caller with a longer timeout (waiting or later) tries again.
+
+    Checkouts live in a temporary directory until the last holder calls release(url) (or
+    interpreter exit). acquire(url) counts a holder; a clone nobody acquired is deleted by the
+    first release.
+    '''
+    def __init__(self, loader: Callable[..., Optional[Repo]] = cached_clone_repository):
+        # loader(url, path, deadline, timeout, history, checkout) has the signature of clone_repository
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._root: Optional[str] = None
+        self._entries: Dict[str, Repo] = {}
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._holders: Dict[str, int] = {}
+
+    def acquire(self, url: str) -> None:
+        # keeps the clone of url (made now or later) until the matching release
+        with self._lock:
+            self._holders[url] = self._holders.get(url, 0) + 1
+
+    def get(self, url: str, deadline: Optional[Deadline] = None, timeout: float = 5) -> Optional[Repo]:
+        while True:
+            with self._lock:
+                if url in self._entries:
+                    return self._entries[url]
+                event = self._in_flight.get(url)
+                leader = event is None
+                if leader:
+                    event = self._in_flight[url] = threading.Event()
+            if leader:
+                return self._clone(url, event, deadline, timeout)
+
+            # another metric is already cloning this repository. If that clone fails (e.g. it had a
+            # shorter timeout) and this caller still has time left, it tries again itself
+            finished = event.wait(deadline.remaining() if deadline else None)
+            if not finished or (deadline is not None and deadline.expired()):
+                with self._lock:
+                    return self._entries.get(url)
+
+    def _clone(self, url: str, event: threading.Event, deadline: Optional[Deadline], timeout: float) -> Optional[Repo]:
+        path = tempfile.mkdtemp(dir=self._root_dir())
+        try:
+            repo = self._loader(url, path, deadline, timeout, history_clones_enabled(), checkouts_needed())
+            if repo is not None:
+                with self._lock:
+                    self._entries[url] = repo
+            return repo
+        finally:
+            if url not in self._entries:
+                shutil.rmtree(path, ignore_errors=True)
+            with self._lock:
+                del self._in_flight[url]
+            event.set()
+
+    def release(self, url: str) -> None:
+        # deletes the clone once every group holding it is done with it
+        with self._lock:
+            holders = self._holders.get(url, 0) - 1
+            if holders > 0:
+                self._holders[url] = holders
+                return
+            self._holders.pop(url, None)
+            repo = self._entries.pop(url, None)
+        if repo is not None:
+            repo.close()
+            shutil.rmtree(repo.working_dir, ignore_errors=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            urls = list(self._entries)
+            self._holders.clear()
+        for url in urls:
+            self.release(url)
+
+    def _root_dir(self) -> str:
+        with self._lock:
+            if self._root is None:
+                self._root = tempfile.mkdtemp(prefix="model-scorer-clones-")
+                atexit.register(shutil.rmtree, self._root, True)
+            return self._root
+
+
+clone_store = CloneStore()
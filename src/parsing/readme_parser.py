@@ -1,6 +1,8 @@
-import requests
 import os
 from typing import Optional
+from parallel import http_client
+from parsing.readme_store import ReadmeStore
+from parsing.ref_resolver import ref_resolver
 
 # loads environemental variables from .env file to get user token (optional)
 # this allows access to gated and private models
@@ -11,74 +13,90 @@ load_dotenv()
 class ReadmeParser:
     # fetches README content from GitHub or HuggingFace repositories
     @staticmethod
-    def fetch_readme(url: str) -> Optional[str]:
-        # Input: URL of the repository (HuggingFace or GitHub)
+    def fetch_readme(url: str, revision: Optional[str] = None) -> Optional[str]:
+        # Input: URL of the repository (HuggingFace or GitHub), optionally a branch/revision
         # Output: README content as a string, or None if not found
         # Usage: Call ReadmeParser.fetch_readme(url) with the repository URL
+        # READMEs are shared through readme_store, so each one is only downloaded once per process
         model_id = ReadmeParser._extract_model_id(url)
         if not model_id:
             return None
             
         if "github.com" in url:
-            return ReadmeParser._fetch_github_readme(model_id)
+            return readme_store.get("github.com", model_id, revision)
         elif "huggingface.co" in url:
-            return ReadmeParser._fetch_huggingface_readme(model_id)
+            return readme_store.get("huggingface.co", model_id, revision)
         else:
             return None
+
+    @staticmethod
+    def _download_readme(host: str, model_id: str, revision: Optional[str]) -> Optional[str]:
+        # loader used by readme_store: returns None for a missing README, raises on network errors
+        revision = revision or ReadmeParser._default_branch(host, model_id)
+        if host == "github.com":
+            return ReadmeParser._fetch_github_readme(model_id, revision)
+        return ReadmeParser._fetch_huggingface_readme(model_id, revision)
     
     @staticmethod
-    def _fetch_huggingface_readme(model_id: str) -> Optional[str]:
+    def _fetch_huggingface_readme(model_id: str, revision: Optional[str] = None) -> Optional[str]:
         # Fetches README from HuggingFace raw files.
-        try:
-            # Add authentication if token is available (optional)
-            headers = {}
-            token = os.getenv('HUGGINGFACE_TOKEN')
-            if token:
-                headers['Authorization'] = f"Bearer {token}"
-            
-            # try main branch first
-            readme_url = f"https://huggingface.co/{model_id}/raw/main/README.md"
-            response = requests.get(readme_url, headers=headers, timeout=10)
-            
+        return ReadmeParser._fetch_first(ReadmeParser._readme_urls("huggingface.co", model_id, revision),
+                                         ReadmeParser._auth_headers("huggingface.co"))
+    
+    @staticmethod
+    def _fetch_github_readme(repo_path: str, revision: Optional[str] = None) -> Optional[str]:
+        # Fetches README from GitHub raw files.
+        return ReadmeParser._fetch_first(ReadmeParser._readme_urls("github.com", repo_path, revision),
+                                         ReadmeParser._auth_headers("github.com"))
+
+    @staticmethod
+    def _fetch_first(readme_urls: list, headers: dict) -> Optional[str]:
+        # returns the first README found; 401/404 mean "not here", anything else is an error
+        for readme_url in readme_urls:
+            response = http_client.get(readme_url, headers=headers)
+
             if response.status_code == 200:
                 # request successful
                 return response.text
-            else:
-                # Try master branch instead of main (for repos older than 2020)
-                readme_url = f"https://huggingface.co/{model_id}/raw/master/README.md"
-                response = requests.get(readme_url, headers=headers, timeout=10)
-                if response.status_code == 200:
-                    return response.text
-                else:
-                    return None
-        except Exception as e:
+            if response.status_code not in (401, 404):
+                response.raise_for_status()
+
+        return None
+
+    @staticmethod
+    def _readme_urls(host: str, model_id: str, revision: Optional[str] = None) -> list:
+        # candidate raw README URLs in the order they are tried
+        # without a revision (default branch unknown), try main first, then master (for repos older than 2020)
+        branches = [revision] if revision else ['main', 'master']
+
+        if host == "github.com":
+            # Different README naming conventions
+            readme_variations = ['README.md', 'readme.md', 'Readme.md', 'README.MD', 'readme', 'README']
+            return [f"https://raw.githubusercontent.com/{model_id}/{branch}/{readme_name}"
+                    for branch in branches for readme_name in readme_variations]
+        return [f"https://huggingface.co/{model_id}/raw/{branch}/README.md" for branch in branches]
+
+    @staticmethod
+    def _default_branch(host: str, model_id: str) -> Optional[str]:
+        # GitHub: resolved once per repository and shared with cloning. Hugging Face repositories
+        # are on main, so no git call is made for them (None tries main, then master)
+        if host != "github.com":
             return None
-    
+        return ref_resolver.default_branch(f"https://{host}/{model_id}")
+
     @staticmethod
-    def _fetch_github_readme(repo_path: str) -> Optional[str]:
-        # Fetches README from GitHub raw files.
-        try:
-            # Add authentication if token is available (optional)
-            headers = {}
+    def _auth_headers(host: str) -> dict:
+        # Add authentication if token is available (optional)
+        headers = {}
+        if host == "github.com":
             token = os.getenv('GITHUB_TOKEN')
             if token:
                 headers['Authorization'] = f"token {token}"
-            
-            # Different README naming conventions
-            readme_variations = ['README.md', 'readme.md', 'Readme.md', 'README.MD', 'readme', 'README']
-            branches = ['main', 'master']
-            
-            for branch in branches:
-                for readme_name in readme_variations:
-                    readme_url = f"https://raw.githubusercontent.com/{repo_path}/{branch}/{readme_name}"
-                    response = requests.get(readme_url, headers=headers, timeout=10)
-                    
-                    if response.status_code == 200:
-                        return response.text
-            
-            return None
-        except Exception as e:
-            return None
+        else:
+            token = os.getenv('HUGGINGFACE_TOKEN')
+            if token:
+                headers['Authorization'] = f"Bearer {token}"
+        return headers
     
     @staticmethod
     def _extract_model_id(url: str) -> Optional[str]:
@@ -115,4 +133,8 @@ class ReadmeParser:
         except Exception:
             pass
         
-        return None
\ No newline at end of file
+        return None
+
+
+# process-wide README store shared by every metric
+readme_store = ReadmeStore(ReadmeParser._download_readme)
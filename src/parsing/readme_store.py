@@ -0,0 +1,68 @@
+import logging
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+# (host, repo id, revision) -> README text; a None value records a README that does not exist.
+# The host is part of the key: a GitHub repo and a Hugging Face model can share an owner/name
+ReadmeKey = Tuple[str, str, str]
+
+
+class ReadmeStore:
+    '''
+    In-process README artifact store shared by every metric.
+
+    Each README is downloaded at most once per (host, repo id, revision). Concurrent callers asking
+    for the same key wait on the single in-flight download instead of starting their own,
+    and READMEs that do not exist (404s) are remembered so they are not requested again.
+    '''
+    def __init__(self, loader: Callable[[str, str, Optional[str]], Optional[str]]):
+        # loader(host, repo_id, revision) returns the README text, None when the README does not
+        # exist, and raises on network errors (which are not remembered)
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._entries: Dict[ReadmeKey, Optional[str]] = {}
+        self._in_flight: Dict[ReadmeKey, threading.Event] = {}
+
+    def get(self, host: str, repo_id: str, revision: Optional[str] = None) -> Optional[str]:
+        key = (host, repo_id, revision or "HEAD")
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+            event = self._in_flight.get(key)
+            leader = event is None
+            if leader:
+                event = self._in_flight[key] = threading.Event()
+
+        if not leader:
+            # another thread is already downloading this README
+            event.wait()
+            with self._lock:
+                return self._entries.get(key)
+
+        try:
+            content = self._loader(host, repo_id, revision)
+            with self._lock:
+                self._entries[key] = content
+            return content
+        except Exception as e:
+            logging.debug(f"README download failed for {repo_id}: {e}")
+            return None
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            event.set()
+
+    def peek(self, host: str, repo_id: str, revision: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        # (found, content) without downloading anything
+        key = (host, repo_id, revision or "HEAD")
+        with self._lock:
+            return key in self._entries, self._entries.get(key)
+
+    def put(self, host: str, repo_id: str, revision: Optional[str], content: Optional[str]) -> None:
+        # records a README (or a miss) downloaded elsewhere, e.g. by the asyncio fetch engine
+        with self._lock:
+            self._entries[(host, repo_id, revision or "HEAD")] = content
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,75 @@
+# --------------------------------------Info--------------------------------------
+# Input: Git repository URL (GitHub or Hugging Face)
+# Output: Name of the repository's default branch, or None if it could not be resolved
+# Description: Finds a repository's symbolic HEAD with one `git ls-remote --symref` call and
+# remembers it for the rest of the process, so cloning and README fetching use the real
+# default branch instead of trying main, then master, then whatever is left.
+# How to use: ref_resolver.default_branch("https://github.com/owner/repo")
+#  ---------------------------------------------------------------------------------
+
+import logging
+import threading
+from typing import Dict, Optional
+
+import git
+
+
+class RefResolver:
+    def __init__(self, timeout: float = 5):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._branches: Dict[str, str] = {}
+        self._in_flight: Dict[str, threading.Event] = {}
+
+    def default_branch(self, repo_url: str, timeout: Optional[float] = None) -> Optional[str]:
+        '''
+        Resolves the default branch once per repository. Concurrent callers wait on the single
+        in-flight lookup; failed lookups are not remembered.
+        '''
+        key = repo_url.rstrip('/').removesuffix('.git').lower()
+        with self._lock:
+            if key in self._branches:
+                return self._branches[key]
+            event = self._in_flight.get(key)
+            leader = event is None
+            if leader:
+                event = self._in_flight[key] = threading.Event()
+
+        if not leader:
+            event.wait(timeout)
+            with self._lock:
+                return self._branches.get(key)
+
+        try:
+            branch = self._ls_remote(repo_url, self.timeout if timeout is None else min(timeout, self.timeout))
+            if branch is not None:
+                with self._lock:
+                    self._branches[key] = branch
+            return branch
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            event.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._branches.clear()
+
+    @staticmethod
+    def _ls_remote(repo_url: str, timeout: float) -> Optional[str]:
+        # "ref: refs/heads/main\tHEAD" is the symbolic HEAD line of the output
+        try:
+            # never ask for credentials on the terminal: a private or gated repository just fails
+            output = git.Git().ls_remote('--symref', repo_url, 'HEAD', kill_after_timeout=timeout,
+                                         env={'GIT_TERMINAL_PROMPT': '0'})
+        except git.exc.GitCommandError as e:
+            logging.debug(f"Could not resolve the default branch of {repo_url}: {e}")
+            return None
+        for line in output.splitlines():
+            if line.startswith('ref: refs/heads/') and line.endswith('\tHEAD'):
+                return line[len('ref: refs/heads/'):-len('\tHEAD')]
+        return None
+
+
+# process-wide resolver shared by cloning and README fetching
+ref_resolver = RefResolver()
@@ -0,0 +1,162 @@
+# --------------------------------------Info--------------------------------------
+# Input: Repository URL (GitHub or Hugging Face)
+# Output: Time of the repository's latest update, or None if it could not be found
+# Description: Finds when a repository was last updated from lightweight metadata instead of
+# a clone: GitHub's pushed_at, or Hugging Face's lastModified, from one API request. When the
+# GitHub API cannot answer (e.g. rate limited) the HEAD commit is found with git ls-remote and
+# its date read from the commit's .patch page. The timeout caps all of these calls together, and
+# last_updated_async runs the lookup on a background thread so a caller can clone meanwhile.
+# Results are remembered for the rest of the process.
+# How to use: repo_activity.last_updated("https://github.com/owner/repo")
+#  ---------------------------------------------------------------------------------
+
+import email.utils
+import logging
+import os
+import threading
+import urllib.parse
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, Optional
+
+import git
+
+from parallel import http_client
+from parallel.deadline import Deadline
+
+
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    # "2024-05-01T12:00:00Z" or "2024-05-01T12:00:00.000Z" as naive local time, like datetime.fromtimestamp
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone().replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+class RepoActivity:
+    def __init__(self, timeout: float = 5, github_api: str = 'https://api.github.com',
+                 github_web: str = 'https://github.com', huggingface_api: str = 'https://huggingface.co/api'):
+        self.timeout = timeout
+        self.github_api = github_api
+        self.github_web = github_web # serves the .patch pages of the ls-remote fallback
+        self.huggingface_api = huggingface_api
+        self._lock = threading.Lock()
+        self._dates: Dict[str, datetime] = {}
+
+    def last_updated(self, repo_url: str, timeout: Optional[float] = None) -> Optional[datetime]:
+        # failed lookups are not remembered, so a later caller can try again. timeout (at most
+        # self.timeout) is shared by every request of the lookup rather than given to each one
+        key = repo_url.rstrip('/').removesuffix('.git').lower()
+        with self._lock:
+            if key in self._dates:
+                return self._dates[key]
+
+        deadline = Deadline(self.timeout if timeout is None else min(timeout, self.timeout))
+        parsed = urllib.parse.urlparse(repo_url)
+        parts = parsed.path.strip('/').removesuffix('.git').split('/')
+        date = None
+        if parsed.netloc in ('github.com', 'www.github.com') and len(parts) >= 2:
+            repo_id = f"{parts[0]}/{parts[1]}"
+            data = self._github_repo(repo_id, deadline.remaining())
+            if data is None and not deadline.expired():
+                date = self._github_head_date(repo_url, repo_id, deadline)
+            elif data is not None:
+                date = _parse_date(data.get('pushed_at'))
+        elif parsed.netloc in ('huggingface.co', 'www.huggingface.co') and len(parts) >= 2:
+            date = self._huggingface_last_modified(parts, deadline.remaining())
+
+        if date is not None:
+            with self._lock:
+                self._dates[key] = date
+        return date
+
+    def last_updated_async(self, repo_url: str, timeout: Optional[float] = None) -> Future:
+        '''
+        Starts last_updated on a daemon thread. Waiting with future.result(timeout=...) is a hard
+        cap: http_client's retries can outlast the lookup's own timeout, and a lookup still
+        running when the caller gives up does not hold up the process exiting.
+        '''
+        future: Future = Future()
+
+        def lookup() -> None:
+            try:
+                future.set_result(self.last_updated(repo_url, timeout))
+            except Exception as e:
+                future.set_exception(e)
+
+        threading.Thread(target=lookup, name='repo-activity', daemon=True).start()
+        return future
+
+    def clear(self) -> None:
+        with self._lock:
+            self._dates.clear()
+
+    def _github_repo(self, repo_id: str, timeout: float) -> Optional[dict]:
+        headers = {}
+        token = os.getenv('GITHUB_TOKEN')
+        if token:
+            headers['Authorization'] = f"token {token}"
+        return self._get_json(f"{self.github_api}/repos/{repo_id}", timeout, headers)
+
+    def _github_head_date(self, repo_url: str, repo_id: str, deadline: Deadline) -> Optional[datetime]:
+        # ls-remote for the HEAD commit, then its Date header from the .patch page (not rate limited like the API)
+        try:
+            # never ask for credentials on the terminal, a private repository just fails
+            output = git.Git().ls_remote(repo_url, 'HEAD', kill_after_timeout=deadline.remaining(),
+                                         env={'GIT_TERMINAL_PROMPT': '0'})
+        except git.exc.GitCommandError as e:
+            logging.debug(f"Could not list the HEAD of {repo_url}: {e}")
+            return None
+        if not output or deadline.expired():
+            return None
+        sha = output.split()[0]
+        try:
+            response = http_client.get(f"{self.github_web}/{repo_id}/commit/{sha}.patch", timeout=deadline.remaining())
+        except Exception as e:
+            logging.debug(f"Commit lookup failed for {repo_url}: {e}")
+            return None
+        if response.status_code != 200:
+            return None
+        for line in response.text.splitlines():
+            if line.startswith('Date: '):
+                try:
+                    return email.utils.parsedate_to_datetime(line[len('Date: '):]).astimezone().replace(tzinfo=None)
+                except (TypeError, ValueError):
+                    return None
+            if not line:
+                break # end of the mail headers
+        return None
+
+    def _huggingface_last_modified(self, parts: list, timeout: float) -> Optional[datetime]:
+        # huggingface.co/owner/model, /datasets/owner/name and /spaces/owner/name
+        kind = 'models'
+        if parts[0] in ('datasets', 'spaces') and len(parts) >= 3:
+            kind, parts = parts[0], parts[1:]
+        headers = {}
+        token = os.getenv('HUGGINGFACE_TOKEN')
+        if token:
+            headers['Authorization'] = f"Bearer {token}"
+        data = self._get_json(f"{self.huggingface_api}/{kind}/{parts[0]}/{parts[1]}", timeout, headers)
+        return _parse_date(data.get('lastModified')) if data else None
+
+    @staticmethod
+    def _get_json(url: str, timeout: float, headers: dict) -> Optional[dict]:
+        # {} when the repository is not found, None when the API could not answer
+        try:
+            response = http_client.get(url, headers=headers, timeout=timeout)
+            if response.status_code == 404:
+                return {}
+            if response.status_code != 200:
+                logging.debug(f"Metadata request returned HTTP {response.status_code}: {url}")
+                return None
+            data = response.json()
+        except Exception as e:
+            logging.debug(f"Metadata request failed for {url}: {e}")
+            return None
+        return data if isinstance(data, dict) else None
+
+
+# process-wide lookup shared by every metric
+repo_activity = RepoActivity()
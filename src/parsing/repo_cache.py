@@ -0,0 +1,211 @@
+# --------------------------------------Info--------------------------------------
+# Input: Git repository URL
+# Output: A worktree checkout of the repository's default branch
+# Description: Persistent cache of bare clones keyed by repository URL. The first visit
+# clones the repository, later visits only fetch the new commits of its branch, and each
+# caller gets its own detached worktree of the bare clone. A first clone that outlives the
+# caller's timeout keeps running in the background, so big repositories are ready the next
+# time. The cache stays under a disk budget by evicting the least recently used clones, and
+# file locks make it safe to share between parallel worker processes.
+# How to use: Configure with REPO_CACHE_DIR, REPO_CACHE_MAX_MB (0 disables the cache) and
+# REPO_CACHE_CLONE_TIMEOUT in the .env file.
+#  ---------------------------------------------------------------------------------
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import git
+from filelock import FileLock, Timeout
+from git import Repo
+
+from parallel.deadline import Deadline, DeadlineExceeded
+from parsing.ref_resolver import ref_resolver
+
+
+def clone_branch(repo_url: str, path: str, clone_deadline: Deadline, **kwargs) -> None:
+    # clone only the default branch, named explicitly when ref_resolver already knows it
+    branch = ref_resolver.default_branch(repo_url, timeout=clone_deadline.remaining())
+    clone_deadline.check("Repository cloning")
+    git.Git().clone(repo_url, path, single_branch=True, kill_after_timeout=clone_deadline.remaining(),
+                    **kwargs, **({'branch': branch} if branch else {}))
+
+
+class _CloneJob:
+    # a first clone running in a background thread, see RepoCache._start_clone
+    def __init__(self):
+        self.thread: Optional[threading.Thread] = None
+        self.error: Optional[BaseException] = None
+
+
+class RepoCache:
+    def __init__(self, root: Path, max_bytes: int, clone_timeout: float = 300):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.clone_timeout = clone_timeout # first clones may run this long in the background
+        self._lock = threading.Lock()
+        self._jobs: Dict[Path, _CloneJob] = {}
+
+    @classmethod
+    def from_env(cls) -> "RepoCache":
+        from metrics.cache_dir import cache_dir # the metrics package imports this module
+        path = os.getenv('REPO_CACHE_DIR') or cache_dir('repos')
+        max_mb = int(os.getenv('REPO_CACHE_MAX_MB', 5120))
+        clone_timeout = float(os.getenv('REPO_CACHE_CLONE_TIMEOUT', 300))
+        return cls(Path(path).expanduser(), max_mb * 1024 * 1024, clone_timeout)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def checkout(self, repo_url: str, path: str, deadline: Optional[Deadline] = None,
+                 timeout: float = 5, history: bool = False, checkout: bool = True) -> Optional[Repo]:
+        '''
+        Adds a detached worktree of the cached clone of repo_url at path (an empty directory),
+        cloning or fetching first. Same contract as clone_store.clone_repository: returns None
+        when it ran out of time, raises ValueError when the clone failed outright. checkout=False
+        adds the worktree without checking out its files.
+        '''
+        clone_deadline = deadline.child(timeout) if deadline else Deadline(timeout)
+        mirror = self._mirror_path(repo_url)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        try:
+            cloned = False
+            if not (mirror / 'HEAD').exists():
+                job = self._start_clone(repo_url, mirror, history)
+                job.thread.join(clone_deadline.remaining())
+                if job.thread.is_alive():
+                    logging.debug(f"Still cloning {repo_url} in the background")
+                    return None
+                if job.error is not None:
+                    raise job.error
+                cloned = True
+
+            with FileLock(f"{mirror}.lock", timeout=clone_deadline.remaining()):
+                if not cloned:
+                    self._fetch(mirror, clone_deadline, history)
+                os.utime(mirror) # marks the clone as recently used for eviction
+
+                bare = Repo(mirror)
+                bare.git.worktree('prune')
+                clone_deadline.check("Worktree checkout")
+                no_checkout = [] if checkout else ['--no-checkout']
+                bare.git.worktree('add', '--detach', *no_checkout, path, 'HEAD',
+                                  kill_after_timeout=clone_deadline.remaining())
+        except (Timeout, DeadlineExceeded, git.exc.GitCommandError) as e:
+            if not clone_deadline.expired() and not isinstance(e, Timeout):
+                logging.info("Failed to clone repository")
+                raise ValueError(f"Failed to clone repository: {repo_url}") from e
+            logging.debug(f"Repository cache ran out of time for {repo_url}")
+            return None
+
+        self.evict()
+        return Repo(path)
+
+    def evict(self) -> None:
+        '''
+        Deletes the least recently used clones until the cache fits in max_bytes. Clones that
+        are locked or still have a worktree in use are skipped.
+        '''
+        try:
+            with FileLock(str(self.root / '.evict.lock'), timeout=0):
+                # left behind by a worker that died while cloning
+                for partial in self.root.glob('*.partial'):
+                    if time.time() - partial.stat().st_mtime > self.clone_timeout:
+                        shutil.rmtree(partial, ignore_errors=True)
+
+                mirrors = sorted(self.root.glob('*.git'), key=lambda m: m.stat().st_mtime)
+                sizes = {m: self._size(m) for m in mirrors}
+                total = sum(sizes.values())
+                for mirror in mirrors:
+                    if total <= self.max_bytes:
+                        break
+                    if self._remove_unused(mirror):
+                        logging.debug(f"Evicted {mirror.name} from the repository cache")
+                        total -= sizes[mirror]
+        except Timeout:
+            pass # another worker is already evicting
+
+    def _start_clone(self, repo_url: str, mirror: Path, history: bool) -> _CloneJob:
+        with self._lock:
+            job = self._jobs.get(mirror)
+            if job is None or not job.thread.is_alive():
+                job = self._jobs[mirror] = _CloneJob()
+                job.thread = threading.Thread(target=self._clone, args=(repo_url, mirror, history, job), daemon=True)
+                job.thread.start()
+            return job
+
+    def _clone(self, repo_url: str, mirror: Path, history: bool, job: _CloneJob) -> None:
+        depth = {'filter': 'blob:none'} if history else {'depth': 1}
+        try:
+            with FileLock(f"{mirror}.lock", timeout=self.clone_timeout):
+                if (mirror / 'HEAD').exists():
+                    return # cloned by another worker process in the meantime
+                # cloned next to the cache and moved in once complete, so an interrupted clone
+                # never looks like a cached one
+                partial = tempfile.mkdtemp(dir=self.root, prefix=f"{mirror.stem}.", suffix=".partial")
+                try:
+                    clone_branch(repo_url, partial, Deadline(self.clone_timeout), bare=True, **depth)
+                    os.replace(partial, mirror)
+                finally:
+                    shutil.rmtree(partial, ignore_errors=True)
+        except Exception as e:
+            job.error = e
+
+    def _fetch(self, mirror: Path, clone_deadline: Deadline, history: bool) -> None:
+        # bare clones have no fetch refspec, so the cloned branch is fetched explicitly
+        bare = Repo(mirror)
+        branch = bare.git.symbolic_ref('HEAD')
+        shallow = bare.git.rev_parse('--is-shallow-repository') == 'true'
+        depth = {}
+        if history and shallow:
+            depth = {'unshallow': True, 'filter': 'blob:none'}
+        elif shallow:
+            depth = {'depth': 1}
+        clone_deadline.check("Repository fetch")
+        try:
+            # half of the remaining time, the worktree checkout still needs the rest
+            bare.git.fetch('origin', f"+{branch}:{branch}", kill_after_timeout=clone_deadline.remaining() / 2, **depth)
+        except git.exc.GitCommandError as e:
+            if history and shallow:
+                raise # the shallow clone has no history to fall back on
+            # the cached clone is only stale, which is still better than nothing
+            logging.info(f"Fetch failed, using the cached clone of {mirror.name}: {e}")
+
+    def _remove_unused(self, mirror: Path) -> bool:
+        try:
+            with FileLock(f"{mirror}.lock", timeout=0):
+                Repo(mirror).git.worktree('prune')
+                worktrees = mirror / 'worktrees'
+                if worktrees.exists() and any(worktrees.iterdir()):
+                    return False
+                shutil.rmtree(mirror, ignore_errors=True)
+                return True
+        except (Timeout, git.exc.GitCommandError):
+            return False
+
+    def _mirror_path(self, repo_url: str) -> Path:
+        normalized = repo_url.rstrip('/').removesuffix('.git').lower()
+        return self.root / f"{hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:16]}.git"
+
+    @staticmethod
+    def _size(path: Path) -> int:
+        return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+
+
+_default_cache: Optional[RepoCache] = None
+
+
+def default_repo_cache() -> RepoCache:
+    # created on first use so the .env file has been loaded by then
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RepoCache.from_env()
+    return _default_cache
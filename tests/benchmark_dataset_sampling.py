@@ -0,0 +1,73 @@
+# Run: PYTHONPATH=src python3 -m tests.benchmark_dataset_sampling
+# Peak RSS of sampling 10,000 rows of a wide, c4-like text dataset: the former list of row
+# dicts plus pandas DataFrame against the shard-parallel Arrow sample DatasetQualityMetric now takes
+# from the Parquet copy (4 shards open at once). Each path runs in a fresh process so their peaks
+# do not mask each other.
+
+import glob
+import multiprocessing
+import os
+import random
+import resource
+import string
+import tempfile
+import time
+
+ROWS = 20000
+SHARDS = 4
+
+
+def _write_fixture(directory):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    rng = random.Random(0)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))) for _ in range(5000)]
+    for shard in range(SHARDS):
+        count = ROWS // SHARDS
+        pq.write_table(pa.table({
+            "text": [" ".join(rng.choices(words, k=rng.randint(200, 600))) for _ in range(count)],
+            "timestamp": [f"2019-04-{rng.randint(10, 28)}T{rng.randint(0, 23):02d}:00:00Z" for _ in range(count)],
+            "url": [f"https://example.com/{rng.randint(0, 10 ** 9)}" for _ in range(count)],
+        }), os.path.join(directory, f"train-{shard:05d}.parquet"))
+
+
+def _rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # kilobytes on Linux
+
+
+def _sample(path, directory, results):
+    from itertools import islice
+    import pandas as pd
+    from datasets import load_dataset
+    from metrics.shard_sampler import ShardSampler
+
+    ds = load_dataset("parquet", data_files=os.path.join(directory, "*.parquet"), split="train", streaming=True)
+    before = _rss_mb()
+    start = time.perf_counter()
+    if path == "rows":
+        sample = pd.DataFrame.from_records(list(islice(ds, 10000)))
+        rows = len(sample)
+    else:
+        # the metric samples the Parquet copy of a hub dataset the same way, over range requests
+        sample = ShardSampler(rows=10000).sample_parquet(sorted(glob.glob(os.path.join(directory, "*.parquet"))))
+        rows = sample.num_rows
+    results.put((path, rows, _rss_mb() - before, time.perf_counter() - start))
+
+
+def run():
+    print("========== Dataset Sampling Benchmark ==========")
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        _write_fixture(directory)
+        for path in ("rows", "arrow"):
+            results = context.Queue()
+            process = context.Process(target=_sample, args=(path, directory, results))
+            process.start()
+            name, rows, rss, seconds = results.get()
+            process.join()
+            label = "row dicts + pandas" if name == "rows" else "shard-sampled Arrow"
+            print(f"{label:>20}: {rows} rows, peak RSS +{rss:.0f} MB, {seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,64 @@
+# Run: PYTHONPATH=src python3 -m tests.test_analysis_cache
+
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+from metrics import repo_analyzer
+from metrics.analysis_cache import AnalysisCache
+from metrics.repo_analyzer import FileStats, RepositoryAnalyzer
+
+
+def _commit_files(repo, files):
+    for name, content in files.items():
+        with open(os.path.join(repo, name), "w") as f:
+            f.write(content)
+    subprocess.run(["git", "-C", repo, "add", "."], check=True)
+    subprocess.run(["git", "-C", repo, "-c", "user.name=Ada", "-c", "user.email=a@example.com",
+                    "commit", "-q", "-m", "update"], check=True)
+
+
+def test_get_and_put():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = AnalysisCache(Path(temp_dir) / "files.sqlite3", max_entries=2)
+        assert cache.get_many(["a"]) == {}
+        cache.put_many({"a": FileStats(10, 2, 1, 3, True), "b": FileStats(1, 0, 0, 1, False)})
+        assert cache.get_many(["a", "b", "c"]) == {"a": FileStats(10, 2, 1, 3, True), "b": FileStats(1, 0, 0, 1, False)}
+
+        cache.get_many(["a"]) # "a" is now more recently used than "b"
+        cache.put_many({"c": FileStats(5, 1, 0, 0, True)})
+        assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+
+
+def test_only_changed_blobs_are_analyzed():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        repo = os.path.join(temp_dir, "repo")
+        subprocess.run(["git", "init", "-q", "-b", "main", repo], check=True)
+        _commit_files(repo, {f"mod{i}.py": f"def f{i}():\n    return {i}\n" for i in range(5)})
+        cache = AnalysisCache(Path(temp_dir) / "files.sqlite3", max_entries=1000)
+
+        analyzed = []
+        analyze_source = repo_analyzer.analyze_source
+        repo_analyzer.analyze_source = lambda content, n: analyzed.append(content) or analyze_source(content, n)
+        try:
+            first = RepositoryAnalyzer(cache=cache).analyze(repo)
+            assert len(analyzed) == 5
+
+            _commit_files(repo, {"mod0.py": "def changed():\n    return 0\n"})
+            analyzed.clear()
+            second = RepositoryAnalyzer(cache=cache).analyze(repo)
+            print(f"Files analyzed on the re-run: {len(analyzed)}")
+            assert analyzed == ["def changed():\n    return 0\n"]
+            assert second._replace(file_violations={}) == first._replace(file_violations={})
+        finally:
+            repo_analyzer.analyze_source = analyze_source
+
+
+def run():
+    print("========== Analysis Cache Tests ==========")
+    test_get_and_put()
+    test_only_changed_blobs_are_analyzed()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,125 @@
+# Run: PYTHONPATH=src python3 -m tests.test_async_fetch
+
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from parallel.async_fetch import AsyncFetcher
+from parallel.batch_runner import run_batch_async
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    failures_left = 0
+    requests = 0
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.requests += 1
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+            fail = cls.failures_left > 0
+            cls.failures_left -= 1
+        time.sleep(0.05)
+        with cls.lock:
+            cls.active -= 1
+        if fail:
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def test_retries():
+    server, url = _serve()
+
+    async def fetch():
+        async with AsyncFetcher(max_retries=3, backoff_base=0.01) as fetcher:
+            return await fetcher.request('GET', url)
+
+    try:
+        _Handler.failures_left = 2
+        response = asyncio.run(fetch())
+        assert response.status == 200 and response.text == "ok"
+    finally:
+        _Handler.failures_left = 0
+        server.shutdown()
+
+
+def test_per_host_limit():
+    server, url = _serve()
+    host = url.split("/")[2]
+
+    async def fetch_all():
+        async with AsyncFetcher(host_limits={host: 2}) as fetcher:
+            return await asyncio.gather(*(fetcher.request('GET', url) for _ in range(8)))
+
+    try:
+        _Handler.peak = 0
+        responses = asyncio.run(fetch_all())
+        print(f"Peak concurrent requests with a limit of 2: {_Handler.peak}")
+        assert [r.status for r in responses] == [200] * 8
+        assert _Handler.peak <= 2
+    finally:
+        server.shutdown()
+
+
+def test_shared_requests():
+    server, url = _serve()
+
+    async def fetch_all():
+        async with AsyncFetcher() as fetcher:
+            start = lambda: fetcher.request('GET', url)
+            return await asyncio.gather(*(fetcher._shared(("same",), start) for _ in range(5)))
+
+    try:
+        _Handler.requests = 0
+        responses = asyncio.run(fetch_all())
+        assert [r.text for r in responses] == ["ok"] * 5
+        assert _Handler.requests == 1
+    finally:
+        server.shutdown()
+
+
+def test_run_batch_async():
+    async def score(group, fetcher):
+        await asyncio.sleep(0.01)
+        if group == "bad":
+            raise ValueError("bad group")
+        return {"name": group}
+
+    results = []
+    failed = asyncio.run(run_batch_async(["a", "bad", "b"], score, on_result=results.append, concurrency=2))
+    assert failed == [1]
+    assert sorted(r["name"] for r in results) == ["a", "b"]
+
+
+def run():
+    print("========== Async Fetch Tests ==========")
+    test_retries()
+    test_per_host_limit()
+    test_shared_requests()
+    test_run_batch_async()
+
+
+if __name__ == "__main__":
+    run()
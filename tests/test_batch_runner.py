@@ -0,0 +1,84 @@
+# Run: PYTHONPATH=src python3 -m tests.test_batch_runner
+
+import os
+from parallel.batch_runner import run_batch
+
+
+def _score(group: int) -> dict:
+    if group == 3:
+        raise ValueError("bad group")
+    return {"name": str(group), "net_score": group / 10}
+
+
+def _score_or_die(group: int) -> dict:
+    if group == 2:
+        os._exit(1) # simulates a worker killed mid-group
+    return {"name": str(group)}
+
+
+def _score_or_die_twice(group: int) -> dict:
+    if group in (2, 5):
+        os._exit(1)
+    return {"name": str(group)}
+
+
+def _pid_or_die(group: int) -> dict:
+    if group == 2:
+        os._exit(1)
+    return {"name": str(group), "pid": os.getpid()}
+
+
+def test_sequential():
+    results = []
+    failed = run_batch([1, 2, 3, 4], _score, on_result=results.append, workers=1)
+    print(f"Sequential results: {results}")
+    assert failed == [2]
+    assert [r["name"] for r in results] == ["1", "2", "4"]
+
+
+def test_process_pool():
+    results = []
+    failed = run_batch(list(range(8)), _score, on_result=results.append, workers=4)
+    print(f"Pool results: {sorted(r['name'] for r in results)}")
+    assert failed == [3]
+    assert sorted(int(r["name"]) for r in results) == [0, 1, 2, 4, 5, 6, 7]
+
+
+def test_worker_crash():
+    results = []
+    failed = run_batch(list(range(6)), _score_or_die, on_result=results.append, workers=2)
+    print(f"Crash results: {sorted(r['name'] for r in results)}, failed: {failed}")
+    assert failed == [2]
+    assert sorted(int(r["name"]) for r in results) == [0, 1, 3, 4, 5]
+
+
+def test_crashes_spare_neighbours():
+    # every group still running when a pool breaks is retried alone, not failed with the crasher
+    results = []
+    failed = run_batch(list(range(10)), _score_or_die_twice, on_result=results.append, workers=4)
+    assert failed == [2, 5]
+    assert sorted(int(r["name"]) for r in results) == [0, 1, 3, 4, 6, 7, 8, 9]
+
+
+def test_pool_survives_a_crash():
+    # after the crash only the groups that were running are isolated, the rest share a new pool
+    results = []
+    failed = run_batch(list(range(24)), _pid_or_die, on_result=results.append, workers=2)
+    pids = {r["pid"] for r in results}
+    print(f"Worker processes used for 24 groups after a crash: {len(pids)}")
+    assert failed == [2]
+    assert sorted(int(r["name"]) for r in results) == [i for i in range(24) if i != 2]
+    assert len(pids) <= 6 # two pools of two workers and one isolated neighbour at most
+
+
+def run():
+    print("========== Batch Runner Tests ==========")
+    test_sequential()
+    test_process_pool()
+    test_worker_crash()
+    test_crashes_spare_neighbours()
+    test_pool_survives_a_crash()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,136 @@
+# Run: PYTHONPATH=src python3 -m tests.test_clone_store
+
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from metrics import busfactor
+from parsing import clone_store as cs
+from parsing.url_base import Codebase
+
+
+def _make_origin(path):
+    # a local repository with commits from two authors
+    subprocess.run(["git", "init", "-q", "-b", "main", path], check=True)
+    for i, author in enumerate(["Ada", "Ada", "Ada", "Grace"]):
+        with open(os.path.join(path, "module.py"), "a") as f:
+            f.write(f"x{i} = {i}\n")
+        subprocess.run(["git", "-C", path, "add", "module.py"], check=True)
+        subprocess.run(["git", "-C", path, "-c", f"user.name={author}", "-c", "user.email=a@example.com",
+                        "commit", "-q", "-m", f"commit {i}"], check=True)
+
+
+def test_concurrent_callers_share_one_clone():
+    calls = []
+
+    def loader(url, path, deadline, timeout, history, checkout):
+        calls.append(url)
+        time.sleep(0.1)
+        return cs.Repo.init(path)
+
+    store = cs.CloneStore(loader)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        repos = list(pool.map(lambda _: store.get("https://github.com/a/b"), range(4)))
+    assert len(calls) == 1
+    assert all(r is repos[0] for r in repos)
+
+    path = repos[0].working_dir
+    store.release("https://github.com/a/b")
+    assert not os.path.exists(path)
+
+
+def test_kept_until_the_last_holder_releases():
+    # two groups sharing a codebase: the first to finish must not delete the other's checkout
+    store = cs.CloneStore(lambda url, path, deadline, timeout, history, checkout: cs.Repo.init(path))
+    store.acquire("https://github.com/a/b")
+    store.acquire("https://github.com/a/b")
+    path = store.get("https://github.com/a/b").working_dir
+    store.release("https://github.com/a/b")
+    assert os.path.exists(path) and store.get("https://github.com/a/b").working_dir == path
+    store.release("https://github.com/a/b")
+    assert not os.path.exists(path)
+
+
+def test_failed_clones_are_not_remembered():
+    calls = []
+
+    def loader(url, path, deadline, timeout, history, checkout):
+        calls.append(url)
+        return None
+
+    store = cs.CloneStore(loader)
+    assert store.get("https://github.com/a/b") is None
+    assert store.get("https://github.com/a/b") is None
+    assert len(calls) == 2
+
+
+def test_waiter_with_more_time_retries():
+    # the first caller's clone runs out of its short timeout; a waiter with a longer one clones again
+    calls = []
+
+    def loader(url, path, deadline, timeout, history, checkout):
+        calls.append(timeout)
+        time.sleep(0.1)
+        return cs.Repo.init(path) if timeout > 1 else None
+
+    store = cs.CloneStore(loader)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        short = pool.submit(store.get, "https://github.com/a/b", cs.Deadline(1), 1)
+        time.sleep(0.02)
+        long = pool.submit(store.get, "https://github.com/a/b", cs.Deadline(60), 60)
+        assert short.result() is None
+        assert long.result() is not None
+    assert calls == [1, 60]
+    store.clear()
+
+
+def test_unreadable_clone_history():
+    # a clone cut short before it has a HEAD gives no commit map rather than failing the metric
+    store = cs.CloneStore(lambda url, path, deadline, timeout, history, checkout: cs.Repo.init(path))
+    original_store = busfactor.clone_store
+    busfactor.clone_store = store
+    try:
+        metric = busfactor.BusFactorMetric(Codebase("https://github.com/a/b"))
+        assert metric._get_clone_commit_map() is None
+    finally:
+        busfactor.clone_store = original_store
+        store.clear()
+
+
+def test_bus_factor_from_history_clone():
+    with tempfile.TemporaryDirectory() as origin:
+        _make_origin(origin)
+
+        def loader(url, path, deadline, timeout, history, checkout):
+            assert history
+            return cs.clone_repository(f"file://{origin}", path, deadline, timeout, history, checkout)
+
+        store = cs.CloneStore(loader)
+        original_store = busfactor.clone_store
+        os.environ["BUS_FACTOR_FROM_CLONE"] = "1"
+        busfactor.clone_store = store
+        try:
+            metric = busfactor.BusFactorMetric(Codebase("https://github.com/a/b"))
+            commit_map = metric._get_commit_map()
+            print(f"Commit map from local clone: {commit_map}")
+            assert commit_map == {"Ada": 3, "Grace": 1}
+            assert metric._distribution_function(commit_map) > 0
+        finally:
+            busfactor.clone_store = original_store
+            os.environ.pop("BUS_FACTOR_FROM_CLONE")
+            store.clear()
+
+
+def run():
+    print("========== Clone Store Tests ==========")
+    test_concurrent_callers_share_one_clone()
+    test_kept_until_the_last_holder_releases()
+    test_failed_clones_are_not_remembered()
+    test_waiter_with_more_time_retries()
+    test_unreadable_clone_history()
+    test_bus_factor_from_history_clone()
+
+
+if __name__ == "__main__":
+    run()
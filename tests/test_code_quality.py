@@ -94,6 +94,9 @@ def test_code_quality():
                 print(f"  Recency Score: {analyzer.recency_score:.3f}")
                 print(f"  Total Functions: {analyzer.total_functions}")
                 print(f"  Style Violations: {analyzer.style_violations}")
+                print(f"  Files Sampled: {analyzer.files_sampled}")
+                print(f"  Function Length Interval: {analyzer.function_length_interval}")
+                print(f"  Style Interval: {analyzer.style_interval}")
                 print(f"  Days Since Last Commit: {analyzer.days_since_last_commit}")
 
         except Exception as e:
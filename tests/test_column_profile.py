@@ -0,0 +1,43 @@
+# Run: PYTHONPATH=src python3 -m tests.test_column_profile
+
+import pyarrow as pa
+from metrics.column_profile import naming_classes, profile_table
+
+
+def test_naming_classes():
+    names = ["label", "userId", "FullName", "max-len", "URL_PATH", "col 2", "x"]
+    assert naming_classes(names) == ["snake_case", "camelCase", "PascalCase", "kebab-case", "UPPER_CASE",
+                                     "other", "snake_case"]
+    assert naming_classes([]) == []
+
+
+def test_profile_table():
+    union = pa.UnionArray.from_sparse(pa.array([0, 1, 0, 1], type=pa.int8()),
+                                      [pa.array([1, 2, 3, 4]), pa.array(["a", "b", "c", "d"])])
+    table = pa.table({
+        "text": ["a", None, "c", "d"],
+        "Score": [1.0, float("nan"), None, 2.0],
+        "mixed": union,
+        "empty": pa.array([None] * 4, type=pa.int64()),
+    })
+    profile = profile_table(table)
+    by_name = {column.name: column for column in profile.columns}
+    print(f"Type histograms: {[c.type_counts for c in profile.columns]}")
+    assert by_name["text"].type_counts == {"string": 3, "null": 1}
+    assert by_name["Score"].type_counts == {"double": 2, "null": 2} # NaN is missing, like pandas' isnull
+    assert by_name["mixed"].type_counts == {"int64": 2, "string": 2}
+    assert by_name["empty"].type_counts == {"null": 4}
+    assert profile.missing_cells == 7 and profile.missing_fraction == 7 / 16
+    assert profile.naming_classes == {"snake_case": 3, "PascalCase": 1}
+
+    assert profile_table(pa.table({})).missing_fraction == 1.0
+
+
+def run():
+    print("========== Column Profile Tests ==========")
+    test_naming_classes()
+    test_profile_table()
+
+
+if __name__ == "__main__":
+    run()
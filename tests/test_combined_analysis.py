@@ -0,0 +1,57 @@
+# Run: PYTHONPATH=src python3 -m tests.test_combined_analysis
+
+import json
+import threading
+import time
+from metrics import combined_analysis as ca
+
+REPLY = json.dumps({
+    "license": {"license_score": 1.0, "license_name": "apache-2.0", "confidence": 0.9, "rationale": "Apache 2.0"},
+    "documentation": {"documentation_score": 0.8, "confidence": 0.7, "rationale": "Good"},
+    "performance_claims": {"benchmark_presence": 1.0, "benchmark_quality": 0.5, "score_credibility": 0.5,
+                           "reproducibility": 0.0, "reasoning": "GLUE"}
+})
+
+
+def test_one_request_for_all_sections():
+    calls = []
+
+    def fake_chat_completion(api_key, request, readme):
+        calls.append(request.prompt)
+        time.sleep(0.1)
+        return "Here you go:\n" + REPLY
+
+    original = ca.cached_chat_completion
+    ca.cached_chat_completion = fake_chat_completion
+    try:
+        store = ca.CombinedAnalysis()
+        sections = {}
+        threads = [threading.Thread(target=lambda n=name: sections.setdefault(n, store.section(n, "key", "# README")))
+                   for name in ca.SECTIONS]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        ca.cached_chat_completion = original
+
+    print(f"LLM requests for three sections: {len(calls)}")
+    assert len(calls) == 1
+    assert sections["license"]["license_name"] == "apache-2.0"
+    assert sections["documentation"]["documentation_score"] == 0.8
+    assert sections["performance_claims"]["benchmark_presence"] == 1.0
+
+
+def test_unparseable_reply():
+    assert ca._parse_llm_response("no json here") == {}
+    assert ca._parse_llm_response('{"license": "oops"}') == {}
+
+
+def run():
+    print("========== Combined LLM Analysis Tests ==========")
+    test_one_request_for_all_sections()
+    test_unparseable_reply()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,82 @@
+# Run: PYTHONPATH=src python3 -m tests.test_commit_index
+
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from metrics.busfactor import BusFactorMetric
+from metrics.commit_index import CommitIndex, CommitRecord
+from parsing.url_base import Model
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # a Hugging Face style commit listing, newest first, two commits per page
+    commits = []
+    requests = 0
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests += 1
+        page = int(self.path.rsplit("p=", 1)[1]) if "p=" in self.path else 0
+        items = cls.commits[page * 2:page * 2 + 2]
+        body = json.dumps([{"id": sha, "authors": [{"user": author}], "date": f"2025-01-0{i + 1}T00:00:00Z"}
+                           for i, (sha, author) in enumerate(items)]).encode()
+        self.send_response(200)
+        if page * 2 + 2 < len(cls.commits):
+            self.send_header("Link", f'<http://{self.headers["Host"]}/commits?p={page + 1}>; rel="next"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_refresh_adds_new_commits():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index = CommitIndex(Path(temp_dir) / "authors.sqlite3")
+        first = index.refresh("repo", None, [CommitRecord("c2", "ada", "2"), CommitRecord("c1", "bob", "1")], False)
+        assert index.get("repo") == first
+        assert first.counts == {"ada": 1, "bob": 1} and first.head_sha == "c2"
+
+        second = index.refresh("repo", first, [CommitRecord("c3", "ada", "3")], True)
+        assert second.counts == {"ada": 2, "bob": 1} and second.head_sha == "c3"
+        assert index.refresh("repo", second, [], True) == second
+
+        # the listing never reached the indexed head: the counts are rebuilt from it
+        rebuilt = index.refresh("repo", second, [CommitRecord("x1", "eve", "4")], False)
+        assert rebuilt.counts == {"eve": 1}
+
+
+def test_incremental_huggingface_listing():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/commits"
+    try:
+        metric = BusFactorMetric(Model("https://huggingface.co/bigcode/santacoder"))
+        _Handler.commits = [("c5", "ada"), ("c4", "ada"), ("c3", "bob"), ("c2", "bob"), ("c1", "eve")]
+        _Handler.requests = 0
+        commits, reached_head = metric._get_huggingface_commits(url)
+        assert [c.sha for c in commits] == ["c5", "c4", "c3", "c2", "c1"] and not reached_head
+        assert _Handler.requests == 3
+
+        # two new commits on top of the indexed head c5: one request is enough
+        _Handler.commits = [("c7", "eve"), ("c6", "ada")] + _Handler.commits
+        _Handler.requests = 0
+        commits, reached_head = metric._get_huggingface_commits(url, stop_at="c5")
+        print(f"Requests for an incremental refresh: {_Handler.requests}")
+        assert [c.sha for c in commits] == ["c7", "c6"] and reached_head
+        assert _Handler.requests == 2 # c5 is the first commit of the second page
+    finally:
+        server.shutdown()
+
+
+def run():
+    print("========== Commit Index Tests ==========")
+    test_refresh_adds_new_commits()
+    test_incremental_huggingface_listing()
+
+
+if __name__ == "__main__":
+    run()
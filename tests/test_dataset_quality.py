@@ -1,6 +1,33 @@
+import datasets
+import pandas as pd
 from metrics.dataset_quality import DatasetQualityMetric
 from parsing.url_base import *
 
+def _fixture(rows=2500):
+    # wide enough to mix nulls, NaN, lists and naming conventions, split over several shards
+    return datasets.Dataset.from_dict({
+        "text": ["x" * (i % 50) for i in range(rows)],
+        "label": [i if i % 3 else None for i in range(rows)],
+        "Score": [float("nan") if i % 7 == 0 else 1.0 for i in range(rows)],
+        "tags": [["a"] if i % 2 else None for i in range(rows)],
+    }).to_iterable_dataset(num_shards=4)
+
+def test_arrow_sample():
+    dq = DatasetQualityMetric(Dataset("https://huggingface.co/datasets/acme/corpus"))
+    table = dq._sample_table(_fixture(), rows=1000)
+    assert table.num_rows == 1000 and table.column_names == ["text", "label", "Score", "tags"]
+
+    # drawn from every shard, not just the head of the first one
+    assert max(label for label in table.column("label").to_pylist() if label is not None) >= 1875
+
+    # same score as the former path (row dicts into a pandas DataFrame) on the same rows
+    df = pd.DataFrame.from_records(table.to_pylist())
+    expected = (1000 / 10000 * 0.35 + (1 - df.isnull().mean().mean()) * 0.25
+                + 4 / 50 * 0.20 + 1.0 * 0.20)
+    score = dq._analyze_dataset(table)
+    print(f"Arrow sample score: {score}")
+    assert abs(score - expected) < 1e-9
+
 def test_code(examples):
     for i,e in enumerate(examples):
         m = Dataset(e)
@@ -13,6 +40,7 @@ def test_code(examples):
 
 def run():
     print("========== Dataset Quality Score Tests ==========")
+    test_arrow_sample()
     examples = [
         "https://huggingface.co/datasets/allenai/c4", # c4 (provided ex)
         "https://huggingface.co/datasets/mteb/STS", # mteb/STS
@@ -21,4 +49,4 @@ def run():
     test_code(examples)
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run()
@@ -0,0 +1,54 @@
+# Run: PYTHONPATH=src python3 -m tests.test_group_executor
+
+import time
+from parallel.group_executor import run_metrics
+
+
+class _SleepyMetric:
+    def __init__(self, seconds: float, fail: bool = False):
+        self.seconds = seconds
+        self.fail = fail
+        self.score = 0.0
+        self.latency = 0.0
+
+    def calculate(self) -> float:
+        start_time = time.perf_counter()
+        time.sleep(self.seconds)
+        if self.fail:
+            raise ValueError("metric failed")
+        self.score = 1.0
+        self.latency = (time.perf_counter() - start_time) * 1000
+        return self.score
+
+
+def test_concurrent_wall_time():
+    metrics = [_SleepyMetric(0.3), _SleepyMetric(0.3), _SleepyMetric(0.3), None, _SleepyMetric(0.3)]
+    start = time.perf_counter()
+    run_metrics(metrics)
+    elapsed = time.perf_counter() - start
+    print(f"Wall time for 4 x 0.3s metrics: {elapsed:.2f}s")
+    assert elapsed < 0.9
+    for m in metrics[:3] + metrics[4:]:
+        assert m.score == 1.0
+        assert 250 <= m.latency < 900 # each metric keeps its own latency
+
+
+def test_error_propagates_after_all_finish():
+    slow = _SleepyMetric(0.2)
+    try:
+        run_metrics([_SleepyMetric(0.0, fail=True), slow])
+    except ValueError as e:
+        print(f"Raised as expected: {e}")
+    else:
+        raise AssertionError("expected the metric's exception to be re-raised")
+    assert slow.score == 1.0
+
+
+def run():
+    print("========== Group Executor Tests ==========")
+    test_concurrent_wall_time()
+    test_error_propagates_after_all_finish()
+
+
+if __name__ == "__main__":
+    run()
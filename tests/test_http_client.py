@@ -0,0 +1,101 @@
+# Run: PYTHONPATH=src python3 -m tests.test_http_client
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from parallel.http_client import HttpClient
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive, so the pooled session can reuse the connection
+    failures_left = 0
+    active = 0
+    peak = 0
+    ports = set()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.ports.add(self.client_address[1])
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+            fail = cls.failures_left > 0
+            cls.failures_left -= 1
+        time.sleep(0.05)
+        with cls.lock:
+            cls.active -= 1
+        if fail:
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def test_retries_and_connection_reuse():
+    server, url = _serve()
+    try:
+        _Handler.failures_left = 2
+        _Handler.ports = set()
+        client = HttpClient(max_retries=3, backoff_base=0.01)
+        response = client.get(url)
+        assert response.status_code == 200 and response.text == "ok"
+        for _ in range(3):
+            assert client.get(url).status_code == 200
+        print(f"Connections used for 6 requests: {len(_Handler.ports)}")
+        assert len(_Handler.ports) == 1
+    finally:
+        server.shutdown()
+
+
+def test_gives_up_after_max_retries():
+    server, url = _serve()
+    try:
+        _Handler.failures_left = 10
+        client = HttpClient(max_retries=1, backoff_base=0.01)
+        assert client.get(url).status_code == 503
+    finally:
+        _Handler.failures_left = 0
+        server.shutdown()
+
+
+def test_per_host_limit():
+    server, url = _serve()
+    try:
+        _Handler.peak = 0
+        host = url.split("/")[2]
+        client = HttpClient(host_limits={host: 2})
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            codes = list(pool.map(lambda _: client.get(url).status_code, range(8)))
+        print(f"Peak concurrent requests with a limit of 2: {_Handler.peak}")
+        assert codes == [200] * 8
+        assert _Handler.peak <= 2
+    finally:
+        server.shutdown()
+
+
+def run():
+    print("========== HTTP Client Tests ==========")
+    test_retries_and_connection_reuse()
+    test_gives_up_after_max_retries()
+    test_per_host_limit()
+
+
+if __name__ == "__main__":
+    run()
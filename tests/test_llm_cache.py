@@ -0,0 +1,56 @@
+# Run: PYTHONPATH=src python3 -m tests.test_llm_cache
+
+import tempfile
+import time
+from pathlib import Path
+from metrics.llm_cache import LLMCache
+
+
+def test_hit_and_key_parts():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = LLMCache(Path(temp_dir) / "llm.sqlite3", ttl_seconds=3600, max_entries=10)
+        key = LLMCache.make_key("# README", "license-v1", "llama3.1:latest", 0.1)
+        assert cache.get(key) is None
+        cache.put(key, '{"license_score": 1.0}')
+        assert cache.get(key) == '{"license_score": 1.0}'
+
+        # a different prompt version, model, temperature or README is a different entry
+        assert key != LLMCache.make_key("# README", "license-v2", "llama3.1:latest", 0.1)
+        assert key != LLMCache.make_key("# README", "license-v1", "llama3.2:latest", 0.1)
+        assert key != LLMCache.make_key("# README", "license-v1", "llama3.1:latest", 0.2)
+        assert key != LLMCache.make_key("# README!", "license-v1", "llama3.1:latest", 0.1)
+
+
+def test_ttl_expiry():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = LLMCache(Path(temp_dir) / "llm.sqlite3", ttl_seconds=0.2, max_entries=10)
+        cache.put("k", "reply")
+        assert cache.get("k") == "reply"
+        time.sleep(0.3)
+        assert cache.get("k") is None
+
+
+def test_lru_eviction():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = LLMCache(Path(temp_dir) / "llm.sqlite3", ttl_seconds=3600, max_entries=2)
+        cache.put("a", "1")
+        time.sleep(0.01)
+        cache.put("b", "2")
+        time.sleep(0.01)
+        assert cache.get("a") == "1" # "a" is now more recently used than "b"
+        time.sleep(0.01)
+        cache.put("c", "3")
+        print(f"Entries after eviction: a={cache.get('a')}, b={cache.get('b')}, c={cache.get('c')}")
+        assert cache.get("b") is None
+        assert cache.get("a") == "1" and cache.get("c") == "3"
+
+
+def run():
+    print("========== LLM Cache Tests ==========")
+    test_hit_and_key_parts()
+    test_ttl_expiry()
+    test_lru_eviction()
+
+
+if __name__ == "__main__":
+    run()
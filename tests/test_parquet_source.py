@@ -0,0 +1,174 @@
+# Run: PYTHONPATH=src python3 -m tests.test_parquet_source
+
+import hashlib
+import io
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pyarrow as pa
+import pyarrow.parquet as pq
+import requests
+from metrics.dataset_quality import DatasetQualityMetric
+from metrics.parquet_source import TAIL_BYTES, HttpRangeFile, list_parquet_files, read_footers, read_sample
+from parallel import http_client
+from parsing.url_base import Dataset
+
+
+def _shard(start, rows):
+    table = pa.table({
+        "text": [hashlib.sha256(str(i).encode()).hexdigest() * 8 for i in range(start, start + rows)],
+        "label": [i % 4 if i % 5 else None for i in range(start, start + rows)],
+        "tags": [["a", "b"] if i % 2 else None for i in range(start, start + rows)],
+    })
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, row_group_size=1000)
+    return table, buffer.getvalue()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # serves a Parquet listing and the shards, honouring Range headers
+    protocol_version = "HTTP/1.1"
+    files = {}
+    bytes_served = 0
+
+    def do_GET(self):
+        if self.path.endswith("/parquet"):
+            base = f"http://{self.headers['Host']}"
+            body = json.dumps({"default": {"train": [f"{base}/shards/{name}" for name in sorted(self.files)]}}).encode()
+            return self._send(200, body, {"Content-Type": "application/json"})
+        data = self.files.get(self.path.rsplit("/", 1)[-1])
+        if data is None:
+            return self._send(404, b"")
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range", ""))
+        if not match:
+            return self._send(200, data)
+        first, last = match.groups()
+        if not first:
+            start, end = max(0, len(data) - int(last)), len(data) - 1
+        else:
+            start, end = int(first), min(int(last or len(data) - 1), len(data) - 1)
+        self._send(206, data[start:end + 1], {"Content-Range": f"bytes {start}-{end}/{len(data)}"})
+
+    def _send(self, status, body, headers=None):
+        type(self).bytes_served += len(body)
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    tables = []
+    for shard, start in enumerate(range(0, 12000, 4000)):
+        table, data = _shard(start, 4000)
+        tables.append(table)
+        _Handler.files[f"{shard:04d}.parquet"] = data
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", pa.concat_tables(tables)
+
+
+def test_footers_and_sample():
+    server, base, full = _serve()
+    try:
+        config, urls = list_parquet_files("acme/corpus", f"{base}/api")
+        assert config == "default" and len(urls) == 3
+
+        _Handler.bytes_served = 0
+        footers = read_footers(urls)
+        total = sum(len(data) for data in _Handler.files.values())
+        print(f"Footers: {footers.rows} rows, {_Handler.bytes_served} of {total} bytes fetched")
+        assert footers.rows == 12000 and footers.schema.names == ["text", "label", "tags"]
+        assert footers.null_counts["label"] == full.column("label").null_count
+        assert footers.null_counts["tags"] is None # nested, the leaf statistics do not say
+        assert _Handler.bytes_served <= len(urls) * TAIL_BYTES < total / 5 # one tail request per shard
+
+        sample = read_sample(urls[0], 1000)
+        assert sample.num_rows == 1000 and sample.schema == full.schema
+    finally:
+        server.shutdown()
+
+
+def test_footer_sample():
+    # past max_footers shards only a sample of footers is read and the counts are scaled up
+    server, base, full = _serve()
+    try:
+        _, urls = list_parquet_files("acme/corpus", f"{base}/api")
+        _Handler.bytes_served = 0
+        footers = read_footers(urls, max_footers=2)
+        print(f"Footers of 2 of {len(urls)} shards: {footers.rows} rows estimated")
+        assert footers.shards_read == 2 and _Handler.bytes_served <= 2 * TAIL_BYTES
+        assert footers.rows == full.num_rows # the shards are alike
+        assert footers.null_counts["label"] == full.column("label").null_count
+        assert read_footers(urls).shards_read == 3
+    finally:
+        server.shutdown()
+
+
+def test_range_requests_time_out():
+    # without a timeout of its own, a range request still gets http_client's default one
+    server, base, _ = _serve()
+    timeouts = []
+    session_request = requests.Session.request
+
+    def request(self, method, url, **kwargs):
+        timeouts.append(kwargs.get("timeout"))
+        return session_request(self, method, url, **kwargs)
+
+    requests.Session.request = request
+    try:
+        HttpRangeFile(f"{base}/shards/0000.parquet")
+        HttpRangeFile(f"{base}/shards/0000.parquet", timeout=2)
+        assert timeouts == [http_client.default_client().timeout, 2]
+    finally:
+        requests.Session.request = session_request
+        server.shutdown()
+
+
+def test_metric_fast_path():
+    server, base, full = _serve()
+    try:
+        dq = DatasetQualityMetric(Dataset("https://huggingface.co/datasets/acme/corpus"), hub_api=f"{base}/api")
+        score = dq.calculate()
+        expected = dq._analyze_dataset(full)
+        print(f"Score from Parquet footers: {score}, from every row: {expected}")
+        assert abs(score - expected) < 0.005 # the tags null count is estimated from the sample
+    finally:
+        server.shutdown()
+
+
+def test_metric_parquet_sample():
+    # without the footer path the rows are sampled from the Parquet copy, not streamed
+    server, base, full = _serve()
+    try:
+        dq = DatasetQualityMetric(Dataset("https://huggingface.co/datasets/acme/corpus"), hub_api=f"{base}/api",
+                                  parquet_footers=False)
+        _Handler.bytes_served = 0
+        sample = dq._parquet_sample("acme/corpus", None, rows=1000)
+        total = sum(len(data) for data in _Handler.files.values())
+        print(f"Parquet sample: {sample.num_rows} rows, {_Handler.bytes_served} of {total} bytes fetched")
+        assert sample.num_rows == 1000 and sample.schema == full.schema
+        texts = set(full.column("text").to_pylist())
+        assert all(text in texts for text in sample.column("text").to_pylist())
+        assert _Handler.bytes_served < total / 2
+    finally:
+        server.shutdown()
+
+
+def run():
+    print("========== Parquet Source Tests ==========")
+    test_footers_and_sample()
+    test_footer_sample()
+    test_range_requests_time_out()
+    test_metric_fast_path()
+    test_metric_parquet_sample()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,77 @@
+# Run: PYTHONPATH=src python3 -m tests.test_readme_store
+
+import threading
+import time
+from parsing.readme_store import ReadmeStore
+
+
+def test_single_download_for_concurrent_callers():
+    calls = []
+
+    def loader(host, repo_id, revision):
+        calls.append(repo_id)
+        time.sleep(0.2)
+        return f"# {repo_id}"
+
+    store = ReadmeStore(loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.get("huggingface.co", "google/flan-t5-base")))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"Loader calls for 8 concurrent callers: {len(calls)}")
+    assert calls == ["google/flan-t5-base"]
+    assert results == ["# google/flan-t5-base"] * 8
+
+
+def test_misses_are_remembered():
+    calls = []
+
+    def loader(host, repo_id, revision):
+        calls.append((repo_id, revision))
+        return None # 404
+
+    store = ReadmeStore(loader)
+    assert store.get("huggingface.co", "owner/missing") is None
+    assert store.get("huggingface.co", "owner/missing") is None
+    assert store.get("huggingface.co", "owner/missing", "dev") is None
+    print(f"Loader calls: {calls}")
+    assert calls == [("owner/missing", None), ("owner/missing", "dev")]
+
+
+def test_errors_are_not_remembered():
+    attempts = []
+
+    def loader(host, repo_id, revision):
+        attempts.append(repo_id)
+        if len(attempts) == 1:
+            raise ConnectionError("network down")
+        return "# readme"
+
+    store = ReadmeStore(loader)
+    assert store.get("github.com", "owner/repo") is None
+    assert store.get("github.com", "owner/repo") == "# readme"
+
+
+def test_hosts_are_kept_apart():
+    # a GitHub repo and a Hugging Face model with the same owner/name have different READMEs
+    store = ReadmeStore(lambda host, repo_id, revision: f"# {repo_id} on {host}")
+    assert store.get("github.com", "openai/whisper") == "# openai/whisper on github.com"
+    assert store.get("huggingface.co", "openai/whisper") == "# openai/whisper on huggingface.co"
+    store.put("github.com", "acme/model", None, "# code")
+    assert store.peek("github.com", "acme/model") == (True, "# code")
+    assert store.peek("huggingface.co", "acme/model") == (False, None)
+
+
+def run():
+    print("========== README Store Tests ==========")
+    test_single_download_for_concurrent_callers()
+    test_misses_are_remembered()
+    test_errors_are_not_remembered()
+    test_hosts_are_kept_apart()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,105 @@
+# Run: PYTHONPATH=src python3 -m tests.test_ref_resolver
+
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from git import Repo
+from parallel.deadline import Deadline
+from parsing.readme_parser import ReadmeParser
+from parsing.ref_resolver import RefResolver, ref_resolver
+from parsing.repo_cache import clone_branch
+
+
+def _make_origin(path, branch):
+    subprocess.run(["git", "init", "-q", "-b", branch, path], check=True)
+    with open(os.path.join(path, "a.py"), "w") as f:
+        f.write("x = 1\n")
+    subprocess.run(["git", "-C", path, "add", "a.py"], check=True)
+    subprocess.run(["git", "-C", path, "-c", "user.name=Ada", "-c", "user.email=a@example.com",
+                    "commit", "-q", "-m", "first"], check=True)
+
+
+def test_resolves_and_remembers_default_branch():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        origin = os.path.join(temp_dir, "origin")
+        _make_origin(origin, "trunk")
+        resolver = RefResolver()
+        calls = []
+        lookup = resolver._ls_remote
+        resolver._ls_remote = lambda url, timeout: calls.append(url) or lookup(url, timeout)
+
+        assert resolver.default_branch(f"file://{origin}") == "trunk"
+        assert resolver.default_branch(f"file://{origin}/") == "trunk"
+        assert len(calls) == 1
+
+        # failed lookups are not remembered
+        assert resolver.default_branch(f"file://{temp_dir}/missing") is None
+        assert resolver.default_branch(f"file://{temp_dir}/missing") is None
+        assert len(calls) == 3
+
+
+def test_clone_uses_default_branch():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        origin = os.path.join(temp_dir, "origin")
+        _make_origin(origin, "dev")
+        target = os.path.join(temp_dir, "clone")
+        clone_branch(f"file://{origin}", target, Deadline(30), depth=1)
+        branch = Repo(target).active_branch.name
+        print(f"Cloned branch: {branch}")
+        assert branch == "dev"
+        ref_resolver.clear()
+
+
+def test_huggingface_readmes_skip_git():
+    # Hugging Face READMEs are fetched from main (then master) without a git ls-remote
+    calls = []
+    default_branch = ref_resolver.default_branch
+    ref_resolver.default_branch = lambda url, timeout=None: calls.append(url) or "trunk"
+    try:
+        assert ReadmeParser._default_branch("huggingface.co", "acme/bert") is None
+        assert ReadmeParser._default_branch("github.com", "acme/widgets") == "trunk"
+        assert calls == ["https://github.com/acme/widgets"]
+    finally:
+        ref_resolver.default_branch = default_branch
+
+
+class _AuthHandler(BaseHTTPRequestHandler):
+    # a gated repository: every request wants credentials
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(401)
+        self.send_header("WWW-Authenticate", 'Basic realm="gated"')
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_no_credential_prompt():
+    # git gives up on a repository that wants credentials instead of prompting on the terminal
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _AuthHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        start = time.monotonic()
+        url = f"http://127.0.0.1:{server.server_address[1]}/acme/gated"
+        assert RefResolver(timeout=10).default_branch(url) is None
+        assert time.monotonic() - start < 5
+    finally:
+        server.shutdown()
+
+
+def run():
+    print("========== Ref Resolver Tests ==========")
+    test_resolves_and_remembers_default_branch()
+    test_clone_uses_default_branch()
+    test_huggingface_readmes_skip_git()
+    test_no_credential_prompt()
+
+
+if __name__ == "__main__":
+    run()
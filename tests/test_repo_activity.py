@@ -0,0 +1,103 @@
+# Run: PYTHONPATH=src python3 -m tests.test_repo_activity
+
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from parsing.repo_activity import RepoActivity
+
+PUSHED_AT = datetime.now(timezone.utc) - timedelta(days=3)
+MODIFIED_AT = datetime.now(timezone.utc) - timedelta(days=40)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = 0
+    responses = {
+        "/repos/acme/widgets": {"pushed_at": PUSHED_AT.strftime("%Y-%m-%dT%H:%M:%SZ")},
+        "/api/models/acme/bert": {"lastModified": MODIFIED_AT.strftime("%Y-%m-%dT%H:%M:%S.000Z")},
+        "/api/datasets/acme/corpus": {"lastModified": MODIFIED_AT.strftime("%Y-%m-%dT%H:%M:%S.000Z")},
+    }
+
+    def do_GET(self):
+        type(self).requests += 1
+        if self.path == "/repos/acme/slow":
+            time.sleep(2) # an API that does not answer in time
+        data = self.responses.get(self.path)
+        body = json.dumps(data).encode("utf-8") if data else b""
+        self.send_response(200 if data else 404)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_metadata_sources():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        activity = RepoActivity(github_api=base, huggingface_api=f"{base}/api")
+
+        pushed = activity.last_updated("https://github.com/acme/widgets.git")
+        print(f"GitHub pushed_at: {pushed}")
+        assert (datetime.now() - pushed).days == 3
+        assert (datetime.now() - activity.last_updated("https://huggingface.co/acme/bert")).days == 40
+        assert activity.last_updated("https://huggingface.co/datasets/acme/corpus") is not None
+
+        # remembered for the rest of the process, unknown repositories are not
+        requests = _Handler.requests
+        assert activity.last_updated("https://github.com/Acme/Widgets") == pushed
+        assert _Handler.requests == requests
+        assert activity.last_updated("https://github.com/acme/missing") is None
+        assert activity.last_updated("https://gitlab.com/acme/widgets") is None
+    finally:
+        server.shutdown()
+
+
+def test_one_cap_for_the_lookup():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        activity = RepoActivity(timeout=0.5, github_api=base)
+        start = time.monotonic()
+        lookup = activity.last_updated_async("https://github.com/acme/slow")
+        try:
+            lookup.result(timeout=1)
+        except TimeoutError:
+            pass # retries of the timed out request still running, the caller does not wait for them
+        print(f"Slow lookup given up after {time.monotonic() - start:.2f}s")
+        assert time.monotonic() - start < 1.5
+
+        pushed = activity.last_updated_async("https://github.com/acme/widgets").result(timeout=5)
+        assert (datetime.now() - pushed).days == 3
+    finally:
+        server.shutdown()
+
+
+def test_failed_api_after_the_deadline():
+    # the API call used up the whole timeout without an answer, so there is no date and no fallback
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        activity = RepoActivity(timeout=0.5, github_api=base)
+        assert activity.last_updated("https://github.com/acme/slow") is None
+    finally:
+        server.shutdown()
+
+
+def run():
+    print("========== Repository Activity Tests ==========")
+    test_metadata_sources()
+    test_one_cap_for_the_lookup()
+    test_failed_api_after_the_deadline()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,146 @@
+# Run: PYTHONPATH=src python3 -m tests.test_repo_analyzer
+
+import os
+import subprocess
+import tempfile
+from parsing.clone_store import clone_repository
+from metrics.repo_analyzer import RepositoryAnalyzer, analysis_pool, analyze_files, analyze_source
+from parallel.deadline import Deadline
+
+
+def _write(root, relative_path, content):
+    path = os.path.join(root, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def test_analyze_source():
+    long_body = "".join(f"    x{i} = {i}\n" for i in range(60))
+    stats = analyze_source(f"def short():\n    pass\n\nasync def long():\n{long_body}", max_function_lines=50)
+    assert (stats.functions, stats.long_functions, stats.parsed) == (2, 1, True)
+    assert stats.lines == 64
+
+    broken = analyze_source("def broken(:\n    pass\n", max_function_lines=50)
+    assert (broken.lines, broken.functions, broken.parsed) == (2, 0, False)
+    assert broken.violations >= 1 # the syntax error itself
+
+
+def test_style_violations():
+    clean = analyze_source("import os\n\n\ndef f():\n    return os.sep\n", max_function_lines=50)
+    assert clean.violations == 0
+    # E225 (missing whitespace around operator) and an unused import
+    messy = analyze_source("import os\nx=1\n", max_function_lines=50)
+    print(f"Violations in messy file: {messy.violations}")
+    assert messy.violations == 2
+
+
+def test_single_seeded_sample():
+    with tempfile.TemporaryDirectory() as repo:
+        for i in range(80):
+            _write(repo, f"pkg/mod{i}.py", "def f():\n    return 1\n")
+        _write(repo, ".git/hooks/skip.py", "def hidden():\n    pass\n")
+        _write(repo, "README.md", "# not python\n")
+
+        analyzer = RepositoryAnalyzer(sample_size=50, seed=7)
+        first = analyzer.analyze(repo)
+        second = analyzer.analyze(repo)
+        print(f"Sampled {len(first.files)} files, {first.functions} functions, {first.lines} lines")
+        assert first.files == second.files # same seed, same sample
+        assert len(first.files) == 50 and first.complete
+        assert not any(f.startswith(".git") for f in first.files)
+        # every statistic comes from the same 50 files
+        assert first.files_analyzed == 50 and first.functions == 50 and first.lines == 100
+        assert set(first.file_violations) == set(first.files)
+        assert RepositoryAnalyzer(sample_size=50, seed=8).analyze(repo).files != first.files
+
+
+def test_parallel_full_repository():
+    with tempfile.TemporaryDirectory() as repo:
+        for i in range(100):
+            _write(repo, f"pkg/mod{i}.py", "def f():\n    return 1\n\ndef g():\n    return 2\n")
+
+        sequential = RepositoryAnalyzer(sample_size=None).analyze(repo)
+        parallel = RepositoryAnalyzer(sample_size=None, workers=2, chunk_size=16).analyze(repo)
+        print(f"Parallel analysis: {parallel.files_analyzed} files, {parallel.functions} functions")
+        assert parallel.complete and parallel.files_analyzed == 100
+        assert parallel._replace(files=[]) == sequential._replace(files=[])
+        assert parallel.functions == 200
+
+
+def test_pools_per_worker_count():
+    # an analyzer asking for another worker count does not cancel the chunks of a running one
+    with tempfile.TemporaryDirectory() as repo:
+        for i in range(8):
+            _write(repo, f"mod{i}.py", "def f():\n    return 1\n")
+        files = sorted(os.listdir(repo))
+        running = analysis_pool(2).submit(analyze_files, repo, files, 50)
+        assert analysis_pool(3) is not analysis_pool(2)
+        results, finished = running.result(timeout=60)
+        assert finished and len(results) == 8
+
+        # a chunk that starts after the deadline stops instead of analyzing its files
+        late, finished = analysis_pool(2).submit(analyze_files, repo, files, 50, None, Deadline(0)).result(timeout=60)
+        assert late == [] and not finished
+
+
+def test_objects_without_checkout():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        origin = os.path.join(temp_dir, "origin")
+        subprocess.run(["git", "init", "-q", "-b", "main", origin], check=True)
+        for i in range(40):
+            _write(origin, f"pkg/mod{i}.py", "import os\r\nx=1\r\n\r\ndef f():\r\n    return 1\r\n")
+        _write(origin, "pkg/latin1.py", "")
+        with open(os.path.join(origin, "pkg/latin1.py"), "wb") as f:
+            f.write("name = '\xe9'\n".encode("latin-1"))
+        subprocess.run(["git", "-C", origin, "add", "."], check=True)
+        subprocess.run(["git", "-C", origin, "-c", "user.name=Ada", "-c", "user.email=a@example.com",
+                        "commit", "-q", "-m", "init"], check=True)
+
+        clone = clone_repository(f"file://{origin}", os.path.join(temp_dir, "clone"), timeout=30, checkout=False)
+        assert os.listdir(clone.working_dir) == [".git"] # nothing checked out
+
+        from_objects = RepositoryAnalyzer(sample_size=None, source="objects").analyze(clone.working_dir)
+        from_worktree = RepositoryAnalyzer(sample_size=None).analyze(origin)
+        print(f"Analyzed {from_objects.files_analyzed} files from the object database")
+        assert len(from_objects.files) == 41 and from_objects.files_analyzed == 40 # latin-1 is skipped
+        assert from_objects == from_worktree
+
+        parallel = RepositoryAnalyzer(sample_size=None, source="objects", workers=2, chunk_size=8)
+        assert parallel.analyze(clone.working_dir)._replace(files=[]) == from_objects._replace(files=[])
+
+
+def test_adaptive_sampling():
+    with tempfile.TemporaryDirectory() as repo:
+        # uniform files converge after min_files, varied ones need more
+        for i in range(200):
+            _write(repo, f"same/mod{i}.py", "def f():\n    return 1\n")
+        long_body = "".join(f"    x{i} = {i}\n" for i in range(60))
+        for i in range(200):
+            content = f"def f():\n{long_body}" if i % 3 == 0 else "def f():\n    return 1\n" * (1 + i % 5)
+            _write(repo, f"varied/mod{i}.py", content)
+
+        uniform = RepositoryAnalyzer(sample_size="adaptive", min_files=10).analyze(os.path.join(repo, "same"))
+        assert uniform.files_analyzed == 10 and uniform.long_function_margin == 0.0
+
+        loose = RepositoryAnalyzer(sample_size="adaptive", tolerance=0.2).analyze(os.path.join(repo, "varied"))
+        tight = RepositoryAnalyzer(sample_size="adaptive", tolerance=0.05).analyze(os.path.join(repo, "varied"))
+        print(f"Adaptive sample sizes: {loose.files_analyzed} (tolerance 0.2), {tight.files_analyzed} (0.05)")
+        assert loose.files_analyzed < tight.files_analyzed < 200
+        assert tight.long_function_margin <= 0.05 and tight.violation_margin <= 0.05
+        assert tight.complete and len(tight.files) == tight.files_analyzed
+
+
+def run():
+    print("========== Repository Analyzer Tests ==========")
+    test_analyze_source()
+    test_style_violations()
+    test_single_seeded_sample()
+    test_parallel_full_repository()
+    test_pools_per_worker_count()
+    test_objects_without_checkout()
+    test_adaptive_sampling()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,71 @@
+# Run: PYTHONPATH=src python3 -m tests.test_repo_cache
+
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+from parsing.repo_cache import RepoCache
+
+
+def _commit(origin, name):
+    with open(os.path.join(origin, name), "w") as f:
+        f.write("x = 1\n")
+    subprocess.run(["git", "-C", origin, "add", name], check=True)
+    subprocess.run(["git", "-C", origin, "-c", "user.name=Ada", "-c", "user.email=a@example.com",
+                    "commit", "-q", "-m", name], check=True)
+
+
+def test_fetch_on_revisit():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        origin = os.path.join(temp_dir, "origin")
+        subprocess.run(["git", "init", "-q", "-b", "main", origin], check=True)
+        _commit(origin, "a.py")
+        url = f"file://{origin}"
+        cache = RepoCache(Path(temp_dir) / "cache", max_bytes=1024 ** 3)
+
+        first = cache.checkout(url, tempfile.mkdtemp(dir=temp_dir), timeout=30)
+        assert os.path.exists(os.path.join(first.working_dir, "a.py"))
+
+        # the revisit fetches the new commit into the same bare clone
+        _commit(origin, "b.py")
+        second = cache.checkout(url, tempfile.mkdtemp(dir=temp_dir), timeout=30)
+        assert os.path.exists(os.path.join(second.working_dir, "b.py"))
+        assert len(list((Path(temp_dir) / "cache").glob("*.git"))) == 1
+
+
+def test_lru_eviction_keeps_clones_in_use():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        urls = []
+        for name in ["one", "two"]:
+            origin = os.path.join(temp_dir, name)
+            subprocess.run(["git", "init", "-q", "-b", "main", origin], check=True)
+            _commit(origin, f"{name}.py")
+            urls.append(f"file://{origin}")
+
+        cache = RepoCache(Path(temp_dir) / "cache", max_bytes=1024 ** 3)
+        worktree = tempfile.mkdtemp(dir=temp_dir)
+        cache.checkout(urls[0], worktree, timeout=30)
+        cache.checkout(urls[1], tempfile.mkdtemp(dir=temp_dir), timeout=30)
+        assert len(list(cache.root.glob("*.git"))) == 2
+
+        # over budget: nothing can go while both worktrees exist
+        cache.max_bytes = 1
+        cache.evict()
+        assert len(list(cache.root.glob("*.git"))) == 2
+
+        # once the first worktree is gone its clone, the least recently used one, is evicted
+        subprocess.run(["rm", "-rf", worktree], check=True)
+        cache.evict()
+        remaining = list(cache.root.glob("*.git"))
+        print(f"Clones left after eviction: {len(remaining)}")
+        assert remaining == [cache._mirror_path(urls[1])]
+
+
+def run():
+    print("========== Repository Cache Tests ==========")
+    test_fetch_on_revisit()
+    test_lru_eviction_keeps_clones_in_use()
+
+
+if __name__ == "__main__":
+    run()
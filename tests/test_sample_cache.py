@@ -0,0 +1,129 @@
+# Run: PYTHONPATH=src python3 -m tests.test_sample_cache
+
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import pyarrow as pa
+from metrics import sample_cache
+from metrics.dataset_quality import DatasetQualityMetric
+from metrics.sample_cache import SampleCache
+from parsing.url_base import Dataset
+
+
+def _table(rows=1000):
+    return pa.table({"text": ["x" * (i % 50) for i in range(rows)], "label": [i % 3 for i in range(rows)]})
+
+
+def test_memory_mapped_sample():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = SampleCache(Path(temp_dir), ttl_seconds=3600, max_bytes=10 * 1024 * 1024)
+        assert cache.get_sample("acme/corpus", "en", "train", "abc") is None
+        cache.put_sample("acme/corpus", "en", "train", "abc", _table())
+
+        allocated = pa.total_allocated_bytes()
+        table = cache.get_sample("acme/corpus", "en", "train", "abc")
+        assert table.equals(_table())
+        assert pa.total_allocated_bytes() == allocated # read in place from the mapped file
+        assert cache.get_sample("acme/corpus", "en", "train", "def") is None # another revision
+        assert cache.get_sample("acme/corpus", None, "train", "abc") is None # another config
+
+
+def test_configs():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = SampleCache(Path(temp_dir), ttl_seconds=3600, max_bytes=1024)
+        assert cache.get_configs("acme/corpus", "abc") is None
+        cache.put_configs("acme/corpus", "abc", ["en", "de"])
+        assert cache.get_configs("acme/corpus", "abc") == ["en", "de"]
+        assert cache.get_configs("acme/corpus", "def") is None
+
+
+def test_ttl():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = SampleCache(Path(temp_dir), ttl_seconds=60, max_bytes=10 * 1024 * 1024)
+        cache.put_sample("acme/corpus", None, "train", "abc", _table())
+        cache.put_configs("acme/corpus", "abc", ["default"])
+        old = time.time() - 120
+        for path in Path(temp_dir).rglob("*.*"):
+            os.utime(path, (old, old))
+        assert cache.get_sample("acme/corpus", None, "train", "abc") is None
+        assert cache.get_configs("acme/corpus", "abc") is None
+        assert not list(Path(temp_dir).rglob("*.arrow")) # expired files are removed
+
+
+def test_size_eviction():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        probe = SampleCache(Path(temp_dir) / "probe", ttl_seconds=3600, max_bytes=10 * 1024 * 1024)
+        probe.put_sample("probe", None, "train", "abc", _table())
+        size = next((Path(temp_dir) / "probe").rglob("*.arrow")).stat().st_size
+
+        cache = SampleCache(Path(temp_dir) / "cache", ttl_seconds=3600, max_bytes=2 * size + size // 2)
+        now = time.time()
+        for i, name in enumerate(["a", "b"]):
+            cache.put_sample(f"acme/{name}", None, "train", "abc", _table())
+            path = cache._sample_path(f"acme/{name}", None, "train", "abc")
+            os.utime(path, (now - 100 + i, now - 100 + i)) # "a" written and used before "b"
+        cache.get_sample("acme/a", None, "train", "abc") # "a" is now more recently used than "b"
+        cache.put_sample("acme/c", None, "train", "abc", _table())
+        kept = [name for name in "abc" if cache.get_sample(f"acme/{name}", None, "train", "abc") is not None]
+        print(f"Samples kept under the size budget: {kept}")
+        assert kept == ["a", "c"]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    paths = []
+
+    def do_GET(self):
+        type(self).paths.append(self.path)
+        if self.path == "/api/datasets/acme/corpus":
+            body = json.dumps({"id": "acme/corpus", "sha": "abc"}).encode()
+            self.send_response(200)
+        else:
+            body = b"{}"
+            self.send_response(404)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_metric_reads_cached_sample():
+    # nothing is streamed from the hub when the sample of the current revision is cached
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    default_cache = sample_cache._default_cache
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = SampleCache(Path(temp_dir), ttl_seconds=3600, max_bytes=10 * 1024 * 1024)
+        cache.put_configs("acme/corpus", "abc", ["default", "en"])
+        cache.put_sample("acme/corpus", "en", "train", "abc", _table())
+        sample_cache._default_cache = cache
+        try:
+            dq = DatasetQualityMetric(Dataset("https://huggingface.co/datasets/acme/corpus"), hub_api=f"{base}/api")
+            score = dq.calculate()
+            print(f"Score from the cached sample: {score}")
+            assert score == dq._analyze_dataset(_table())
+            assert "/api/datasets/acme/corpus" in _Handler.paths
+        finally:
+            sample_cache._default_cache = default_cache
+            server.shutdown()
+
+
+def run():
+    print("========== Dataset Sample Cache Tests ==========")
+    test_memory_mapped_sample()
+    test_configs()
+    test_ttl()
+    test_size_eviction()
+    test_metric_reads_cached_sample()
+
+
+if __name__ == "__main__":
+    run()
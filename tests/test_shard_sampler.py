@@ -0,0 +1,97 @@
+# Run: PYTHONPATH=src python3 -m tests.test_shard_sampler
+
+import os
+import tempfile
+import datasets
+import pyarrow as pa
+import pyarrow.parquet as pq
+from metrics.shard_sampler import ShardSampler
+
+
+def _fixture(rows=8000, shards=8):
+    # sorted, so the head of the first shard is nothing like the rest of the data
+    return datasets.Dataset.from_dict({
+        "id": list(range(rows)),
+        "text": ["x" * (i % 40) for i in range(rows)],
+    }).to_iterable_dataset(num_shards=shards)
+
+
+def test_spans_shards():
+    sample = ShardSampler(rows=500, max_shards=8, open_shards=4, batch_rows=100).sample(_fixture())
+    ids = sample.column("id").to_pylist()
+    print(f"Sampled ids from {min(ids)} to {max(ids)}")
+    assert sample.num_rows == 500 and sample.column_names == ["id", "text"]
+    assert len(set(ids)) == 500
+    assert len({i // 1000 for i in ids}) == 8 # every shard contributed, not only the first
+
+
+def test_deterministic():
+    # the same rows whether the shards are read one at a time or at once
+    first = ShardSampler(rows=300, seed=7, open_shards=1, batch_rows=50).sample(_fixture())
+    second = ShardSampler(rows=300, seed=7, open_shards=8, batch_rows=50).sample(_fixture())
+    other = ShardSampler(rows=300, seed=8, batch_rows=50).sample(_fixture())
+    assert sorted(first.column("id").to_pylist()) == sorted(second.column("id").to_pylist())
+    assert sorted(first.column("id").to_pylist()) != sorted(other.column("id").to_pylist())
+
+
+def test_shard_quota():
+    # 4 of the 8 streamed shards, each read only for its share of rows * oversample
+    sample = ShardSampler(rows=200, max_shards=4, oversample=2.0, batch_rows=50).sample(_fixture())
+    ids = sample.column("id").to_pylist()
+    assert sample.num_rows == 200
+    assert len({i // 1000 for i in ids}) == 4
+    assert all(i % 1000 < 100 for i in ids) # 2 * 200 / 4 rows from the start of each shard, streams cannot seek
+
+
+def _parquet_files(directory, rows=8000, shards=8):
+    paths = []
+    for shard in range(shards):
+        ids = list(range(shard * rows // shards, (shard + 1) * rows // shards))
+        paths.append(os.path.join(directory, f"train-{shard:05d}.parquet"))
+        pq.write_table(pa.table({"id": ids, "text": ["x" * (i % 40) for i in ids]}), paths[-1], row_group_size=100)
+    return paths
+
+
+def test_parquet_row_groups():
+    # a Parquet shard's share comes from random row groups at random offsets, not from its head
+    with tempfile.TemporaryDirectory() as directory:
+        files = _parquet_files(directory)
+        sample = ShardSampler(rows=200, max_shards=4, oversample=2.0, batch_rows=20).sample_parquet(files)
+        ids = sample.column("id").to_pylist()
+        print(f"Row groups sampled: {sorted({i // 100 for i in ids})}")
+        assert sample.num_rows == 200 and sample.column_names == ["id", "text"] and len(set(ids)) == 200
+        assert len({i // 1000 for i in ids}) == 4
+        assert len({i // 100 for i in ids}) > 8 # several row groups of every shard
+        assert any(i % 1000 >= 100 for i in ids)
+
+        # the same rows whether the shards are read one at a time or at once, from paths or file objects
+        first = ShardSampler(rows=300, seed=7, open_shards=1, batch_rows=50).sample_parquet(files)
+        second = ShardSampler(rows=300, seed=7, open_shards=8, batch_rows=50).sample_parquet(files, lambda path: open(path, "rb"))
+        assert sorted(first.column("id").to_pylist()) == sorted(second.column("id").to_pylist())
+
+
+def test_memory_cap():
+    full = ShardSampler(rows=1000).sample(_fixture())
+    capped = ShardSampler(rows=1000, max_bytes=full.nbytes // 4).sample(_fixture())
+    print(f"Memory cap kept {capped.num_rows} of {full.num_rows} rows")
+    assert 0 < capped.num_rows < full.num_rows and capped.nbytes <= full.nbytes // 4 + 1024
+
+
+def test_small_dataset():
+    single = datasets.Dataset.from_dict({"id": list(range(30))}).to_iterable_dataset()
+    sample = ShardSampler(rows=100).sample(single)
+    assert sorted(sample.column("id").to_pylist()) == list(range(30))
+
+
+def run():
+    print("========== Shard Sampler Tests ==========")
+    test_spans_shards()
+    test_deterministic()
+    test_shard_quota()
+    test_parquet_row_groups()
+    test_memory_cap()
+    test_small_dataset()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,145 @@
+# Run: PYTHONPATH=src python3 -m tests.test_tarball_source
+
+import io
+import os
+import tarfile
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from metrics.code_quality import CodeQuality
+from metrics.repo_analyzer import RepositoryAnalyzer
+from metrics.tarball_source import fetch_tarball_stats, github_tarball_url
+from parallel.deadline import Deadline
+from parsing.ref_resolver import ref_resolver
+from parsing.repo_activity import repo_activity
+from parsing.url_base import Codebase
+
+COMMIT_TIME = int(time.time()) - 10 * 24 * 3600
+
+
+def _fixture_tarball(files=None):
+    # laid out like a GitHub archive: everything under one "<owner>-<repo>-<sha>/" directory
+    if files is None:
+        files = {f"widgets-abc123/pkg/mod{i}.py": f"def f{i}():\n    return {i}\n" for i in range(12)}
+        files["widgets-abc123/README.md"] = "# widgets\n"
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, content in files.items():
+            data = content.encode("utf-8")
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = COMMIT_TIME
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    body = _fixture_tarball()
+    paths = []
+
+    def do_GET(self):
+        type(self).paths.append(self.path)
+        if self.path != "/acme/widgets/tar.gz/main":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-gzip")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_tarball_url():
+    assert github_tarball_url("https://github.com/acme/widgets.git", "main", "https://codeload.github.com") == \
+        "https://codeload.github.com/acme/widgets/tar.gz/main"
+    assert github_tarball_url("https://huggingface.co/acme/widgets", "main") is None
+
+
+def test_streamed_sample():
+    server, archive_url = _serve()
+    try:
+        sampled = fetch_tarball_stats("https://github.com/acme/widgets", RepositoryAnalyzer(sample_size=5),
+                                      Deadline(30), archive_url=archive_url, ref="main")
+        print(f"Sampled {sampled.stats.files} from the streamed archive")
+        assert len(sampled.stats.files) == 5 and sampled.stats.complete
+        assert all(path.startswith(os.path.join("pkg", "mod")) for path in sampled.stats.files)
+        assert sampled.stats.functions == 5 and sampled.committed_date == COMMIT_TIME
+
+        full = fetch_tarball_stats("https://github.com/acme/widgets", RepositoryAnalyzer(sample_size=None, chunk_size=4),
+                                   Deadline(30), archive_url=archive_url, ref="main")
+        assert full.stats.files_analyzed == 12 and full.stats.lines == 24
+
+        missing = fetch_tarball_stats("https://github.com/acme/gadgets", RepositoryAnalyzer(),
+                                      Deadline(30), archive_url=archive_url, ref="main")
+        assert missing is None
+    finally:
+        server.shutdown()
+
+
+def test_archive_settings():
+    # adaptive stopping and the process pool apply to archives as they do to checkouts
+    sources = {f"pkg/mod{i:02d}.py": f"def f{i}():\n    return {i}\n" for i in range(40)}
+    body = _fixture_tarball({f"widgets-abc123/{path}": content for path, content in sources.items()})
+    with tempfile.TemporaryDirectory() as repo:
+        os.makedirs(os.path.join(repo, "pkg"))
+        for path, content in sources.items():
+            with open(os.path.join(repo, path), "w") as f:
+                f.write(content)
+        adaptive = RepositoryAnalyzer(sample_size="adaptive", min_files=10)
+        archived, _ = adaptive.analyze_archive(io.BytesIO(body), Deadline(30))
+        checked_out = adaptive.analyze(repo, Deadline(30))
+    print(f"Adaptive sampling stopped after {archived.files_analyzed} of {len(sources)} archived files")
+    assert archived.files_analyzed == 10 and archived.complete
+    assert archived.files == checked_out.files # the same seeded order as a checkout
+    assert archived.files != sorted(sources)[:10]
+
+    sequential, _ = RepositoryAnalyzer(sample_size=None, chunk_size=4).analyze_archive(io.BytesIO(body))
+    parallel, _ = RepositoryAnalyzer(sample_size=None, workers=2, chunk_size=4).analyze_archive(io.BytesIO(body))
+    sampled, _ = RepositoryAnalyzer(sample_size=10, workers=2, chunk_size=4).analyze_archive(io.BytesIO(body))
+    assert parallel.files_analyzed == 40 and parallel.complete
+    assert parallel.file_violations == sequential.file_violations and parallel.functions == sequential.functions
+    assert sampled.files_analyzed == 10
+
+
+def test_code_quality_source():
+    server, archive_url = _serve()
+    os.environ["GITHUB_ARCHIVE_URL"] = archive_url
+    ref_resolver._branches["https://github.com/acme/widgets"] = "main"
+    github_api = repo_activity.github_api
+    repo_activity.github_api = archive_url # no repository metadata, so recency comes from the archive
+    try:
+        metric = CodeQuality(Codebase("https://github.com/acme/widgets"), source="tarball")
+        score = metric.calculate()
+        print(f"Code quality from the tarball: {score:.2f}")
+        assert metric.total_functions == 12 and metric.days_since_last_commit == 10
+        assert 0.0 <= score <= 1.0
+    finally:
+        server.shutdown()
+        del os.environ["GITHUB_ARCHIVE_URL"]
+        ref_resolver.clear()
+        repo_activity.github_api = github_api
+
+
+def run():
+    print("========== Tarball Source Tests ==========")
+    test_tarball_url()
+    test_streamed_sample()
+    test_archive_settings()
+    test_code_quality_source()
+
+
+if __name__ == "__main__":
+    run()